@@ -7,11 +7,51 @@ AVG_LIFE_EXPECTANCY = 75
 
 NUM_SIMULATIONS = 10000
 TARGET_PROB_OF_SUCCESS = 0.95
-ENABLE_XIRR_DUMP = False
+CONSERVATIVE_RESERVE_THRESHOLD = 0.2
+# Schedules are display-only; 'float32' halves their memory at ~7 significant digits
+SCHEDULE_DTYPE = 'float64'
 
 LOGGING_DIR = 'logs/'
 LOGGING_LIMIT_DAYS = 5
 
+# Admin endpoints and header-triggered profiling are disabled unless a token is configured
+ADMIN_TOKEN = os.environ.get('SWPC_ADMIN_TOKEN')
+
+PROFILING_HEADER = 'X-Profile-Request'
+PROFILING_SAMPLE_RATE = float(os.environ.get('SWPC_PROFILING_SAMPLE_RATE', 0.0))
+PROFILING_MODE = os.environ.get('SWPC_PROFILING_MODE', 'deterministic')   # 'deterministic' or 'sampling'
+PROFILING_SAMPLE_INTERVAL = 0.001
+PROFILE_STORE_DIR = os.path.join(os.getcwd(), 'temp/request_profiles/')
+PROFILE_STORE_MAX_ENTRIES = 50
+
+# In-memory capture of each request's window XIRRs (served by /admin/xirr-diagnostics); toggled at runtime
+XIRR_DIAGNOSTICS_ENABLED = os.environ.get('SWPC_XIRR_DIAGNOSTICS', '0') == '1'
+XIRR_DIAGNOSTICS_MAX_ENTRIES = 1000
+XIRR_DIAGNOSTICS_MAX_BYTES = 16 * 1024 * 1024
+
+# Threads shared by all requests for running independent analysis steps concurrently; 1 runs them in sequence
+ANALYSIS_EXECUTOR_WORKERS = int(os.environ.get('SWPC_ANALYSIS_WORKERS', min(4, os.cpu_count() or 1)))
+
+# Per-stage allocation tracking (tracemalloc; slows requests, so off by default) and per-request memory budget
+MEMORY_TRACKING_ENABLED = os.environ.get('SWPC_MEMORY_TRACKING', '0') == '1'
+MEMORY_BUDGET_BYTES = int(float(os.environ.get('SWPC_MEMORY_BUDGET_MB', 512)) * 1024 * 1024)
+
+# Derived artifacts (window XIRRs, quantiles, composite NAVs) persisted across restarts
+ARTIFACT_CACHE_ENABLED = os.environ.get('SWPC_ARTIFACT_CACHE', '1') != '0'
+ARTIFACT_CACHE_PATH = os.path.join(os.getcwd(), 'temp/artifact_cache.sqlite')
+ARTIFACT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Startup warm-up: /ready fails until data is attached and caches are filled for every portfolio and horizon
+WARMUP_ENABLED = os.environ.get('SWPC_WARMUP', '1') != '0'
+WARMUP_WORKERS = int(os.environ.get('SWPC_WARMUP_WORKERS', os.cpu_count() or 1))
+WARMUP_HORIZONS = list(range(1, 41))    # years
+WARMUP_SIP_STEP_UPS = [0.0, 0.05, 0.10]  # annual percentage step-ups; rolling XIRRs are shared by SIPs of any size
+
+# Hot reload: a JSON file of overrides (portfolios, glide_paths, annual_inflation_rate, avg_life_expectancy,
+# nav_datasets) layered on the constants below, re-read when it changes; a poll interval of 0 disables watching
+CONFIG_FILE = os.environ.get('SWPC_CONFIG_FILE')
+CONFIG_FILE_POLL_SECONDS = float(os.environ.get('SWPC_CONFIG_POLL_SECONDS', 5))
+
 CONSERVATIVE_PORTFOLIO = {
     "largecap": 0.1,
     "debt": 0.55,
@@ -30,6 +70,16 @@ AGGRESSIVE_PORTFOLIO = {
     "gold": 0.2
 }
 
+# Glide paths: allocations anchored at years relative to retirement (negative = before it),
+# interpolated linearly for the years in between and held flat beyond the first and last anchor
+GLIDE_PATHS = {
+    "target_date": {
+        -20: AGGRESSIVE_PORTFOLIO,
+        -5: BALANCED_PORTFOLIO,
+        10: CONSERVATIVE_PORTFOLIO
+    }
+}
+
 FOREX_RATES_DIR = os.path.join(os.getcwd(), 'data/monthly_forex/')
 ASSET_NAV_DATA_PATH = {
     "largecap": os.path.join(os.getcwd(), "data/monthly_nav/largecap.feather"),
@@ -38,3 +88,50 @@ ASSET_NAV_DATA_PATH = {
     "debt":     os.path.join(os.getcwd(), "data/monthly_nav/debt.feather")
 }
 
+FOREX_RATES_DIR_34_YR = os.path.join(os.getcwd(), 'data/monthly_forex_34_year/')
+ASSET_NAV_DATA_PATH_34_YR = {
+    "largecap": os.path.join(os.getcwd(), "data/monthly_nav_34_yr/largecap.feather"),
+    "s&p_500":  os.path.join(os.getcwd(), "data/monthly_nav_34_yr/sp500.feather"),
+    "gold":     os.path.join(os.getcwd(), "data/monthly_nav_34_yr/gold.feather")
+}
+
+DEFAULT_DATASET = "monthly"
+# A daily dataset adds "frequency": "daily" and "sip_day" (1-28, or None for the month-end);
+# its NAV and forex files (.feather or .parquet) are resampled to one row per SIP date on load.
+NAV_DATASETS = {
+    "monthly": {
+        "nav_paths": ASSET_NAV_DATA_PATH,
+        "forex_dir": FOREX_RATES_DIR
+    },
+    "monthly_34_yr": {
+        "nav_paths": ASSET_NAV_DATA_PATH_34_YR,
+        "forex_dir": FOREX_RATES_DIR_34_YR
+    }
+}
+
+# Portfolios are held at their target weights and rebalanced on this calendar ('none' = buy-and-hold NAV sum);
+# with a tolerance, only when some asset drifts more than that from target on a rebalance date
+REBALANCE_FREQUENCY = "annual"          # 'none', 'monthly', 'quarterly' or 'annual'
+REBALANCE_TOLERANCE = None              # e.g. 0.05, or None to always rebalance
+
+NAV_PANEL_DIR = os.path.join(os.getcwd(), 'temp/nav_panel/')
+
+BACKTEST_DATASET = "monthly_34_yr"
+BACKTEST_PERCENTILES = [5, 25, 50, 75, 95]
+
+# Streaming quantile sketches: exact up to this many samples, normalised rank error ~3.3 / k beyond
+QUANTILE_SKETCH_K = 512
+
+
+# Block bootstrap of multi-asset monthly returns
+BOOTSTRAP_DATASET = "monthly_34_yr"
+BOOTSTRAP_METHOD = "stationary"         # 'stationary' (geometric block lengths) or 'moving' (fixed-length blocks)
+BOOTSTRAP_MEAN_BLOCK_LENGTH = 12        # months
+BOOTSTRAP_SEED = 42
+BOOTSTRAP_STREAM_PATHS = 1024           # paths drawn from each independent random stream
+
+# Corpus fan chart over bootstrapped return paths
+FAN_CHART_PATHS = 2000
+FAN_CHART_MAX_PATHS = 50000
+FAN_CHART_CHUNK_PATHS = BOOTSTRAP_STREAM_PATHS      # paths simulated at a time; bounds memory
+FAN_CHART_PERCENTILES = [5, 25, 50, 75, 95]
@@ -0,0 +1,169 @@
+from typing import Any, Callable
+
+from config.config import POST_RETIREMENT_RETURN_RATE, PRE_RETIREMENT_RETURN_RATE
+from core.glide_path import GlidePath
+from core.run_analysis import (
+    _post_retirement_rate,
+    _pre_retirement_rate,
+    _rate_fallback,
+    _sip_kwargs,
+    get_relevant_portfolio
+)
+from core.swp_calculator import SWPCalculator
+from models.SWPResult import SWPResult
+from utils.config_snapshot import current_snapshot, pinned_snapshot
+from utils.logger import get_logger
+from utils.memory_tracker import enforce_memory_budget, estimate_analysis_bytes, track_stage
+from utils.task_graph import Node, run_graph
+
+logger = get_logger()
+
+"""
+    Analysis Session: Per-client request state for interactive use, where the
+    client sends only the fields that changed and the server recomputes only
+    the steps those fields feed.
+
+    The steps are runAnalysis's task graph. Each step remembers the key of the
+    inputs its last value was computed from: the request fields it reads plus
+    the keys of the steps it depends on. A step is rerun only when that key
+    changes, so a new expense target reuses both return rates and the current
+    scenario, and a new SIP leaves the post-retirement return and the target
+    scenario untouched. Every update runs on the config snapshot live when it
+    arrives; the snapshot's version is part of every key, so the first update
+    after a config reload recomputes everything.
+"""
+
+
+def merge_update(state: dict, update: dict) -> dict:
+    """
+    Copy of `state` with `update` merged in; nested dicts (user_data) are merged field by field.
+    """
+    merged = dict(state)
+    for field, value in update.items():
+        if isinstance(value, dict) and isinstance(merged.get(field), dict):
+            merged[field] = merge_update(merged[field], value)
+        else:
+            merged[field] = value
+    return merged
+
+
+class AnalysisSession:
+    def __init__(self, validate: Callable[[dict], Any]):
+        """
+        Args:
+            validate: Turns the merged request dict into a request with the fields of an
+                      SWPRequest (e.g. SWPRequest.model_validate); raises if it is invalid.
+        """
+        self._validate = validate
+        self.state: dict = {}
+        self._steps: dict[str, tuple[tuple, Any]] = {}
+
+    @pinned_snapshot()
+    def apply(self, update: dict) -> tuple[SWPResult, list[str]]:
+        """
+        Merges a partial request into the session and recomputes the affected steps.
+        An update that leaves the request invalid is rejected and the state kept as it was.
+
+        Returns:
+            tuple: (SWPResult for the merged request, names of the steps that were recomputed).
+
+        Raises:
+            pydantic.ValidationError: If the merged request is invalid.
+            MemoryBudgetExceeded: If the merged request is too large for the memory budget.
+            ValueError: If the analysis cannot be computed for the merged request.
+        """
+        state = merge_update(self.state, update)
+        request = self._validate(state)
+        user_data = request.user_data
+        enforce_memory_budget(estimate_analysis_bytes(user_data.current_age, user_data.expected_retirement_age))
+
+        self.state = state
+        return self._recompute(request)
+
+    def _step(self, name: str, inputs: tuple, deps: tuple[str, ...], compute: Callable, fallback=None) -> Node:
+        """
+        Graph node that reuses the step's last value while its inputs and its dependencies' keys are unchanged.
+        """
+        def run(**dep_values):
+            key = inputs + tuple(self._steps[dep][0] for dep in deps)
+            cached = self._steps.get(name)
+            if cached is not None and cached[0] == key:
+                return cached[1]
+
+            try:
+                value = compute(**dep_values)
+            except Exception as e:
+                if fallback is None:
+                    raise
+                value = fallback(e)
+            self._steps[name] = (key, value)
+            self._recomputed.append(name)
+            return value
+
+        return Node(name, run, deps)
+
+    def _recompute(self, request) -> tuple[SWPResult, list[str]]:
+        user_data = request.user_data
+        swp_mode, glide_path = request.swp_mode, request.glide_path
+        time_to_retirement = user_data.expected_retirement_age - user_data.current_age
+        snapshot = current_snapshot()
+        inflation, life_expectancy = snapshot.annual_inflation_rate, snapshot.avg_life_expectancy
+        time_post_retirement = life_expectancy - user_data.expected_retirement_age
+        sip_kwargs = _sip_kwargs(user_data.retirement_sip, user_data.sip_step_up, user_data.sip_step_up_mode)
+        pre_retirement_portfolio = get_relevant_portfolio(request.pre_retirement_risk)
+        post_retirement_portfolio = get_relevant_portfolio(request.post_retirement_risk)
+        swp_calc = SWPCalculator()
+        self._recomputed = []
+
+        def pre_retirement_return():
+            path = None
+            if glide_path is not None:
+                path = GlidePath.for_user(glide_path, time_to_retirement, time_post_retirement)[0]
+            return _pre_retirement_rate(pre_retirement_portfolio, time_to_retirement, sip_kwargs, path)
+
+        def post_retirement_return():
+            path = None
+            if glide_path is not None:
+                path = GlidePath.for_user(glide_path, time_to_retirement, time_post_retirement)[1]
+            return _post_retirement_rate(post_retirement_portfolio, time_post_retirement, path, inflation)
+
+        def current_scenario(pre_retirement_return, post_retirement_return):
+            with track_stage('current_scenario'):
+                return swp_calc.compute_current_scenario(
+                    user_data, pre_retirement_return, post_retirement_return, inflation, life_expectancy, mode=swp_mode
+                )
+
+        def target_scenario(post_retirement_return):
+            with track_stage('target_scenario'):
+                return swp_calc.compute_target_scenario(
+                    user_data, post_retirement_return, inflation, life_expectancy, mode=swp_mode
+                )
+
+        def result(current_scenario, target_scenario, pre_retirement_return):
+            with track_stage('swp_calculator'):
+                return swp_calc.combine_scenarios(
+                    user_data, current_scenario, target_scenario, pre_retirement_return, inflation, life_expectancy
+                )
+
+        config = (snapshot.version,)
+        accumulation = config + (
+            glide_path, request.pre_retirement_risk, time_to_retirement, tuple(sorted(sip_kwargs.items()))
+        )
+        withdrawal = config + (glide_path, request.post_retirement_risk, time_post_retirement)
+        ages = config + (swp_mode, user_data.current_age, user_data.expected_retirement_age)
+        outputs = run_graph([
+            self._step('pre_retirement_return', accumulation, (), pre_retirement_return,
+                       fallback=_rate_fallback('Pre-retirement', PRE_RETIREMENT_RETURN_RATE)),
+            self._step('post_retirement_return', withdrawal, (), post_retirement_return,
+                       fallback=_rate_fallback('Post-retirement', POST_RETIREMENT_RETURN_RATE)),
+            self._step('current_scenario',
+                       ages + (user_data.current_retirement_corpus, user_data.retirement_sip,
+                               user_data.sip_step_up, user_data.sip_step_up_mode),
+                       ('pre_retirement_return', 'post_retirement_return'), current_scenario),
+            self._step('target_scenario', ages + (user_data.expected_retirement_expenses,),
+                       ('post_retirement_return',), target_scenario),
+            self._step('result', config, ('current_scenario', 'target_scenario', 'pre_retirement_return'), result)
+        ])
+
+        logger.info(f'Session recomputed: {", ".join(self._recomputed) or "nothing"}.')
+        return outputs['result'], self._recomputed
@@ -0,0 +1,99 @@
+import threading
+
+from config.config import DEFAULT_DATASET
+from models.Asset import Asset
+from utils.config_snapshot import config_store, current_snapshot
+
+"""
+    Asset Registry: Flyweight store of loaded, INR-converted Asset instances.
+
+    Each (asset name, dataset) pair is read from disk and converted to INR once
+    per process; every later request gets the same shared instance. Entries are
+    keyed by the dataset's spec in the request's config snapshot, so a reload
+    that repoints a dataset loads fresh assets alongside the ones in use; once the
+    new snapshot is live, the old spec's assets are dropped. A per-key
+    lock makes concurrent first requests wait for the single load instead of
+    duplicating it, while different assets still load in parallel.
+
+    Shared instances carry only intrinsic state (name, history). Portfolio
+    weights are extrinsic and belong to the caller; registry assets have weight 1.0.
+"""
+
+class AssetRegistry:
+    def __init__(self):
+        self._assets: dict[tuple[str, str, str], Asset] = {}
+        self._key_locks: dict[tuple[str, str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str, dataset: str = DEFAULT_DATASET) -> Asset:
+        """
+        Returns the shared, INR-converted Asset for a name within a dataset.
+
+        Raises:
+            ValueError: If the dataset or the asset within it is unknown.
+        """
+        snapshot = current_snapshot()
+        key = (name, dataset, snapshot.dataset_key(dataset))
+        asset = self._assets.get(key)
+        if asset is not None:
+            return asset
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            asset = self._assets.get(key)
+            if asset is None:
+                asset = self._load(name, snapshot.dataset(dataset))
+                # Checked under the registry lock, so retain() cannot run between the check and the insert
+                with self._lock:
+                    if not config_store.superseded(snapshot, dataset):
+                        self._assets[key] = asset
+        return asset
+
+    def _load(self, name: str, config: dict) -> Asset:
+        path = config['nav_paths'].get(name)
+        if not path:
+            raise ValueError(f"Missing path for asset: {name}")
+
+        asset = Asset(
+            name,
+            path,
+            weight=1.0,
+            forex_dir=config['forex_dir'],
+            frequency=config.get('frequency', 'monthly'),
+            sip_day=config.get('sip_day')
+        )
+        asset.load_history()
+        asset.convert_navs_to_inr()
+
+        # Shared across threads: freeze the arrays so no caller can mutate them in place
+        asset.dates.flags.writeable = False
+        asset.navs.flags.writeable = False
+        return asset
+
+    def retain(self, dataset_keys: dict[str, str]) -> int:
+        """
+        Drops the assets of every dataset spec not in `dataset_keys` (dataset -> spec hash).
+
+        Returns:
+            int: Number of assets dropped.
+        """
+        with self._lock:
+            stale = [key for key in list(self._assets) if dataset_keys.get(key[1]) != key[2]]
+            for key in stale:
+                del self._assets[key]
+            for key in [key for key in self._key_locks if dataset_keys.get(key[1]) != key[2]]:
+                del self._key_locks[key]
+        return len(stale)
+
+    def clear(self) -> None:
+        """
+        Drops every cached asset, e.g. after the underlying data files change.
+        """
+        with self._lock:
+            self._assets.clear()
+            self._key_locks.clear()
+
+
+asset_registry = AssetRegistry()
@@ -3,9 +3,11 @@ import numpy as np
 import os
 
 from config.config import FOREX_RATES_DIR
+from utils.memory_tracker import track_stage
 
 class CurrencyConverter:
-    def __init__(self):
+    def __init__(self, forex_dir: str = FOREX_RATES_DIR):
+        self.forex_dir = forex_dir
         self.original_nav_data: pd.DataFrame = None
         self.forex_rate_data: pd.DataFrame = None
 
@@ -20,10 +22,10 @@ class CurrencyConverter:
         :raises FileNotFoundError: If the file does not exist in the directory.
         """
         filename = f"{currency.upper()}_to_INR.feather"
-        filepath = os.path.join(FOREX_RATES_DIR, filename)
+        filepath = os.path.join(self.forex_dir, filename)
 
         if not os.path.exists(filepath):
-            raise FileNotFoundError(f"Forex data file '{filename}' not found in directory '{FOREX_RATES_DIR}.' Expected file name format : '<CURR>_to_INR.feather'.")
+            raise FileNotFoundError(f"Forex data file '{filename}' not found in directory '{self.forex_dir}.' Expected file name format : '<CURR>_to_INR.feather'.")
 
         self.forex_rate_data = pd.read_feather(filepath)
 
@@ -84,6 +86,7 @@ class CurrencyConverter:
         return str(nav_cols.split('_')[-1])
 
 
+    @track_stage('currency_conversion')
     def convert_to_inr(self, feather_path: str | None = None, nav_data: pd.DataFrame | None = None) -> pd.DataFrame:
         """
         Converts NAV from foreign currency to INR using historical exchange rates.
@@ -1,2 +1,12 @@
 class CriticalInternalError(Exception):
-    pass
\ No newline at end of file
+    pass
+
+
+class MemoryBudgetExceeded(Exception):
+    def __init__(self, estimated_bytes: int, budget_bytes: int):
+        self.estimated_bytes = estimated_bytes
+        self.budget_bytes = budget_bytes
+        super().__init__(
+            f'Request needs an estimated {estimated_bytes / 2**20:.1f} MiB, '
+            f'over the {budget_bytes / 2**20:.1f} MiB per-request memory budget.'
+        )
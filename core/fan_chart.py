@@ -0,0 +1,111 @@
+import numpy as np
+
+from config.config import (
+    ANNUAL_INFLATION_RATE,
+    BOOTSTRAP_DATASET,
+    DEFAULT_DATASET,
+    FAN_CHART_CHUNK_PATHS,
+    FAN_CHART_MAX_PATHS,
+    FAN_CHART_PATHS,
+    FAN_CHART_PERCENTILES
+)
+from core.rebalancer import RebalancePolicy, rebalanced_path_growth
+from core.return_bootstrapper import ReturnBootstrapper
+from core.swp_backtester import SWPBacktester
+from models.SWPResult import FanChartResult
+from utils.logger import get_logger
+from utils.nav_panel import get_nav_panel
+from utils.quantile_sketch import QuantileSketch
+
+logger = get_logger()
+
+"""
+    Fan Chart: Percentile bands of the corpus balance through retirement, over
+    block-bootstrapped paths of the portfolio's monthly returns.
+
+    Paths are drawn in chunks of FAN_CHART_CHUNK_PATHS. Each chunk's per-asset
+    returns are turned into portfolio returns under the rebalancing policy, run
+    through the same balance recurrence as the historical backtest, and folded
+    into one quantile sketch per reported month. Memory is therefore bounded by
+    the chunk however many paths are drawn, and the bands carry the sketch's
+    rank error (exact up to QUANTILE_SKETCH_K paths).
+"""
+
+
+def corpus_fan_chart(
+    portfolio: dict[str, float],
+    initial_corpus: float,
+    monthly_swp: float,
+    withdrawal_years: int,
+    reserve_corpus: float = 0,
+    num_paths: int = FAN_CHART_PATHS,
+    yearly: bool = False,
+    annual_inflation_rate: float = ANNUAL_INFLATION_RATE,
+    rebalance: RebalancePolicy | None = None,
+    dataset: str | None = None
+) -> FanChartResult:
+    """
+    Args:
+        portfolio: Mapping of asset name to weight.
+        initial_corpus: Corpus at the start of the SWP.
+        monthly_swp: First-year monthly withdrawal, inflated at every year-end.
+        withdrawal_years: Number of years the withdrawals run for.
+        reserve_corpus: Reserve that compounds alongside the core corpus but is never withdrawn.
+        num_paths: Bootstrapped paths to simulate.
+        yearly: Report year-end points only instead of every month.
+        rebalance: Rebalancing policy of the portfolio on every path; defaults to the configured one.
+        dataset: NAV dataset the bootstrap resamples; defaults to BOOTSTRAP_DATASET if it
+                 holds every asset of the portfolio, else DEFAULT_DATASET.
+
+    Returns:
+        FanChartResult: Balance and reserve per percentile at each reported month, and the depletion probability.
+
+    Raises:
+        ValueError: If the horizon or number of paths is invalid, or the portfolio has no common history.
+    """
+    total_m = withdrawal_years * 12
+    if total_m <= 0:
+        raise ValueError('Retirement years is zero or negative.')
+    if not 0 < num_paths <= FAN_CHART_MAX_PATHS:
+        raise ValueError(f'Number of paths must be between 1 and {FAN_CHART_MAX_PATHS}.')
+
+    if dataset is None:
+        dataset = BOOTSTRAP_DATASET
+        if not set(portfolio) <= set(get_nav_panel(dataset).assets):
+            logger.info(f'Dataset "{dataset}" lacks assets of {list(portfolio)}. Bootstrapping from "{DEFAULT_DATASET}".')
+            dataset = DEFAULT_DATASET
+
+    policy = rebalance or RebalancePolicy()
+    bootstrapper = ReturnBootstrapper(assets=list(portfolio), dataset=dataset)
+    weights = np.array([portfolio[name] for name in bootstrapper.assets])
+
+    backtester = SWPBacktester()
+    withdrawals = backtester._compute_withdrawal_vector(monthly_swp, total_m, annual_inflation_rate)
+    months = np.arange(0, total_m + 1, 12 if yearly else 1)
+
+    balance_sketch = QuantileSketch(columns=len(months))
+    reserve_sketch = QuantileSketch(columns=len(months))
+    depleted_paths = 0
+
+    for _, returns in bootstrapper.iter_chunks(num_paths, total_m, chunk_paths=FAN_CHART_CHUNK_PATHS):
+        index = rebalanced_path_growth(1 + returns, weights, policy)
+        portfolio_returns = index[:, 1:] / index[:, :-1] - 1
+
+        balances, growth = backtester._simulate_balance_paths(portfolio_returns, initial_corpus, withdrawals)
+        reserves = backtester._simulate_reserve_paths(growth, reserve_corpus, total_m, annual_inflation_rate)
+
+        # Core balance is monotone once it turns non-positive, as in the backtest
+        depleted_paths += int((balances[:, -1] <= 0).sum())
+        np.maximum(balances, 0, out=balances)
+        balance_sketch.update(balances[:, months])
+        reserve_sketch.update(reserves[:, months])
+
+    levels = np.array(FAN_CHART_PERCENTILES) / 100
+    return FanChartResult(
+        num_paths=num_paths,
+        months=months,
+        percentiles=tuple(FAN_CHART_PERCENTILES),
+        balance_bands=balance_sketch.quantile(levels),
+        reserve_bands=reserve_sketch.quantile(levels),
+        depletion_probability=round(depleted_paths / num_paths, 4)
+    )
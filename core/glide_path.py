@@ -0,0 +1,257 @@
+from typing import Literal
+import numpy as np
+
+from config.config import ANNUAL_INFLATION_RATE, DEFAULT_DATASET
+from core.swp_backtester import SWPBacktester
+from core.xirr_calculator import XirrCalculator
+from utils.artifact_cache import artifact_cache
+from utils.config_snapshot import current_snapshot
+from utils.logger import get_logger
+from utils.nav_panel import get_nav_panel
+from utils.sip_schedule import monthly_sip_amounts, normalized_sip
+from utils.xirr_diagnostics import xirr_diagnostics
+
+logger = get_logger()
+
+"""
+    Glide Path: Allocations that change year by year, e.g. an equity share that
+    falls as retirement approaches, simulated directly on the aligned NAV panel.
+
+    Every rolling window starts at year 0 of the path. At the start of each path
+    year the portfolio is rebalanced to that year's allocation and then drifts
+    with the market for twelve months. For all windows at once, the value index is
+
+        V(s, k) = prod_{y < y_k} F(s, y) * sum_a w[y_k, a] * G_a(s + 12 y_k, s + k)
+
+    where G_a is asset a's growth between two months, y_k the path year of month k
+    and F(s, y) the growth of path year y, so the whole path is one pass over the
+    (window x month x asset) growth tensor instead of one composite per year.
+"""
+
+
+class GlidePath:
+    def __init__(self, assets: list[str], weights: np.ndarray):
+        """
+        Args:
+            assets: Asset names, in weight column order.
+            weights: (Y, A) allocation of each path year; rows are normalised to sum to 1.
+
+        Raises:
+            ValueError: If the shapes disagree or a year's allocation does not sum to a positive total.
+        """
+        weights = np.atleast_2d(np.asarray(weights, dtype=np.float64))
+        if weights.shape[1] != len(assets) or len(weights) == 0:
+            raise ValueError('Glide path needs one weight per asset for at least one year.')
+        totals = weights.sum(axis=1, keepdims=True)
+        if np.any(totals <= 0):
+            raise ValueError('Glide path weights must sum to a positive total every year.')
+
+        self.assets = list(assets)
+        self.weights = weights / totals
+
+    @classmethod
+    def from_anchors(cls, anchors: dict[int, dict[str, float]], first_year: int, years: int) -> 'GlidePath':
+        """
+        Per-year path for `years` years starting `first_year` years from retirement.
+
+        Args:
+            anchors: Allocation at given years relative to retirement (negative = before it).
+            first_year: Year relative to retirement of path year 0.
+            years: Number of path years.
+
+        Raises:
+            ValueError: If there are no anchors or no years.
+        """
+        if not anchors or years <= 0:
+            raise ValueError('Glide path needs at least one anchor and one year.')
+
+        points = sorted(anchors)
+        assets = list(dict.fromkeys(name for point in points for name in anchors[point]))
+        anchor_weights = np.array([[anchors[point].get(name, 0.0) for name in assets] for point in points])
+
+        # Linear interpolation per asset, held flat beyond the ends
+        path_years = np.arange(first_year, first_year + years)
+        weights = np.column_stack([np.interp(path_years, points, anchor_weights[:, a]) for a in range(len(assets))])
+        return cls(assets, weights)
+
+    @classmethod
+    def for_user(cls, name: str, years_to_retirement: int, years_in_retirement: int) -> tuple['GlidePath', 'GlidePath']:
+        """
+        Accumulation and withdrawal segments of a glide path of the current config snapshot.
+
+        Raises:
+            ValueError: If the glide path is not configured or a phase has no years.
+        """
+        glide_paths = current_snapshot().glide_paths
+        if name not in glide_paths:
+            raise ValueError(f'Unknown glide path: {name}')
+        anchors = glide_paths[name]
+        return (
+            cls.from_anchors(anchors, -years_to_retirement, years_to_retirement),
+            cls.from_anchors(anchors, 0, years_in_retirement)
+        )
+
+    def yearly_weights(self, years: int) -> np.ndarray:
+        """
+        (years, A) allocations, holding the last year's allocation if the path is shorter.
+        """
+        rows = np.minimum(np.arange(years), len(self.weights) - 1)
+        return self.weights[rows]
+
+    def cache_params(self) -> dict:
+        return {'assets': self.assets, 'weights': self.weights.round(12).tolist()}
+
+    def _history(self, dataset: str) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Dates and (T+1, A) cumulative log growth over the months every path asset has a NAV.
+        """
+        panel = get_nav_panel(dataset)
+        navs = panel.navs[:, panel.asset_columns(self.assets)]
+        rows = ~np.isnan(navs).any(axis=1)
+        navs = navs[rows]
+        log_growth = np.vstack([np.zeros(len(self.assets)), np.cumsum(np.log(navs[1:] / navs[:-1]), axis=0)])
+        return panel.dates[rows], log_growth
+
+    def window_index(self, months: int, dataset: str = DEFAULT_DATASET) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Value index of every rolling window of `months` months that follows the path from year 0.
+
+        Returns:
+            tuple: (dates (T+1,), index (S, months+1)); window s starts at dates[s] with value 1.
+        """
+        dates, log_growth = self._history(dataset)
+        n_windows = len(log_growth) - months
+        if months <= 0 or n_windows <= 0:
+            return dates, np.empty((0, max(months, 0) + 1))
+
+        offsets = np.arange(months + 1)
+        path_years = np.maximum(offsets - 1, 0) // 12          # growth into month k belongs to year (k-1) // 12
+        weights = self.yearly_weights(path_years[-1] + 1)[path_years]
+
+        starts = np.arange(n_windows)[:, None]
+        growth = np.exp(log_growth[starts + offsets] - log_growth[starts + 12 * path_years])
+        within = np.einsum('ska,ka->sk', growth, weights)
+
+        year_ends = np.arange(12, months + 1, 12)
+        levels = np.hstack([np.ones((n_windows, 1)), np.cumprod(within[:, year_ends], axis=1)])
+        return dates, levels[:, path_years] * within
+
+    def rolling_sip_xirrs(
+        self,
+        time_horizon: int,
+        sip_amount: float = 1000,
+        sip_step_up: float = 0.0,
+        sip_step_up_mode: Literal['percentage', 'amount'] = 'percentage',
+        dataset: str = DEFAULT_DATASET
+    ) -> np.ndarray:
+        """
+        XIRR (%) of a monthly SIP following the path in every rolling window, falling
+        back to the longest horizon the history supports like the fixed-portfolio XIRR.
+
+        Raises:
+            ValueError: If the history is too short for any window.
+        """
+        sip = normalized_sip(sip_amount, sip_step_up, sip_step_up_mode)
+        params = {'glide_path': self.cache_params(), 'time_horizon': int(time_horizon), **sip}
+        return artifact_cache.get_or_compute(
+            'glide_window_xirrs', dataset, params,
+            lambda: self._compute_sip_xirrs(
+                time_horizon, sip['sip_amount'], sip['sip_step_up'], sip['sip_step_up_mode'], dataset
+            )
+        )
+
+    def _compute_sip_xirrs(self, time_horizon, sip_amount, sip_step_up, sip_step_up_mode, dataset) -> np.ndarray:
+        months = time_horizon * 12
+        dates, index = self.window_index(months, dataset)
+        if len(index) == 0:
+            logger.warning('Inadequate data to compute returns for given time horizon. Defaulting to maximum available data.')
+            months = (len(dates) // 12 - 1) * 12
+            dates, index = self.window_index(months, dataset)
+            if len(index) == 0:
+                raise ValueError('Not enough data to compute returns.')
+
+        outflows = monthly_sip_amounts(sip_amount, months, sip_step_up, sip_step_up_mode)
+        maturity_values = (outflows / index[:, :-1]).sum(axis=1) * index[:, -1]
+
+        days = dates.astype('datetime64[D]').astype(np.int64)
+        starts = np.arange(len(index))[:, None]
+        times = (days[starts + np.arange(months + 1)] - days[starts]) / 365.0
+        return XirrCalculator()._solve_window_xirrs(times, outflows, maturity_values) * 100
+
+    def sip_return_rate(
+        self,
+        time_horizon: int,
+        mode: Literal["mean", "median", "optimistic", "pessimistic"] = "median",
+        **sip_kwargs
+    ) -> float:
+        """
+        Pre-retirement return rate (fraction) along the path, summarised like the fixed-portfolio XIRR.
+        """
+        xirr_calc = XirrCalculator()
+        xirrs = self.rolling_sip_xirrs(time_horizon, **sip_kwargs)
+        rate = xirr_calc._summarize_xirrs(xirr_calc._xirr_quantiles(xirrs), mode)
+        if xirr_diagnostics.enabled:
+            dataset = sip_kwargs.get('dataset', DEFAULT_DATASET)
+            xirr_diagnostics.record(
+                'glide_path', {'glide_path': self.cache_params(), 'time_horizon': time_horizon, **sip_kwargs},
+                mode, rate, self._history(dataset)[0], xirrs
+            )
+        return rate / 100
+
+    def swp_return_rate(
+        self,
+        withdrawal_years: int,
+        mode: Literal["mean", "median", "optimistic", "pessimistic"] = "median",
+        annual_inflation_rate: float = ANNUAL_INFLATION_RATE,
+        dataset: str = DEFAULT_DATASET
+    ) -> float:
+        """
+        Post-retirement return rate (fraction) along the path, summarised like the fixed-portfolio one.
+        """
+        returns = self.rolling_swp_returns(withdrawal_years, annual_inflation_rate, dataset)
+        return SWPBacktester().summarize_swp_returns(returns, mode)
+
+    def rolling_swp_returns(
+        self,
+        withdrawal_years: int,
+        annual_inflation_rate: float = ANNUAL_INFLATION_RATE,
+        dataset: str = DEFAULT_DATASET
+    ) -> np.ndarray:
+        """
+        Withdrawal-phase return of every rolling window following the path, as an annual rate,
+        falling back to the longest horizon the history supports.
+
+        Raises:
+            ValueError: If the history is too short for any window.
+        """
+        dates, _ = self._history(dataset)
+        available_years = (len(dates) - 1) // 12
+        if available_years < withdrawal_years:
+            logger.warning(
+                f'Inadequate data for {withdrawal_years}-year SWP windows. Defaulting to {available_years} years.'
+            )
+            withdrawal_years = available_years
+        if withdrawal_years <= 0:
+            raise ValueError('Not enough data to compute returns.')
+
+        _, index = self.window_index(withdrawal_years * 12, dataset)
+        returns_matrix = index[:, 1:] / index[:, :-1] - 1
+        return SWPBacktester().swp_returns_from_matrix(returns_matrix, annual_inflation_rate)
+
+    def yearly_return_bands(
+        self,
+        years: int,
+        percentiles: list[int],
+        dataset: str = DEFAULT_DATASET
+    ) -> np.ndarray:
+        """
+        Schedule of each path year's return across all rolling windows.
+
+        Returns:
+            np.ndarray: (len(percentiles), years) annual return per percentile and path year.
+        """
+        _, index = self.window_index(years * 12, dataset)
+        if len(index) == 0:
+            raise ValueError('Not enough data to compute returns.')
+        year_returns = index[:, 12::12] / index[:, :-1:12] - 1
+        return np.percentile(year_returns, percentiles, axis=0)
@@ -0,0 +1,229 @@
+from typing import Literal
+import numpy as np
+
+from config.config import (
+    ANNUAL_INFLATION_RATE,
+    AVG_LIFE_EXPECTANCY,
+    CONSERVATIVE_RESERVE_THRESHOLD
+)
+from models.HouseholdData import HouseholdData
+from models.SWPResult import HouseholdResult
+
+"""
+    Household Calculator: The SWPCalculator summary for every member of a
+    household as one vectorised batch.
+
+    Each member funds their share of the combined retirement expenses from
+    their own corpus and SIP. The formulas are those of SWPCalculator's current
+    and target scenarios, evaluated element-wise over (N,) member arrays, so a
+    household costs one pass instead of one analysis per member. Members who are
+    already funded get their current SIP as the SIP required, instead of an error.
+"""
+
+class HouseholdCalculator:
+    def __init__(self):
+        pass
+
+    def validate_household(self, household: HouseholdData, avg_life_expectancy: int = AVG_LIFE_EXPECTANCY) -> None:
+        """
+        Checks the inputs before any return-rate work is done.
+
+        Raises:
+            ValueError: If a member's horizons are invalid or the expense shares are inconsistent.
+        """
+        for i, member in enumerate(household.members):
+            if member.expected_retirement_age <= member.current_age:
+                raise ValueError(f'Retirement age must be greater than present age (member {i}).')
+            if avg_life_expectancy <= member.expected_retirement_age:
+                raise ValueError(f'Life expectancy must be greater than retirement age (member {i}).')
+        self.expense_shares(household)
+
+    def expense_shares(self, household: HouseholdData) -> np.ndarray:
+        """
+        Raises:
+            ValueError: If only some members give a share, or the shares do not sum to 1.
+        """
+        shares = [member.expense_share for member in household.members]
+        if all(share is None for share in shares):
+            return np.full(len(shares), 1 / len(shares))
+        if any(share is None for share in shares):
+            raise ValueError('Give an expense share for every household member or for none.')
+
+        shares = np.array(shares, dtype=np.float64)
+        if np.any(shares < 0) or not np.isclose(shares.sum(), 1.0):
+            raise ValueError('Household expense shares must be non-negative and sum to 1.')
+        return shares
+
+    def run_household_calculator(
+        self,
+        household: HouseholdData,
+        pre_retirement_return_rates: np.ndarray,
+        post_retirement_return_rates: np.ndarray,
+        annual_inflation_rate: float = ANNUAL_INFLATION_RATE,
+        avg_life_expectancy: int = AVG_LIFE_EXPECTANCY,
+        mode: Literal['aggressive', 'conservative'] = 'aggressive',
+        reserve_threshold: float = CONSERVATIVE_RESERVE_THRESHOLD
+    ) -> HouseholdResult:
+        """
+        Args:
+            household: Members and combined expenses.
+            pre_retirement_return_rates: (N,) annual return of each member's accumulation phase.
+            post_retirement_return_rates: (N,) annual return of each member's withdrawal phase.
+            mode: 'conservative' keeps a reserve aside, 'aggressive' withdraws the whole corpus.
+
+        Raises:
+            ValueError: If a member's horizons are invalid, the mode is unknown or a reserve cannot be met.
+        """
+        if mode not in ('aggressive', 'conservative'):
+            raise ValueError(f'Unknown SWP mode: {mode}')
+        self.validate_household(household, avg_life_expectancy)
+
+        members = household.members
+        current_age = np.array([m.current_age for m in members])
+        retirement_age = np.array([m.expected_retirement_age for m in members])
+        corpus = np.array([m.current_retirement_corpus for m in members], dtype=np.float64)
+        sip = np.array([m.retirement_sip for m in members], dtype=np.float64)
+        years_to_retirement = retirement_age - current_age
+        years_in_retirement = avg_life_expectancy - retirement_age
+
+        r_pre = np.asarray(pre_retirement_return_rates, dtype=np.float64)
+        r_post = np.asarray(post_retirement_return_rates, dtype=np.float64)
+        expenses = household.expected_retirement_expenses * self.expense_shares(household)
+
+        future_value = self._future_values(household, corpus, sip, r_pre, annual_inflation_rate, years_to_retirement)
+        target_corpus = self._target_corpora(
+            expenses, r_post, annual_inflation_rate, years_to_retirement, years_in_retirement
+        )
+
+        if mode == 'conservative':
+            swp_current = self._swp_with_reserve_pct(future_value, r_post, years_in_retirement, reserve_threshold)
+            swp_target = self._swp_with_reserve_pct(target_corpus, r_post, years_in_retirement, reserve_threshold)
+        else:
+            swp_current = self._inflation_stepped_swp(future_value, r_post, years_in_retirement, annual_inflation_rate)
+            swp_target = self._flat_swp(target_corpus, r_post, years_in_retirement)
+
+        # Same denominator as SWPCalculator._compute_manual_uninvested_withdrawals
+        manual_months = 12 * (avg_life_expectancy - retirement_age + 1)
+
+        return HouseholdResult(
+            names=[m.name for m in members],
+            current_corpus_future_value=future_value,
+            ideal_target_corpus=target_corpus,
+            corpus_gap=np.round(target_corpus - future_value).astype(np.int64),
+            adequacy=np.round(future_value / target_corpus * 100).astype(np.int64),
+            extra_sip_required=sip + self._extra_sips(future_value, target_corpus, r_pre, years_to_retirement),
+            manual_swp_current=np.round(future_value / manual_months).astype(np.int64),
+            manual_swp_target=np.round(target_corpus / manual_months).astype(np.int64),
+            safe_swp_current=swp_current,
+            safe_swp_target=swp_target,
+            pre_retirement_return_rate=r_pre,
+            post_retirement_return_rate=r_post
+        )
+
+    def _future_values(
+        self,
+        household: HouseholdData,
+        corpus: np.ndarray,
+        sip: np.ndarray,
+        r_pre: np.ndarray,
+        annual_inflation_rate: float,
+        years: np.ndarray
+    ) -> np.ndarray:
+        """
+        Corpus plus stepped-up SIPs at retirement, as in SWPCalculator._compute_retirement_corpus_future_value.
+        Members' SIP years are laid out on a (N, max years) grid, masked past each member's horizon.
+        """
+        step_up = np.array([m.sip_step_up for m in household.members], dtype=np.float64)[:, None]
+        percentage = np.array([m.sip_step_up_mode == 'percentage' for m in household.members])[:, None]
+
+        year_idx = np.arange(years.max())
+        active = year_idx < years[:, None]
+        year_sips = np.where(percentage, sip[:, None] * (1 + step_up) ** year_idx, sip[:, None] + step_up * year_idx)
+
+        r_m = (r_pre / 12)[:, None]
+        year_sip_future = (1 + r_m) * ((1 + r_m) ** 12 - 1) / r_m
+        years_remaining = years[:, None] - 1 - year_idx
+        sip_future = np.where(active, year_sips * year_sip_future * (1 + r_m) ** (12 * years_remaining), 0.0).sum(axis=1)
+
+        lumpsum_future = corpus * (1 + r_pre) ** years
+        return np.round((lumpsum_future + sip_future) * (1 + annual_inflation_rate) ** years).astype(np.int64)
+
+    def _target_corpora(
+        self,
+        expenses: np.ndarray,
+        r_post: np.ndarray,
+        annual_inflation_rate: float,
+        years_to_retirement: np.ndarray,
+        years_in_retirement: np.ndarray
+    ) -> np.ndarray:
+        """
+        PV at retirement of inflated expenses at the real return, as in SWPCalculator._compute_target_retirement_corpus.
+        """
+        future_expenses = expenses * (1 + annual_inflation_rate) ** years_to_retirement
+        real_return = (1 + r_post) / (1 + annual_inflation_rate) - 1
+        months = years_in_retirement * 12
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            annuity = (1 - (1 + real_return / 12) ** -months) / (real_return / 12)
+        target = np.where(np.abs(real_return) < 1e-6, future_expenses * months, future_expenses * annuity)
+        return np.round(target).astype(np.int64)
+
+    def _swp_with_reserve_pct(
+        self,
+        corpus: np.ndarray,
+        r_post: np.ndarray,
+        years: np.ndarray,
+        reserve_pct: float
+    ) -> np.ndarray:
+        """
+        As SWPCalculator.compute_swp_with_reserve_pct.
+        """
+        n = years * 12
+        r_m = (1 + r_post) ** (1 / 12) - 1
+        pv_for_swp = corpus - corpus * reserve_pct / (1 + r_m) ** n
+        if np.any(pv_for_swp <= 0):
+            raise ValueError("Reserve requirement too large for given corpus/horizon.")
+        return np.round(pv_for_swp * r_m / (1 - (1 + r_m) ** -n), 2)
+
+    def _inflation_stepped_swp(
+        self,
+        corpus: np.ndarray,
+        r_post: np.ndarray,
+        years: np.ndarray,
+        annual_inflation_rate: float
+    ) -> np.ndarray:
+        """
+        As SWPCalculator._compute_monthly_swp_with_annual_inflation.
+        """
+        r = (1 + r_post) ** (1 / 12) - 1
+        A = (1 - (1 + r) ** -12) / r
+        q = (1 + annual_inflation_rate) / (1 + r) ** 12
+        return np.round(corpus / (A * (1 - q ** years) / (1 - q)), 2)
+
+    def _flat_swp(self, corpus: np.ndarray, r_post: np.ndarray, years: np.ndarray) -> np.ndarray:
+        """
+        As SWPCalculator._compute_monthly_swp_amt.
+        """
+        r = (1 + r_post) ** (1 / 12) - 1
+        return np.round(corpus * r / (1 - (1 + r) ** (-years * 12)), 2)
+
+    def _extra_sips(
+        self,
+        future_value: np.ndarray,
+        target_corpus: np.ndarray,
+        r_pre: np.ndarray,
+        years: np.ndarray
+    ) -> np.ndarray:
+        """
+        Additional monthly SIP that closes each member's gap, as SWPCalculator._compute_extra_sip_amt; 0 if funded.
+
+        Raises:
+            ValueError: If a member's pre-retirement return is too low.
+        """
+        R = 1 + r_pre / 12
+        if np.any(R < 1):
+            raise ValueError('Return rate too low.')
+
+        gap = target_corpus - future_value
+        extra = gap / (R ** (12 * years) - 1) * r_pre / (12 * R)
+        return np.where(gap > 0, np.round(extra, 2), 0.0)
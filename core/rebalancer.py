@@ -0,0 +1,223 @@
+from dataclasses import dataclass
+from typing import Literal
+import numpy as np
+
+from config.config import DEFAULT_DATASET, REBALANCE_FREQUENCY, REBALANCE_TOLERANCE
+from utils.nav_panel import get_nav_panel
+
+"""
+    Rebalancer: Composite NAV of portfolios held at fixed target allocations,
+    rebalanced back to target every month, quarter or year.
+
+    Works on value weights and the aligned per-asset monthly growth matrix of
+    the NAV panel, for many (portfolio, policy) pairs at once:
+      - calendar policies (and buy-and-hold) are closed form: within a period each
+        asset grows by its cumulative growth since the last rebalance, and the
+        level at each rebalance is the product of the completed periods' factors
+      - tolerance-band policies depend on the drift path, so they are scanned
+        month by month, vectorised across every banded pair
+
+    A band policy checks the drift on each calendar rebalance date and only
+    rebalances if some asset's weight is more than `tolerance` away from target.
+"""
+
+REBALANCE_PERIOD_MONTHS = {
+    'none': None,           # buy-and-hold from the target allocation
+    'monthly': 1,
+    'quarterly': 3,
+    'annual': 12
+}
+
+
+@dataclass(frozen=True, slots=True)
+class RebalancePolicy:
+    """
+    Attributes:
+        frequency: 'none', 'monthly', 'quarterly' or 'annual'.
+        tolerance: Absolute weight drift (e.g. 0.05) that triggers a rebalance on a
+                   calendar date; None rebalances on every calendar date.
+    """
+    frequency: Literal['none', 'monthly', 'quarterly', 'annual'] = REBALANCE_FREQUENCY
+    tolerance: float | None = REBALANCE_TOLERANCE
+
+    def __post_init__(self):
+        if self.frequency not in REBALANCE_PERIOD_MONTHS:
+            raise ValueError(f'Unknown rebalancing frequency: {self.frequency}')
+        if self.tolerance is not None and self.tolerance < 0:
+            raise ValueError('Rebalancing tolerance must be non-negative.')
+
+    @property
+    def period_months(self) -> int | None:
+        return REBALANCE_PERIOD_MONTHS[self.frequency]
+
+    def to_dict(self) -> dict:
+        return {'frequency': self.frequency, 'tolerance': self.tolerance}
+
+
+def _calendar_growth(log_growth: np.ndarray, weights: np.ndarray, period: int | None) -> np.ndarray:
+    """
+    Closed-form portfolio index for one rebalancing period and many weight vectors.
+
+    Args:
+        log_growth: (..., T+1, A) cumulative log growth per asset, month 0 all zeros;
+                    leading axes are independent histories (e.g. bootstrapped paths).
+        weights: (P, A) target value weights.
+        period: Months between rebalances; None for buy-and-hold.
+
+    Returns:
+        np.ndarray: (..., T+1, P) portfolio index, 1 at month 0.
+    """
+    months = np.arange(log_growth.shape[-2])
+    if period is None:
+        starts = np.zeros_like(months)
+    else:
+        # Last rebalance strictly before each month; the rebalance at month k applies from k + 1
+        starts = np.maximum(months - 1, 0) // period * period
+
+    within = np.exp(log_growth - log_growth[..., starts, :]) @ weights.T
+    if period is None:
+        return within
+
+    period_ends = np.arange(period, len(months), period)
+    first = np.ones(within.shape[:-2] + (1, weights.shape[0]))
+    levels = np.concatenate([first, np.cumprod(within[..., period_ends, :], axis=-2)], axis=-2)
+    return levels[..., starts // period, :] * within
+
+
+def _banded_growth(
+    growth: np.ndarray,
+    weights: np.ndarray,
+    periods: np.ndarray,
+    tolerances: np.ndarray
+) -> np.ndarray:
+    """
+    Portfolio index under tolerance-band rebalancing, scanned month by month for all pairs at once.
+
+    Args:
+        growth: (T, A) month-over-month growth factor per asset.
+        weights: (P, A) target value weights.
+        periods: (P,) months between drift checks.
+        tolerances: (P,) drift that triggers a rebalance.
+
+    Returns:
+        np.ndarray: (T+1, P) portfolio index, 1 at row 0.
+    """
+    values = weights.copy()
+    index = np.empty((len(growth) + 1, len(weights)))
+    index[0] = 1.0
+
+    for m in range(1, len(growth) + 1):
+        values *= growth[m - 1]
+        totals = values.sum(axis=1)
+        index[m] = totals
+
+        check = m % periods == 0
+        if check.any():
+            drift = np.abs(values / totals[:, None] - weights).max(axis=1)
+            rebalance = check & (drift > tolerances)
+            values[rebalance] = totals[rebalance, None] * weights[rebalance]
+
+    return index
+
+
+def rebalanced_growth(growth: np.ndarray, weights: np.ndarray, policies: list[RebalancePolicy]) -> np.ndarray:
+    """
+    Index of every (weights[i], policies[i]) pair over a shared growth history.
+
+    Args:
+        growth: (T, A) month-over-month growth factor (1 + return) per asset.
+        weights: (P, A) target allocations; each row is normalised to sum to 1.
+        policies: P rebalancing policies, one per row of weights.
+
+    Returns:
+        np.ndarray: (T+1, P) portfolio index, 1 at the first date.
+
+    Raises:
+        ValueError: If shapes disagree or an allocation does not sum to a positive total.
+    """
+    weights = np.atleast_2d(np.asarray(weights, dtype=np.float64))
+    if len(policies) != len(weights):
+        raise ValueError('Need exactly one rebalancing policy per portfolio.')
+    totals = weights.sum(axis=1, keepdims=True)
+    if np.any(totals <= 0):
+        raise ValueError('Portfolio weights must sum to a positive total.')
+    weights = weights / totals
+
+    index = np.empty((len(growth) + 1, len(weights)))
+    log_growth = np.vstack([np.zeros(growth.shape[1]), np.cumsum(np.log(growth), axis=0)])
+
+    # Calendar policies: one closed-form pass per distinct period
+    calendar = [i for i, p in enumerate(policies) if p.tolerance is None or p.period_months is None]
+    for period in {policies[i].period_months for i in calendar}:
+        members = [i for i in calendar if policies[i].period_months == period]
+        index[:, members] = _calendar_growth(log_growth, weights[members], period)
+
+    banded = [i for i in range(len(policies)) if i not in set(calendar)]
+    if banded:
+        index[:, banded] = _banded_growth(
+            growth,
+            weights[banded],
+            np.array([policies[i].period_months for i in banded]),
+            np.array([policies[i].tolerance for i in banded])
+        )
+
+    return index
+
+
+def rebalanced_path_growth(growth: np.ndarray, weights: dict[str, float] | np.ndarray, policy: RebalancePolicy) -> np.ndarray:
+    """
+    Index of one allocation over many independent growth histories, e.g. bootstrapped paths.
+
+    Args:
+        growth: (N, T, A) month-over-month growth factor per path, month and asset.
+        weights: (A,) target allocation; normalised to sum to 1.
+        policy: Rebalancing policy applied on every path.
+
+    Returns:
+        np.ndarray: (N, T+1) portfolio index per path, 1 at month 0.
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    if weights.sum() <= 0:
+        raise ValueError('Portfolio weights must sum to a positive total.')
+    weights = weights / weights.sum()
+
+    if policy.tolerance is None or policy.period_months is None:
+        log_growth = np.cumsum(np.log(growth), axis=1)
+        log_growth = np.concatenate([np.zeros_like(log_growth[:, :1]), log_growth], axis=1)
+        return _calendar_growth(log_growth, weights[None, :], policy.period_months)[..., 0]
+
+    # The band scan broadcasts a (T, A) history over its rows; a (T, N, A) one gives each row its own path
+    n_paths = len(growth)
+    return _banded_growth(
+        growth.transpose(1, 0, 2),
+        np.tile(weights, (n_paths, 1)),
+        np.full(n_paths, policy.period_months),
+        np.full(n_paths, policy.tolerance)
+    ).T
+
+
+def rebalanced_composite_navs(
+    portfolios: list[dict[str, float]],
+    policies: list[RebalancePolicy],
+    dataset: str = DEFAULT_DATASET
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Rebalanced composite NAVs of many portfolios, over the dates on which every
+    asset used by any of them has a NAV.
+
+    Returns:
+        tuple: (dates (T+1,), navs (T+1, P)), each series starting at 1.
+
+    Raises:
+        ValueError: If an asset is not part of the dataset, or the assets share no history.
+    """
+    panel = get_nav_panel(dataset)
+    assets = list(dict.fromkeys(name for portfolio in portfolios for name in portfolio))
+    navs = panel.navs[:, panel.asset_columns(assets)]
+    rows = ~np.isnan(navs).any(axis=1)
+    if rows.sum() < 2:
+        raise ValueError('Portfolio assets share no common history.')
+
+    navs = navs[rows]
+    weights = np.array([[portfolio.get(name, 0.0) for name in assets] for portfolio in portfolios])
+    return panel.dates[rows], rebalanced_growth(navs[1:] / navs[:-1], weights, policies)
@@ -0,0 +1,150 @@
+from typing import Literal
+import numpy as np
+
+from config.config import (
+    BOOTSTRAP_DATASET,
+    BOOTSTRAP_MEAN_BLOCK_LENGTH,
+    BOOTSTRAP_METHOD,
+    BOOTSTRAP_SEED,
+    BOOTSTRAP_STREAM_PATHS
+)
+from utils.nav_panel import get_nav_panel
+
+"""
+    Return Bootstrapper: Draws synthetic multi-asset monthly return paths by
+    resampling whole blocks of months from the aligned INR NAV panel.
+
+    Every month of a path copies one historical month for all assets at once,
+    which keeps the cross-asset correlation; consecutive months are copied in
+    blocks, which keeps the autocorrelation. Blocks wrap around the end of the
+    history (circular bootstrap), so every month is equally likely to be drawn.
+
+      - stationary: block lengths are geometric with the given mean (Politis-Romano)
+      - moving: every block has exactly the given length
+
+    Paths are generated in fixed groups of BOOTSTRAP_STREAM_PATHS, each group from
+    its own child stream of the seed. Path i is therefore the same whichever chunk,
+    process or call produces it, so parallel and chunked generation are reproducible.
+"""
+
+class ReturnBootstrapper:
+    def __init__(
+        self,
+        assets: list[str] | None = None,
+        dataset: str = BOOTSTRAP_DATASET,
+        method: Literal['stationary', 'moving'] = BOOTSTRAP_METHOD,
+        mean_block_length: float = BOOTSTRAP_MEAN_BLOCK_LENGTH,
+        seed: int = BOOTSTRAP_SEED
+    ):
+        """
+        Args:
+            assets: Assets to draw, in tensor column order; defaults to every asset of the dataset.
+            dataset: Key into NAV_DATASETS.
+            method: 'stationary' or 'moving' block bootstrap.
+            mean_block_length: Mean (stationary) or exact (moving) block length, in months.
+            seed: Root seed of all path streams.
+
+        Raises:
+            ValueError: If the method or block length is invalid, an asset is unknown,
+                        or the assets share no common history.
+        """
+        if method not in ('stationary', 'moving'):
+            raise ValueError(f'Unknown bootstrap method: {method}')
+        if mean_block_length < 1:
+            raise ValueError('Block length must be at least one month.')
+
+        panel = get_nav_panel(dataset)
+        self.assets = list(assets) if assets is not None else list(panel.assets)
+        self.dataset = dataset
+        self.method = method
+        self.mean_block_length = mean_block_length
+        self.seed = seed
+
+        returns = panel.returns[:, panel.asset_columns(self.assets)]
+        self.source_returns = self._common_history(returns)
+
+    def _common_history(self, returns: np.ndarray) -> np.ndarray:
+        """
+        Longest run of consecutive months in which every asset has a return.
+        Months outside it are dropped rather than skipped over, so blocks never bridge a gap.
+        """
+        valid = ~np.isnan(returns).any(axis=1)
+        if not valid.any():
+            raise ValueError(f'Assets {self.assets} share no common history in dataset "{self.dataset}".')
+
+        # Run boundaries: +1 where a valid run starts, -1 just past where it ends
+        edges = np.diff(np.concatenate(([0], valid.astype(np.int8), [0])))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        longest = int(np.argmax(ends - starts))
+        return np.ascontiguousarray(returns[starts[longest]:ends[longest]])
+
+    def generate(
+        self,
+        num_paths: int,
+        months: int,
+        first_path: int = 0,
+        dtype=np.float64
+    ) -> np.ndarray:
+        """
+        Draws paths [first_path, first_path + num_paths) of the bootstrap.
+
+        Returns:
+            np.ndarray: (num_paths, months, assets) monthly returns.
+        """
+        if num_paths <= 0 or months <= 0:
+            raise ValueError('Number of paths and months must be positive.')
+
+        out = np.empty((num_paths, months, len(self.assets)), dtype=dtype)
+        last_path = first_path + num_paths
+        first_group = first_path // BOOTSTRAP_STREAM_PATHS
+        last_group = (last_path - 1) // BOOTSTRAP_STREAM_PATHS
+
+        for group in range(first_group, last_group + 1):
+            group_start = group * BOOTSTRAP_STREAM_PATHS
+            lo = max(first_path, group_start)
+            hi = min(last_path, group_start + BOOTSTRAP_STREAM_PATHS)
+
+            indices = self._draw_month_indices(group, months)[lo - group_start:hi - group_start]
+            out[lo - first_path:hi - first_path] = self.source_returns[indices]
+
+        return out
+
+    def iter_chunks(
+        self,
+        num_paths: int,
+        months: int,
+        chunk_paths: int = BOOTSTRAP_STREAM_PATHS,
+        dtype=np.float64
+    ):
+        """
+        Yields (first_path, chunk) pairs covering num_paths paths, at most chunk_paths at a time,
+        so peak memory is bounded by the chunk rather than the full tensor.
+        Concatenating the chunks gives exactly generate(num_paths, months).
+        """
+        for first_path in range(0, num_paths, chunk_paths):
+            count = min(chunk_paths, num_paths - first_path)
+            yield first_path, self.generate(count, months, first_path=first_path, dtype=dtype)
+
+    def _draw_month_indices(self, group: int, months: int) -> np.ndarray:
+        """
+        (BOOTSTRAP_STREAM_PATHS, months) indices into source_returns for one path group.
+        """
+        rng = np.random.default_rng(np.random.SeedSequence(self.seed, spawn_key=(group,)))
+        num_source = len(self.source_returns)
+        t = np.arange(months)
+
+        if self.method == 'moving':
+            block_length = int(round(self.mean_block_length))
+            block_starts = rng.integers(0, num_source, size=(BOOTSTRAP_STREAM_PATHS, -(-months // block_length)))
+            return (block_starts[:, t // block_length] + t % block_length) % num_source
+
+        # Stationary: each month starts a new block with probability 1 / mean length
+        new_block = rng.random((BOOTSTRAP_STREAM_PATHS, months)) < 1.0 / self.mean_block_length
+        new_block[:, 0] = True
+        block_starts = rng.integers(0, num_source, size=(BOOTSTRAP_STREAM_PATHS, months))
+
+        # Month at which the block covering each month began
+        block_origin = np.maximum.accumulate(np.where(new_block, t, 0), axis=1)
+        origin_starts = np.take_along_axis(block_starts, block_origin, axis=1)
+        return (origin_starts + t - block_origin) % num_source
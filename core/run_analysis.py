@@ -1,23 +1,32 @@
 from typing import Literal
+import numpy as np
 from config.config import (
-    AGGRESSIVE_PORTFOLIO, 
-    AVG_LIFE_EXPECTANCY, 
-    BALANCED_PORTFOLIO, 
-    CONSERVATIVE_PORTFOLIO,
+    ANNUAL_INFLATION_RATE,
+    FAN_CHART_PATHS,
     PRE_RETIREMENT_RETURN_RATE,
     POST_RETIREMENT_RETURN_RATE
 )
+from core.fan_chart import corpus_fan_chart
+from core.glide_path import GlidePath
+from core.household_calculator import HouseholdCalculator
+from core.swp_backtester import SWPBacktester
 from core.swp_calculator import SWPCalculator
 from core.xirr_calculator import XirrCalculator
 from core.exceptions import CriticalInternalError
+from models.HouseholdData import HouseholdData
+from models.SWPResult import FanChartResult, HouseholdResult, SWPResult
 from models.UserData import UserData
+from utils.config_snapshot import current_snapshot, pinned_snapshot
 from utils.logger import get_logger
+from utils.memory_tracker import track_stage
+from utils.task_graph import Node, run_graph
 
 logger = get_logger()
 
 def get_relevant_portfolio(risk_level: Literal['conservative', 'aggressive', 'balanced']):
     """
-    Retrieve the investment portfolio allocation corresponding to a given risk level.
+    Retrieve the investment portfolio allocation corresponding to a given risk level,
+    as defined by the current config snapshot.
 
     Args:
         risk_level (Literal): Risk tolerance category. Accepted values:
@@ -31,21 +40,81 @@ def get_relevant_portfolio(risk_level: Literal['conservative', 'aggressive', 'ba
     Raises:
         ValueError: If the provided risk level is not one of the accepted values.
     """
-    if risk_level == 'conservative':
-        return CONSERVATIVE_PORTFOLIO
-    if risk_level == 'balanced':
-        return BALANCED_PORTFOLIO
-    if risk_level == 'aggressive':
-        return AGGRESSIVE_PORTFOLIO
-    raise ValueError()
+    return current_snapshot().portfolio(risk_level)
 
 
+def _rate_fallback(phase: str, default_rate: float):
+    """
+    Falls back to the configured rate when the history cannot produce one (too short,
+    no convergence); any other failure is a bug and propagates.
+    """
+    def fallback(error: Exception) -> float:
+        if not isinstance(error, (ValueError, ArithmeticError)):
+            raise error
+        logger.warning(f'{phase} return rate computation failed ({error}). Defaulting to fallback {default_rate}.')
+        return default_rate
+    return fallback
+
+
+def _sip_kwargs(retirement_sip: float, sip_step_up: float, sip_step_up_mode: str) -> dict:
+    """
+    Simulate the user's own SIP pattern; a zero SIP falls back to the flat reference SIP.
+    """
+    if retirement_sip <= 0:
+        return {}
+    return dict(sip_amount=retirement_sip, sip_step_up=sip_step_up, sip_step_up_mode=sip_step_up_mode)
+
+
+def _pre_retirement_rate(portfolio: dict, time_to_retirement: int, sip_kwargs: dict, accumulation_path=None) -> float:
+    with track_stage('pre_retirement_xirr'):
+        if accumulation_path is not None:
+            rate = accumulation_path.sip_return_rate(time_to_retirement, **sip_kwargs)
+        else:
+            rate = XirrCalculator().compute_portfolio_rolling_xirr(
+                portfolio=portfolio,
+                time_horizon=time_to_retirement,
+                **sip_kwargs
+            )
+    logger.info(f'Pre-retirement return rate computed: {rate}.')
+    return rate
+
+
+def _post_retirement_rate(
+    portfolio: dict,
+    time_post_retirement: int,
+    withdrawal_path=None,
+    annual_inflation_rate: float = ANNUAL_INFLATION_RATE
+) -> float:
+    # Post-retirement is a lump sum with inflation-stepped withdrawals, not a SIP
+    with track_stage('post_retirement_return'):
+        if withdrawal_path is not None:
+            rate = withdrawal_path.swp_return_rate(time_post_retirement, annual_inflation_rate=annual_inflation_rate)
+        else:
+            rate = SWPBacktester().compute_portfolio_rolling_swp_return(
+                portfolio=portfolio,
+                withdrawal_years=time_post_retirement,
+                annual_inflation_rate=annual_inflation_rate
+            )
+    logger.info(f'Post-retirement return rate computed: {rate}')
+    return rate
+
+
+def _abort_analysis(error: Exception):
+    logger.error('SWP data computation failed. Aborting.')
+    # Called after the step has failed, outside its except block, so attach the traceback explicitly
+    logger.error(error, exc_info=error)
+    raise CriticalInternalError() from error
+
+
+@pinned_snapshot()
 def runAnalysis(
     user_data: UserData,
     swp_mode: Literal['aggressive', 'conservative'],
     pre_retirement_risk: Literal['conservative', 'aggressive', 'balanced'],
-    post_retirement_risk: Literal['conservative', 'aggressive', 'balanced']
-):
+    post_retirement_risk: Literal['conservative', 'aggressive', 'balanced'],
+    glide_path: str | None = None,
+    allow_funded: bool = False
+) -> SWPResult:
     """
     Perform a complete pre-retirement and post-retirement portfolio analysis, 
     followed by a Systematic Withdrawal Plan (SWP) calculation.
@@ -53,9 +122,13 @@ def runAnalysis(
     This function:
       1. Determines the user's pre-retirement and post-retirement time horizons.
       2. Selects portfolio allocations for both phases based on risk profiles.
-      3. Computes expected rolling XIRR (annualized returns) for each phase.
+      3. Computes expected rolling returns for each phase: SIP XIRR before retirement,
+         withdrawal-phase return of lump sum + inflation-stepped SWP after retirement.
       4. Runs SWP calculations to estimate required investments/withdrawals.
 
+    Portfolios, inflation and life expectancy come from one config snapshot, pinned
+    for the whole analysis even if a reload goes live while it runs.
+
     Args:
         user_data (UserData): User's financial and demographic inputs, 
                               including current age and retirement goals.
@@ -66,19 +139,27 @@ def runAnalysis(
                                        Accepted: 'conservative', 'aggressive', 'balanced'
         post_retirement_risk (Literal): Risk profile after retirement.
                                         Accepted: 'conservative', 'aggressive', 'balanced'
+        glide_path (str | None): Name of a configured glide path. If given, both return rates
+                                 follow its year-by-year allocations instead of the risk portfolios.
+        allow_funded (bool): Report a user who is already funded with their current SIP as the
+                             SIP required instead of failing the analysis.
 
     Returns:
-        dict: SWP calculation results, containing:
+        SWPResult: SWP calculation results, containing:
               - corpus at retirement
               - sustainable withdrawals
               - portfolio performance estimates
+              - current and target corpus schedules
 
     Raises:
         CriticalInternalError: If required portfolio allocations or computations fail.
     """
+    snapshot = current_snapshot()
+    inflation, life_expectancy = snapshot.annual_inflation_rate, snapshot.avg_life_expectancy
+
     # Time horizon calculations
     time_to_retirement = user_data.expected_retirement_age - user_data.current_age
-    time_post_retirement = AVG_LIFE_EXPECTANCY - user_data.expected_retirement_age
+    time_post_retirement = life_expectancy - user_data.expected_retirement_age
 
     # Get pre-retirement portfolio
     try:
@@ -96,41 +177,248 @@ def runAnalysis(
         logger.critical('Relevant portfolio for post-retirement risk not found. Aborting.')
         raise CriticalInternalError()
 
-    # Compute rolling XIRR for both periods
-    xirr_calc = XirrCalculator()
-    try:
-        pre_retirement_return_rate = xirr_calc.compute_portfolio_rolling_xirr(
-            portfolio=pre_retirement_portfolio, 
-            time_horizon=time_to_retirement
-        )
-        logger.info(f'Pre-retirement return rate computed: {pre_retirement_return_rate}.')
-    except Exception:
-        logger.warning('Pre-retirement return rate computation failed. Defaulting to fallback.')
-        pre_retirement_return_rate = PRE_RETIREMENT_RETURN_RATE
-    
-    try:
-        post_retirement_return_rate = xirr_calc.compute_portfolio_rolling_xirr(
-            portfolio=post_retirement_portfolio, 
-            time_horizon=time_post_retirement
-        )
-        logger.info(f'Post-retirement return rate computed: {post_retirement_return_rate}')
-    except Exception:
-        logger.warning('Post-retirement return rate computation failed. Defaulting to fallback.')
-        post_retirement_return_rate = POST_RETIREMENT_RETURN_RATE
+    sip_kwargs = _sip_kwargs(user_data.retirement_sip, user_data.sip_step_up, user_data.sip_step_up_mode)
 
-    # Run SWP calculator
     swp_calc = SWPCalculator()
-    try:
-        results = swp_calc.run_swp_calculator(
-            user_data,
-            pre_retirement_return_rate=pre_retirement_return_rate,
-            post_retirement_return_rate=post_retirement_return_rate,
-            mode=swp_mode
-        )
+    accumulation_path = withdrawal_path = None
+    if glide_path is not None:
+        accumulation_path, withdrawal_path = GlidePath.for_user(glide_path, time_to_retirement, time_post_retirement)
+
+    def pre_retirement_return():
+        return _pre_retirement_rate(pre_retirement_portfolio, time_to_retirement, sip_kwargs, accumulation_path)
+
+    def post_retirement_return():
+        return _post_retirement_rate(post_retirement_portfolio, time_post_retirement, withdrawal_path, inflation)
+
+    def current_scenario(pre_retirement_return, post_retirement_return):
+        with track_stage('current_scenario'):
+            return swp_calc.compute_current_scenario(
+                user_data, pre_retirement_return, post_retirement_return, inflation, life_expectancy, mode=swp_mode
+            )
+
+    def target_scenario(post_retirement_return):
+        with track_stage('target_scenario'):
+            return swp_calc.compute_target_scenario(
+                user_data, post_retirement_return, inflation, life_expectancy, mode=swp_mode
+            )
+
+    def result(current_scenario, target_scenario, pre_retirement_return):
+        with track_stage('swp_calculator'):
+            results = swp_calc.combine_scenarios(
+                user_data, current_scenario, target_scenario, pre_retirement_return, inflation, life_expectancy,
+                allow_funded=allow_funded
+            )
         logger.info('SWP data computation complete.')
-    except Exception as e:
-        logger.error('SWP data computation failed. Aborting.')
-        logger.exception(e)
-        raise CriticalInternalError()
+        return results
+
+    # The target scenario needs only the post-retirement return, so it runs alongside the pre-retirement XIRR
+    outputs = run_graph([
+        Node('pre_retirement_return', pre_retirement_return,
+             fallback=_rate_fallback('Pre-retirement', PRE_RETIREMENT_RETURN_RATE)),
+        Node('post_retirement_return', post_retirement_return,
+             fallback=_rate_fallback('Post-retirement', POST_RETIREMENT_RETURN_RATE)),
+        Node('current_scenario', current_scenario, ('pre_retirement_return', 'post_retirement_return'),
+             fallback=_abort_analysis),
+        Node('target_scenario', target_scenario, ('post_retirement_return',), fallback=_abort_analysis),
+        Node('result', result, ('current_scenario', 'target_scenario', 'pre_retirement_return'),
+             fallback=_abort_analysis)
+    ])
+    results = outputs['result']
 
     return results
+
+
+@pinned_snapshot()
+def runHouseholdAnalysis(
+    household: HouseholdData,
+    swp_mode: Literal['aggressive', 'conservative'],
+    pre_retirement_risk: Literal['conservative', 'aggressive', 'balanced'],
+    post_retirement_risk: Literal['conservative', 'aggressive', 'balanced'],
+    glide_path: str | None = None
+) -> HouseholdResult:
+    """
+    runAnalysis for every member of a household against a combined expense target.
+
+    Members invest in the same risk portfolios, so return rates are computed once per
+    distinct pre-retirement horizon and SIP pattern and once per distinct withdrawal
+    horizon, all as steps of one task graph. The per-member SWP math then runs as a
+    single vectorised batch.
+
+    Args:
+        household (HouseholdData): Members and the household's combined monthly expenses.
+        swp_mode, pre_retirement_risk, post_retirement_risk, glide_path: As for runAnalysis.
+
+    Returns:
+        HouseholdResult: Per-member and combined corpus, target, adequacy and SWPs.
+
+    Raises:
+        ValueError: If a member's horizons or the expense shares are invalid.
+        CriticalInternalError: If required portfolio allocations or computations fail.
+    """
+    snapshot = current_snapshot()
+    inflation, life_expectancy = snapshot.annual_inflation_rate, snapshot.avg_life_expectancy
+
+    household_calc = HouseholdCalculator()
+    household_calc.validate_household(household, life_expectancy)
+
+    try:
+        pre_retirement_portfolio = get_relevant_portfolio(pre_retirement_risk)
+        post_retirement_portfolio = get_relevant_portfolio(post_retirement_risk)
+    except ValueError:
+        logger.critical('Relevant portfolio for given risk not found. Aborting.')
+        raise CriticalInternalError()
+
+    member_pre_keys, member_post_keys = [], []
+    pre_steps, post_steps = {}, {}
+    for member in household.members:
+        time_to_retirement = member.expected_retirement_age - member.current_age
+        time_post_retirement = life_expectancy - member.expected_retirement_age
+        sip_kwargs = _sip_kwargs(member.retirement_sip, member.sip_step_up, member.sip_step_up_mode)
+
+        pre_key = f'pre_retirement_return:{time_to_retirement}:{sorted(sip_kwargs.items())}'
+        post_key = f'post_retirement_return:{time_post_retirement}'
+        member_pre_keys.append(pre_key)
+        member_post_keys.append(post_key)
+        if pre_key in pre_steps and post_key in post_steps:
+            continue
+
+        accumulation_path = withdrawal_path = None
+        if glide_path is not None:
+            accumulation_path, withdrawal_path = GlidePath.for_user(glide_path, time_to_retirement, time_post_retirement)
+        pre_steps.setdefault(pre_key, (
+            lambda t=time_to_retirement, kw=sip_kwargs, path=accumulation_path:
+                _pre_retirement_rate(pre_retirement_portfolio, t, kw, path)
+        ))
+        post_steps.setdefault(post_key, (
+            lambda w=time_post_retirement, path=withdrawal_path:
+                _post_retirement_rate(post_retirement_portfolio, w, path, inflation)
+        ))
+
+    def result(**rates):
+        with track_stage('household_calculator'):
+            results = household_calc.run_household_calculator(
+                household,
+                np.array([rates[key] for key in member_pre_keys]),
+                np.array([rates[key] for key in member_post_keys]),
+                annual_inflation_rate=inflation,
+                avg_life_expectancy=life_expectancy,
+                mode=swp_mode
+            )
+        logger.info(f'Household SWP data computation complete for {len(household.members)} members.')
+        return results
+
+    nodes = [
+        Node(key, step, fallback=_rate_fallback('Pre-retirement', PRE_RETIREMENT_RETURN_RATE))
+        for key, step in pre_steps.items()
+    ] + [
+        Node(key, step, fallback=_rate_fallback('Post-retirement', POST_RETIREMENT_RETURN_RATE))
+        for key, step in post_steps.items()
+    ]
+    nodes.append(Node('result', result, tuple(pre_steps) + tuple(post_steps), fallback=_abort_analysis))
+    return run_graph(nodes)['result']
+
+
+@pinned_snapshot()
+def runBacktest(
+    user_data: UserData,
+    swp_mode: Literal['aggressive', 'conservative'],
+    pre_retirement_risk: Literal['conservative', 'aggressive', 'balanced'],
+    post_retirement_risk: Literal['conservative', 'aggressive', 'balanced'],
+    dataset: str | None = None,
+    glide_path: str | None = None
+):
+    """
+    Replay the user's current-scenario SWP through every historical start month
+    of the post-retirement portfolio's actual returns.
+
+    The corpus at retirement, the safe monthly SWP and the reserve are taken from
+    runAnalysis, so the backtest stress-tests exactly the plan the user is shown.
+
+    Args:
+        user_data (UserData): User's financial and demographic inputs.
+        swp_mode (Literal): 'aggressive' (no reserve) or 'conservative' (reserve kept aside).
+        pre_retirement_risk (Literal): Risk profile before retirement.
+        post_retirement_risk (Literal): Risk profile after retirement, replayed in the backtest.
+        dataset (str | None): NAV dataset to replay; defaults to BACKTEST_DATASET, or DEFAULT_DATASET
+                              if that lacks an asset of the post-retirement portfolio.
+        glide_path (str | None): Glide path sizing the plan in runAnalysis; the replay itself
+                                 uses the post-retirement risk portfolio.
+
+    Returns:
+        tuple: (SWPResult from runAnalysis, BacktestResult).
+
+    Raises:
+        CriticalInternalError: If the underlying analysis fails.
+        ValueError: If the dataset cannot cover the withdrawal horizon.
+    """
+    snapshot = current_snapshot()
+    results = runAnalysis(user_data, swp_mode, pre_retirement_risk, post_retirement_risk, glide_path)
+
+    post_retirement_portfolio = get_relevant_portfolio(post_retirement_risk)
+    corpus = results.current_corpus_future_value
+
+    backtester = SWPBacktester()
+    with track_stage('backtest'):
+        backtest = backtester.run_backtest(
+            portfolio=post_retirement_portfolio,
+            initial_corpus=corpus,
+            monthly_swp=results.safe_swp_current,
+            withdrawal_years=snapshot.avg_life_expectancy - user_data.expected_retirement_age,
+            reserve_corpus=results.current_reserve_corpus,
+            annual_inflation_rate=snapshot.annual_inflation_rate,
+            dataset=dataset
+        )
+    logger.info(f'Backtest complete. Failure rate: {backtest.failure_rate}.')
+
+    return results, backtest
+
+
+@pinned_snapshot()
+def runFanChart(
+    user_data: UserData,
+    swp_mode: Literal['aggressive', 'conservative'],
+    pre_retirement_risk: Literal['conservative', 'aggressive', 'balanced'],
+    post_retirement_risk: Literal['conservative', 'aggressive', 'balanced'],
+    num_paths: int = FAN_CHART_PATHS,
+    yearly: bool = False,
+    glide_path: str | None = None
+) -> tuple[SWPResult, FanChartResult]:
+    """
+    Percentile bands of the user's current-scenario corpus through retirement, over
+    bootstrapped paths of the post-retirement portfolio's monthly returns.
+
+    Like runBacktest, the corpus, safe SWP and reserve come from runAnalysis, so the fan chart
+    shows the spread around exactly the plan the user is shown.
+
+    Args:
+        num_paths (int): Bootstrapped paths to simulate.
+        yearly (bool): Report year-end points only.
+        Other arguments as for runBacktest.
+
+    Returns:
+        tuple: (SWPResult from runAnalysis, FanChartResult).
+
+    Raises:
+        CriticalInternalError: If the underlying analysis fails.
+        ValueError: If the number of paths is out of range.
+    """
+    snapshot = current_snapshot()
+    results = runAnalysis(user_data, swp_mode, pre_retirement_risk, post_retirement_risk, glide_path)
+
+    post_retirement_portfolio = get_relevant_portfolio(post_retirement_risk)
+    corpus = results.current_corpus_future_value
+
+    with track_stage('fan_chart'):
+        fan_chart = corpus_fan_chart(
+            portfolio=post_retirement_portfolio,
+            initial_corpus=corpus,
+            monthly_swp=results.safe_swp_current,
+            withdrawal_years=snapshot.avg_life_expectancy - user_data.expected_retirement_age,
+            reserve_corpus=results.current_reserve_corpus,
+            num_paths=num_paths,
+            yearly=yearly,
+            annual_inflation_rate=snapshot.annual_inflation_rate
+        )
+    logger.info(f'Fan chart complete over {num_paths} paths. Depletion probability: {fan_chart.depletion_probability}.')
+
+    return results, fan_chart
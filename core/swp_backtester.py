@@ -0,0 +1,365 @@
+from typing import Literal
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from config.config import (
+    ANNUAL_INFLATION_RATE,
+    BACKTEST_DATASET,
+    BACKTEST_PERCENTILES,
+    DEFAULT_DATASET
+)
+from models.SWPResult import BacktestResult
+from utils.combine_navs import build_composite_nav
+from utils.logger import get_logger
+from utils.nav_panel import get_nav_panel
+from utils.quantile_sketch import QuantileSketch
+
+logger = get_logger()
+
+"""
+    SWP Backtester: Replays the actual historical monthly returns of a portfolio
+    through the withdrawal schedule for every possible start month, exposing the
+    sequence-of-returns risk hidden by a constant post-retirement return rate.
+
+    Also provides the withdrawal-phase counterpart of the rolling SIP XIRR: for
+    every historical window, the constant return that would have sustained the
+    same inflation-stepped SWP, used to size withdrawals in SWPCalculator.
+"""
+
+class SWPBacktester:
+    def __init__(self):
+        pass
+
+    def run_backtest(
+        self,
+        portfolio: dict[str, float],
+        initial_corpus: float,
+        monthly_swp: float,
+        withdrawal_years: int,
+        reserve_corpus: float = 0,
+        annual_inflation_rate: float = ANNUAL_INFLATION_RATE,
+        dataset: str | None = None
+    ) -> BacktestResult:
+        """
+        Backtests an inflation-stepped SWP against every historical start month.
+
+        Args:
+            portfolio: Mapping of asset name to weight.
+            initial_corpus: Corpus at the start of the SWP.
+            monthly_swp: First-year monthly withdrawal, inflated at every year-end.
+            withdrawal_years: Number of years the withdrawals run for.
+            reserve_corpus: Reserve that compounds alongside the core corpus but is never withdrawn.
+            annual_inflation_rate: Annual step-up of the SWP and the reserve.
+            dataset: Key into NAV_DATASETS to replay; defaults to BACKTEST_DATASET if it holds
+                     every asset of the portfolio, else DEFAULT_DATASET over at most as many
+                     years as its history supports.
+
+        Returns:
+            BacktestResult: Failure rate, worst-case depletion month and percentile balance paths,
+                            with the dataset and horizon that were replayed.
+
+        Raises:
+            ValueError: If the history is shorter than the withdrawal horizon.
+        """
+        if dataset is None:
+            dataset = BACKTEST_DATASET
+            if not set(portfolio) <= set(get_nav_panel(dataset).assets):
+                logger.info(f'Dataset "{dataset}" lacks assets of {list(portfolio)}. Replaying "{DEFAULT_DATASET}".')
+                dataset = DEFAULT_DATASET
+                # The fallback history may be shorter than the horizon; replay the longest it supports
+                available_years = len(self._compute_monthly_returns(portfolio, dataset)[1]) // 12
+                if 0 < available_years < withdrawal_years:
+                    logger.warning(
+                        f'Inadequate data for a {withdrawal_years}-year backtest. Defaulting to {available_years} years.'
+                    )
+                    withdrawal_years = available_years
+
+        windows = self.simulate_rolling_windows(
+            portfolio=portfolio,
+            initial_corpus=initial_corpus,
+            monthly_swp=monthly_swp,
+            withdrawal_years=withdrawal_years,
+            reserve_corpus=reserve_corpus,
+            annual_inflation_rate=annual_inflation_rate,
+            dataset=dataset
+        )
+        balances = windows['balances']
+        reserves = windows['reserves']
+        depletion_months = windows['depletion_months']
+        total_m = withdrawal_years * 12
+        failed = depletion_months <= total_m
+
+        worst_depletion_month = None
+        worst_start_date = None
+        if failed.any():
+            worst_idx = int(depletion_months.argmin())
+            worst_depletion_month = int(depletion_months[worst_idx])
+            worst_start_date = str(np.datetime_as_string(windows['start_dates'][worst_idx], unit='D'))
+
+        balance_bands = np.percentile(balances, BACKTEST_PERCENTILES, axis=0)
+        reserve_bands = np.percentile(reserves, BACKTEST_PERCENTILES, axis=0)
+
+        return BacktestResult(
+            dataset=dataset,
+            num_start_months=int(balances.shape[0]),
+            horizon_months=total_m,
+            failure_rate=round(float(failed.mean()), 4),
+            worst_depletion_month=worst_depletion_month,
+            worst_start_date=worst_start_date,
+            median_final_balance=round(float(np.median(windows['terminal_values'])), 2),
+            percentiles=tuple(BACKTEST_PERCENTILES),
+            balance_bands=balance_bands,
+            reserve_bands=reserve_bands
+        )
+
+    def simulate_rolling_windows(
+        self,
+        portfolio: dict[str, float],
+        initial_corpus: float,
+        monthly_swp: float,
+        withdrawal_years: int,
+        reserve_corpus: float = 0,
+        annual_inflation_rate: float = ANNUAL_INFLATION_RATE,
+        dataset: str = BACKTEST_DATASET
+    ) -> dict:
+        """
+        Runs a lump sum through inflation-stepped monthly withdrawals for every historical window at once.
+
+        Returns:
+            dict: Per-window arrays
+                  - start_dates (S,): first month of each window
+                  - balances (S, M+1): core balance, floored at zero once depleted
+                  - reserves (S, M+1): reserve balance
+                  - terminal_values (S,): core balance after the last withdrawal
+                  - depletion_months (S,): first month the core balance hits zero, M+1 if never
+
+        Raises:
+            ValueError: If the history is shorter than the withdrawal horizon.
+        """
+        total_m = withdrawal_years * 12
+        start_dates, returns_matrix = self._compute_window_returns(portfolio, total_m, dataset)
+        withdrawals = self._compute_withdrawal_vector(monthly_swp, total_m, annual_inflation_rate)
+
+        balances, growth = self._simulate_balance_paths(returns_matrix, initial_corpus, withdrawals)
+        reserves = self._simulate_reserve_paths(growth, reserve_corpus, total_m, annual_inflation_rate)
+
+        # Core balance is monotone once it turns non-positive, so the first hit is the depletion month
+        depleted = balances[:, 1:] <= 0
+        depletion_months = np.where(depleted.any(axis=1), depleted.argmax(axis=1) + 1, total_m + 1)
+        np.maximum(balances, 0, out=balances)
+
+        return {
+            'start_dates': start_dates,
+            'balances': balances,
+            'reserves': reserves,
+            'terminal_values': balances[:, -1],
+            'depletion_months': depletion_months
+        }
+
+    def compute_rolling_swp_returns(
+        self,
+        portfolio: dict[str, float],
+        withdrawal_years: int,
+        annual_inflation_rate: float = ANNUAL_INFLATION_RATE,
+        dataset: str = DEFAULT_DATASET
+    ) -> np.ndarray:
+        """
+        Withdrawal-phase return of every historical window, as an annual rate.
+
+        For each window, the sustainable first-year SWP per unit of corpus is
+        1 / sum_k s_k / G_k (s_k the inflation step, G_k the realised growth),
+        i.e. the SWP that exhausts the corpus exactly at the horizon. The window's
+        return is the constant rate at which the standard inflation-stepped annuity
+        would yield that same SWP, so it is independent of corpus size and carries
+        the window's sequence-of-returns effect.
+
+        Raises:
+            ValueError: If the history is shorter than the withdrawal horizon.
+        """
+        total_m = withdrawal_years * 12
+        _, returns_matrix = self._compute_window_returns(portfolio, total_m, dataset)
+        return self.swp_returns_from_matrix(returns_matrix, annual_inflation_rate)
+
+    def swp_returns_from_matrix(
+        self,
+        returns_matrix: np.ndarray,
+        annual_inflation_rate: float = ANNUAL_INFLATION_RATE
+    ) -> np.ndarray:
+        """
+        Withdrawal-phase return of every window of a (window x month) realised return matrix, as an annual rate.
+        """
+        total_m = returns_matrix.shape[1]
+        steps = self._compute_withdrawal_vector(1.0, total_m, annual_inflation_rate)
+
+        growth = np.cumprod(1 + returns_matrix, axis=1)
+        annuity_factors = (steps / growth).sum(axis=1)
+
+        monthly_returns = self._solve_constant_returns(steps, annuity_factors)
+        return (1 + monthly_returns) ** 12 - 1
+
+    def compute_portfolio_rolling_swp_return(
+        self,
+        portfolio: dict[str, float],
+        withdrawal_years: int,
+        mode: Literal["mean", "median", "optimistic", "pessimistic"] = "median",
+        annual_inflation_rate: float = ANNUAL_INFLATION_RATE,
+        dataset: str = DEFAULT_DATASET
+    ) -> float:
+        """
+        Summarises the rolling withdrawal-phase returns into the single post-retirement
+        return rate used to size the SWP.
+
+        Falls back to the longest horizon the history supports, like the SIP XIRR does.
+
+        Returns:
+            float: Annual return as a fraction (e.g. 0.08).
+        """
+        available_years = len(self._compute_monthly_returns(portfolio, dataset)[1]) // 12
+        years = withdrawal_years
+        if available_years < withdrawal_years:
+            logger.warning(
+                f'Inadequate data for {withdrawal_years}-year SWP windows. Defaulting to {available_years} years.'
+            )
+            years = available_years
+        if years <= 0:
+            raise ValueError('Not enough data to compute returns.')
+
+        returns = self.compute_rolling_swp_returns(portfolio, years, annual_inflation_rate, dataset)
+        return self.summarize_swp_returns(returns, mode)
+
+    def summarize_swp_returns(
+        self,
+        returns: np.ndarray,
+        mode: Literal["mean", "median", "optimistic", "pessimistic"] = "median"
+    ) -> float:
+        sketch = QuantileSketch.from_values(returns)
+        if mode == "median":
+            return round(float(sketch.quantile(0.5)), 4)
+        elif mode == "mean":
+            return round(sketch.mean(), 4)
+        elif mode == "pessimistic":
+            return round(float(sketch.quantile(0.25)), 4)
+        elif mode == "optimistic":
+            return round(float(sketch.quantile(0.75)), 4)
+        else:
+            raise ValueError()
+
+    def _compute_window_returns(
+        self,
+        portfolio: dict[str, float],
+        total_m: int,
+        dataset: str
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        (start x month) matrix of realised returns, one row per historical start month.
+
+        Raises:
+            ValueError: If the history is shorter than the withdrawal horizon.
+        """
+        if total_m <= 0:
+            raise ValueError('Retirement years is zero or negative.')
+
+        dates, returns = self._compute_monthly_returns(portfolio, dataset)
+        if len(returns) < total_m:
+            raise ValueError(
+                f'Not enough history in dataset "{dataset}" to backtest {total_m // 12} years of withdrawals.'
+            )
+
+        returns_matrix = sliding_window_view(returns, total_m)
+        return dates[:returns_matrix.shape[0]], returns_matrix
+
+    def _solve_constant_returns(
+        self,
+        steps: np.ndarray,
+        annuity_factors: np.ndarray,
+        max_iter: int = 100,
+        tol: float = 1e-12
+    ) -> np.ndarray:
+        """
+        Solves sum_k steps_k * (1 + x)^-k = annuity_factor for the monthly rate x of every window.
+
+        The left side is decreasing and convex in y = ln(1 + x), so Newton converges monotonically.
+
+        Raises:
+            ValueError: If any window fails to converge.
+        """
+        months = np.arange(1, len(steps) + 1)
+        y = np.zeros(len(annuity_factors))
+
+        for _ in range(max_iter):
+            pv = steps * np.exp(-y[:, None] * months)
+            f = pv.sum(axis=1) - annuity_factors
+            df = -(pv * months).sum(axis=1)
+            step = f / df
+            y -= step
+            if np.all(np.abs(step) < tol):
+                break
+        else:
+            raise ValueError('Withdrawal-phase return did not converge for every rolling window.')
+
+        return np.expm1(y)
+
+    def _compute_monthly_returns(
+        self,
+        portfolio: dict[str, float],
+        dataset: str
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the composite NAV dates and the month-over-month returns that follow each date.
+        """
+        composite_df = build_composite_nav(portfolio=portfolio, dataset=dataset)
+        navs = composite_df['NAV_INR'].to_numpy(dtype=np.float64)
+        dates = composite_df['Date'].to_numpy()
+        return dates[:-1], navs[1:] / navs[:-1] - 1
+
+    def _compute_withdrawal_vector(
+        self,
+        monthly_swp: float,
+        total_m: int,
+        annual_inflation_rate: float
+    ) -> np.ndarray:
+        """
+        Monthly withdrawals for months 1..total_m, stepped up by inflation after every 12 months.
+        """
+        years_elapsed = np.arange(total_m) // 12
+        return monthly_swp * (1 + annual_inflation_rate) ** years_elapsed
+
+    def _simulate_balance_paths(
+        self,
+        returns_matrix: np.ndarray,
+        initial_corpus: float,
+        withdrawals: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Solves b_m = b_{m-1} * (1 + r_m) - w_m for every start month at once.
+
+        With G_m the cumulative growth factor, b_m = G_m * (C0 - sum_{k<=m} w_k / G_k),
+        so the whole (start x month) grid is two cumulative passes instead of a Python loop.
+
+        Returns:
+            tuple: (balances, growth), balances including month 0 as the first column.
+        """
+        growth = np.cumprod(1 + returns_matrix, axis=1)
+        discounted_withdrawals = np.cumsum(withdrawals / growth, axis=1)
+
+        balances = np.empty((growth.shape[0], growth.shape[1] + 1))
+        balances[:, 0] = initial_corpus
+        balances[:, 1:] = growth * (initial_corpus - discounted_withdrawals)
+        return balances, growth
+
+    def _simulate_reserve_paths(
+        self,
+        growth: np.ndarray,
+        reserve_corpus: float,
+        total_m: int,
+        annual_inflation_rate: float
+    ) -> np.ndarray:
+        """
+        Reserve compounds at the realised return and is inflated at every year-end,
+        matching utils.swp_schedule.
+        """
+        inflation_steps = (1 + annual_inflation_rate) ** (np.arange(total_m) // 12)
+        reserves = np.empty((growth.shape[0], total_m + 1))
+        reserves[:, 0] = reserve_corpus
+        reserves[:, 1:] = reserve_corpus * growth * inflation_steps
+        return reserves
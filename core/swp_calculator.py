@@ -1,13 +1,18 @@
 from typing import Literal
+import numpy as np
 
-from models import SWPData
+from models.SWPResult import ScenarioResult, SWPResult, SWPSchedule
 from models.UserData import UserData
 from config.config import (
     ANNUAL_INFLATION_RATE,
+    CONSERVATIVE_RESERVE_THRESHOLD,
     PRE_RETIREMENT_RETURN_RATE,
     POST_RETIREMENT_RETURN_RATE,
-    AVG_LIFE_EXPECTANCY
+    AVG_LIFE_EXPECTANCY,
+    SCHEDULE_DTYPE
 )
+from utils.sip_schedule import annual_sip_amounts
+from utils.swp_schedule import depletion_months, iter_swp_schedule, swp_schedule_arrays
 
 """
     SWP Calculator: Solves for 
@@ -29,278 +34,207 @@ class SWPCalculator:
         annual_inflation_rate: float = ANNUAL_INFLATION_RATE,
         avg_life_expectancy: int = AVG_LIFE_EXPECTANCY,
         mode: Literal['aggressive', 'conservative'] = 'aggressive'
-    ) -> dict:
-        if mode =='aggressive':
-            return self._run_aggressive_calculator(
-                user_data,
-                pre_retirement_return_rate,
-                post_retirement_return_rate,
-                avg_life_expectancy,
-                annual_inflation_rate,
-            )
-        elif mode =='conservative':
-            return self._run_conservative_calculator(
-                user_data,
-                pre_retirement_return_rate,
-                post_retirement_return_rate,
-                avg_life_expectancy,
-                annual_inflation_rate,
-            )
-
-    def _run_conservative_calculator(
-        self,
-        user_data: UserData,
-        pre_retirement_return_rate: float,
-        post_retirement_return_rate: float,
-        avg_life_expectancy: int,
-        annual_inflation_rate: float,
-        reserve_threshold: float = 0.2
-    ):
-        current_age: int = user_data.current_age
-        retirement_age: int = user_data.expected_retirement_age
-        expected_monthly_expense: float = user_data.expected_retirement_expenses
-        retirement_corpus: float = user_data.current_retirement_corpus
-        retirement_sip: float = user_data.retirement_sip
-        current_reserve_corpus: float = int(retirement_corpus * reserve_threshold)
-        # retirement_corpus: float = corpus - current_reserve_corpus
-        
-        # __________ Current corpus ____________
-
-        current_corpus_future_val = self._compute_retirement_corpus_future_value(
-            retirement_corpus,
-            retirement_sip,
+    ) -> SWPResult:
+        current = self.compute_current_scenario(
+            user_data,
             pre_retirement_return_rate,
-            annual_inflation_rate,
-            current_age,
-            retirement_age
-        )
-
-        # current_monthly_swp = self._compute_monthly_swp_with_annual_inflation(
-        #     current_corpus_future_val,
-        #     retirement_age,
-        #     post_retirement_return_rate,
-        #     avg_life_expectancy,
-        #     annual_inflation_rate
-        # )
-
-        current_monthly_swp = self.compute_swp_with_reserve_pct(
-            current_corpus_future_val,
-            post_retirement_return_rate,
-            avg_life_expectancy - retirement_age,
-            reserve_threshold
-        )
-
-        # current_monthly_swp = self.compute_swp_with_reserve_and_inflation(
-        #     current_corpus_future_val,
-        #     post_retirement_return_rate,
-        #     annual_inflation_rate,
-        #     avg_life_expectancy - retirement_age,
-        #     reserve_threshold
-        # )
-
-        current_swp_schedule = self._monthly_corpus_schedule_with_reserve(
-            current_corpus_future_val,
-            current_reserve_corpus,
-            current_monthly_swp,
-            retirement_age,
             post_retirement_return_rate,
+            annual_inflation_rate,
             avg_life_expectancy,
-            annual_inflation_rate
+            mode
         )
-
-        # __________ Target Corpus ____________
-
-        target_corpus = self._compute_target_retirement_corpus(
-            expected_monthly_expense,
-            current_age,
-            retirement_age,
+        target = self.compute_target_scenario(
+            user_data,
             post_retirement_return_rate,
             annual_inflation_rate,
-            avg_life_expectancy
-        )
-
-        target_reserve_corpus = int(target_corpus * reserve_threshold)
-
-        # target_monthly_swp = self._compute_monthly_swp_with_annual_inflation(
-        #     target_corpus,
-        #     retirement_age,
-        #     post_retirement_return_rate,
-        #     avg_life_expectancy,
-        #     annual_inflation_rate
-        # )
-
-        target_monthly_swp = self.compute_swp_with_reserve_pct(
-            target_corpus,
-            post_retirement_return_rate,
-            avg_life_expectancy - retirement_age,
-            reserve_threshold
-        )
-
-        # target_monthly_swp = self.compute_swp_with_reserve_and_inflation(
-        #     target_corpus,
-        #     post_retirement_return_rate,
-        #     annual_inflation_rate,
-        #     avg_life_expectancy - retirement_age,
-        #     reserve_threshold
-        # )
-
-        target_swp_schedule = self._monthly_corpus_schedule_with_reserve(
-            target_corpus,
-            target_reserve_corpus,
-            target_monthly_swp,
-            retirement_age,
-            post_retirement_return_rate,
             avg_life_expectancy,
-            annual_inflation_rate
+            mode
         )
-
-        target_sip = retirement_sip + self._compute_extra_sip_amt(
-            current_corpus_future_val,
-            target_corpus,
-            current_age,
-            retirement_age,
-            pre_retirement_return_rate,
-            annual_inflation_rate
+        return self.combine_scenarios(
+            user_data, current, target, pre_retirement_return_rate, annual_inflation_rate, avg_life_expectancy
         )
 
-        current_manual_swp = self._compute_manual_uninvested_withdrawals(user_data, current_corpus_future_val)
-        target_manual_swp = self._compute_manual_uninvested_withdrawals(user_data, target_corpus)
-
-        corpus_gap = self._compute_corpus_gap(current_corpus_future_val, target_corpus)
-        adequacy = self._compute_adequacy(current_corpus_future_val, target_corpus)
-
-        with open('temp/current_schedule.txt', 'w') as f:
-            for month, balance, reserve in current_swp_schedule:
-                f.write(f"Month {month:3d}: {balance:,.2f} : {reserve:,.2f}\n")
-
-        with open('temp/target_schedule.txt', 'w') as f:
-            for month, balance, reserve in target_swp_schedule:
-                f.write(f"Month {month:3d}: {balance:,.2f} : {reserve:,.2f}\n")
-
-        return {
-            'current_corpus_future_value': current_corpus_future_val,
-            'ideal_target_corpus': target_corpus,
-            'corpus_gap': corpus_gap,
-            'adequacy': adequacy,
-            'extra_sip_required': target_sip,
-            'manual_swp_current': current_manual_swp,
-            'manual_swp_target': target_manual_swp,
-            'safe_swp_current': current_monthly_swp,
-            'safe_swp_target': target_monthly_swp
-        }
-
-        
-
-    def _run_aggressive_calculator(
+    def compute_current_scenario(
         self,
         user_data: UserData,
-        pre_retirement_return_rate: float,
-        post_retirement_return_rate: float,
-        avg_life_expectancy: int,
-        annual_inflation_rate: float,
-    ):
-        current_age: int = user_data.current_age
+        pre_retirement_return_rate: float = PRE_RETIREMENT_RETURN_RATE,
+        post_retirement_return_rate: float = POST_RETIREMENT_RETURN_RATE,
+        annual_inflation_rate: float = ANNUAL_INFLATION_RATE,
+        avg_life_expectancy: int = AVG_LIFE_EXPECTANCY,
+        mode: Literal['aggressive', 'conservative'] = 'aggressive',
+        reserve_threshold: float = CONSERVATIVE_RESERVE_THRESHOLD
+    ) -> ScenarioResult:
+        """
+        Corpus the user's current savings and SIP grow to by retirement, and the SWP it sustains.
+
+        Conservative mode keeps a reserve of `reserve_threshold` of today's corpus aside;
+        aggressive mode withdraws the whole corpus with an inflation-stepped SWP.
+
+        Raises:
+            ValueError: If the mode is unknown or the horizon is invalid.
+        """
         retirement_age: int = user_data.expected_retirement_age
-        expected_monthly_expense: float = user_data.expected_retirement_expenses
-        corpus: float = user_data.current_retirement_corpus
-        retirement_sip: float = user_data.retirement_sip
-        current_reserve_corpus: float = 0
-        retirement_corpus: float = corpus - current_reserve_corpus
-        
-        # __________ Current corpus ____________
+        retirement_corpus: float = user_data.current_retirement_corpus
 
         current_corpus_future_val = self._compute_retirement_corpus_future_value(
             retirement_corpus,
-            retirement_sip,
+            user_data.retirement_sip,
             pre_retirement_return_rate,
             annual_inflation_rate,
-            current_age,
-            retirement_age
-        )
-
-        current_monthly_swp = self._compute_monthly_swp_with_annual_inflation(
-            current_corpus_future_val,
+            user_data.current_age,
             retirement_age,
-            post_retirement_return_rate,
-            avg_life_expectancy,
-            annual_inflation_rate
+            user_data.sip_step_up,
+            user_data.sip_step_up_mode
         )
 
-        current_swp_schedule = self._monthly_corpus_schedule_with_reserve(
+        if mode == 'conservative':
+            reserve_corpus = int(retirement_corpus * reserve_threshold)
+            monthly_swp = self.compute_swp_with_reserve_pct(
+                current_corpus_future_val,
+                post_retirement_return_rate,
+                avg_life_expectancy - retirement_age,
+                reserve_threshold
+            )
+        elif mode == 'aggressive':
+            reserve_corpus = 0
+            monthly_swp = self._compute_monthly_swp_with_annual_inflation(
+                current_corpus_future_val,
+                retirement_age,
+                post_retirement_return_rate,
+                avg_life_expectancy,
+                annual_inflation_rate
+            )
+        else:
+            raise ValueError(f'Unknown SWP mode: {mode}')
+
+        schedule = self._monthly_corpus_schedule_with_reserve(
             current_corpus_future_val,
-            current_reserve_corpus,
-            current_monthly_swp,
+            reserve_corpus,
+            monthly_swp,
             retirement_age,
             post_retirement_return_rate,
             avg_life_expectancy,
             annual_inflation_rate
         )
+        return ScenarioResult(
+            corpus=current_corpus_future_val, monthly_swp=monthly_swp, schedule=schedule, reserve_corpus=reserve_corpus
+        )
 
-        # __________ Target Corpus ____________
+    def compute_target_scenario(
+        self,
+        user_data: UserData,
+        post_retirement_return_rate: float = POST_RETIREMENT_RETURN_RATE,
+        annual_inflation_rate: float = ANNUAL_INFLATION_RATE,
+        avg_life_expectancy: int = AVG_LIFE_EXPECTANCY,
+        mode: Literal['aggressive', 'conservative'] = 'aggressive',
+        reserve_threshold: float = CONSERVATIVE_RESERVE_THRESHOLD
+    ) -> ScenarioResult:
+        """
+        Corpus needed at retirement to fund the expected expenses, and the SWP it sustains.
+        Independent of the pre-retirement return, so it can be computed alongside it.
+
+        Raises:
+            ValueError: If the mode is unknown or the horizon is invalid.
+        """
+        retirement_age: int = user_data.expected_retirement_age
 
         target_corpus = self._compute_target_retirement_corpus(
-            expected_monthly_expense,
-            current_age,
+            user_data.expected_retirement_expenses,
+            user_data.current_age,
             retirement_age,
             post_retirement_return_rate,
             annual_inflation_rate,
             avg_life_expectancy
         )
 
-        target_reserve_corpus = 0
-
-        target_monthly_swp = self._compute_monthly_swp_amt(
-            target_corpus,
-            retirement_age,
-            post_retirement_return_rate,
-            avg_life_expectancy,
-        )
+        if mode == 'conservative':
+            reserve_corpus = int(target_corpus * reserve_threshold)
+            monthly_swp = self.compute_swp_with_reserve_pct(
+                target_corpus,
+                post_retirement_return_rate,
+                avg_life_expectancy - retirement_age,
+                reserve_threshold
+            )
+        elif mode == 'aggressive':
+            reserve_corpus = 0
+            monthly_swp = self._compute_monthly_swp_amt(
+                target_corpus,
+                retirement_age,
+                post_retirement_return_rate,
+                avg_life_expectancy,
+            )
+        else:
+            raise ValueError(f'Unknown SWP mode: {mode}')
 
-        target_swp_schedule = self._monthly_corpus_schedule_with_reserve(
+        schedule = self._monthly_corpus_schedule_with_reserve(
             target_corpus,
-            target_reserve_corpus,
-            target_monthly_swp,
+            reserve_corpus,
+            monthly_swp,
             retirement_age,
             post_retirement_return_rate,
             avg_life_expectancy,
             annual_inflation_rate
         )
-
-        target_sip = retirement_sip + self._compute_extra_sip_amt(
-            current_corpus_future_val,
-            target_corpus,
-            current_age,
-            retirement_age,
-            pre_retirement_return_rate,
-            annual_inflation_rate
+        return ScenarioResult(
+            corpus=target_corpus, monthly_swp=monthly_swp, schedule=schedule, reserve_corpus=reserve_corpus
         )
 
+    def combine_scenarios(
+        self,
+        user_data: UserData,
+        current: ScenarioResult,
+        target: ScenarioResult,
+        pre_retirement_return_rate: float = PRE_RETIREMENT_RETURN_RATE,
+        annual_inflation_rate: float = ANNUAL_INFLATION_RATE,
+        avg_life_expectancy: int = AVG_LIFE_EXPECTANCY,
+        allow_funded: bool = False
+    ) -> SWPResult:
+        """
+        Compares the current and target scenarios: corpus gap, adequacy and the extra SIP that closes the gap.
+
+        With allow_funded, a user whose current corpus already meets the target gets their
+        current SIP as the SIP required, as in the household calculator, instead of an error.
+        """
+        if allow_funded and current.corpus >= target.corpus:
+            target_sip = user_data.retirement_sip
+        else:
+            target_sip = user_data.retirement_sip + self._compute_extra_sip_amt(
+                current.corpus,
+                target.corpus,
+                user_data.current_age,
+                user_data.expected_retirement_age,
+                pre_retirement_return_rate,
+                annual_inflation_rate
+            )
 
-        current_manual_swp = self._compute_manual_uninvested_withdrawals(user_data, current_corpus_future_val)
-        target_manual_swp = self._compute_manual_uninvested_withdrawals(user_data, target_corpus)
+        current_manual_swp = self._compute_manual_uninvested_withdrawals(user_data, current.corpus, avg_life_expectancy)
+        target_manual_swp = self._compute_manual_uninvested_withdrawals(user_data, target.corpus, avg_life_expectancy)
 
-        corpus_gap = self._compute_corpus_gap(current_corpus_future_val, target_corpus)
-        adequacy = self._compute_adequacy(current_corpus_future_val, target_corpus)
+        corpus_gap = self._compute_corpus_gap(current.corpus, target.corpus)
+        adequacy = self._compute_adequacy(current.corpus, target.corpus)
 
         with open('temp/current_schedule.txt', 'w') as f:
-            for month, balance, reserve in current_swp_schedule:
+            for month, balance, reserve in current.schedule.rows():
                 f.write(f"Month {month:3d}: {balance:,.2f} : {reserve:,.2f}\n")
 
         with open('temp/target_schedule.txt', 'w') as f:
-            for month, balance, reserve in target_swp_schedule:
+            for month, balance, reserve in target.schedule.rows():
                 f.write(f"Month {month:3d}: {balance:,.2f} : {reserve:,.2f}\n")
 
-        return {
-            'current_corpus_future_value': current_corpus_future_val,
-            'ideal_target_corpus': target_corpus,
-            'corpus_gap': corpus_gap,
-            'adequacy': adequacy,
-            'extra_sip_required': target_sip,
-            'manual_swp_current': current_manual_swp,
-            'manual_swp_target': target_manual_swp,
-            'safe_swp_current': current_monthly_swp,
-            'safe_swp_target': target_monthly_swp
-        }
+        return SWPResult(
+            current_corpus_future_value=current.corpus,
+            ideal_target_corpus=target.corpus,
+            corpus_gap=corpus_gap,
+            adequacy=adequacy,
+            extra_sip_required=float(target_sip),
+            manual_swp_current=current_manual_swp,
+            manual_swp_target=target_manual_swp,
+            safe_swp_current=float(current.monthly_swp),
+            safe_swp_target=float(target.monthly_swp),
+            current_schedule=current.schedule,
+            target_schedule=target.schedule,
+            current_reserve_corpus=current.reserve_corpus
+        )
 
     # def compute_swp_with_reserve_and_inflation(
     #     self,
@@ -387,6 +321,31 @@ class SWPCalculator:
         return round(swp, 2)
     
 
+    def compute_corpus_longevity(
+        self,
+        corpus,
+        monthly_swp,
+        post_retirement_return_rate,
+        annual_inflation_rate: float = ANNUAL_INFLATION_RATE,
+        flat_withdrawals: bool = False
+    ) -> np.ndarray:
+        """
+        How long a corpus lasts under a monthly SWP, without simulating month by month.
+
+        Args:
+            corpus: Corpus at the start of the SWP; scalar or array.
+            monthly_swp: First-year monthly withdrawal; scalar or array.
+            post_retirement_return_rate: Effective annual return (e.g. 0.08); scalar or array.
+            annual_inflation_rate: Annual step-up of the SWP.
+            flat_withdrawals: Keep the SWP constant instead of inflating it.
+
+        Returns:
+            np.ndarray: Element-wise month in which the corpus runs out; inf if it never does.
+        """
+        r_m = (1 + np.asarray(post_retirement_return_rate, dtype=np.float64)) ** (1/12) - 1
+        return depletion_months(corpus, monthly_swp, r_m, annual_inflation_rate, flat_withdrawals)
+    
+
     # OWN CODE DO NOT DELETE
     def _compute_monthly_swp_amt(
         self, 
@@ -443,6 +402,13 @@ class SWPCalculator:
         return round(W0, 2)
 
 
+    def _flat_annuity_swp(self, initial_corpus: float, r_m: float, total_m: int) -> float:
+        """
+        Flat monthly SWP that exhausts the corpus over total_m months at monthly return r_m.
+        """
+        return initial_corpus * r_m / (1 - (1 + r_m) ** (-total_m))
+
+
     def _year_end_corpus_schedule(
         self,
         initial_corpus: float,
@@ -451,31 +417,20 @@ class SWPCalculator:
         post_retirement_return_rate: float,
         avg_life_expectancy: int
     ) -> list[tuple[int, float]]:
-        
-        withdrawal_years = avg_life_expectancy - retirement_age
-        
-        # 1) Monthly compounding rate
-        r_eff = post_retirement_return_rate
-        r_m   = (1 + r_eff) ** (1 / 12) - 1
-        n_m   = withdrawal_years * 12
-
-        # 2) Compute SWP if not passed (optional fallback)
+        """
+        Year-end corpus under a flat monthly SWP (annuity SWP if none is given).
+        """
+        total_m = (avg_life_expectancy - retirement_age) * 12
+        r_m = (1 + post_retirement_return_rate) ** (1 / 12) - 1
         if monthly_swp is None:
-            numerator   = initial_corpus * r_m
-            denominator = 1 - (1 + r_m) ** (-n_m)
-            monthly_swp = numerator / denominator
+            monthly_swp = self._flat_annuity_swp(initial_corpus, r_m, total_m)
 
-        # 3) Simulate month-by-month, record at year-end
-        bal = initial_corpus
-        schedule: list[tuple[int, float]] = [(0, round(bal, 2))]  # Year 0
-
-        for m in range(1, n_m + 1):
-            bal = bal * (1 + r_m) - monthly_swp
-            if m % 12 == 0:
-                year = m // 12
-                schedule.append((year, round(bal, 2)))
-
-        return schedule
+        return [
+            (m // 12, balance)
+            for m, balance, _ in iter_swp_schedule(
+                initial_corpus, monthly_swp, r_m, total_m, flat_withdrawals=True, every=12
+            )
+        ]
 
 
     def _monthly_corpus_schedule_with_reserve(
@@ -486,47 +441,26 @@ class SWPCalculator:
         retirement_age: int,
         post_retirement_return_rate: float,
         avg_life_expectancy: int,
-        annual_inflation_rate: float
-    ) -> list[tuple[int, float, float]]:
-
-        # Total withdrawal horizon
-        withdrawal_years = avg_life_expectancy - retirement_age
-        total_m = withdrawal_years * 12
-
-        # True monthly return rate
+        annual_inflation_rate: float,
+        dtype: str = SCHEDULE_DTYPE
+    ) -> SWPSchedule:
+        """
+        Month-end core and reserve corpus under an inflation-stepped SWP (annuity SWP if none is given).
+        """
+        total_m = (avg_life_expectancy - retirement_age) * 12
         r_m = (1 + post_retirement_return_rate) ** (1/12) - 1
-
-        # If SWP not provided, compute flat annuity SWP on initial_corpus
         if monthly_swp is None:
-            num = initial_corpus * r_m
-            den = 1 - (1 + r_m) ** (-total_m)
-            monthly_swp = num / den
-
-        core_bal    = initial_corpus
-        reserve_bal = reserve_corpus
-        current_swp = monthly_swp
-
-        schedule: list[tuple[int, float, float]] = [
-            (0, round(core_bal, 2), round(reserve_bal, 2))
-        ]
-
-        for m in range(1, total_m + 1):
-            # 1) grow both by the monthly return
-            core_bal    *= (1 + r_m)
-            reserve_bal *= (1 + r_m)
-
-            # 2) withdraw SWP from core only
-            core_bal    -= current_swp
-
-            # 3) record month-end
-            schedule.append((m, round(core_bal, 2), round(reserve_bal, 2)))
-
-            # 4) at each year-end, inflate SWP and the reserve corpus
-            if m % 12 == 0:
-                current_swp   *= (1 + annual_inflation_rate)
-                reserve_bal   *= (1 + annual_inflation_rate)
-
-        return schedule
+            monthly_swp = self._flat_annuity_swp(initial_corpus, r_m, total_m)
+
+        return swp_schedule_arrays(
+            initial_corpus,
+            monthly_swp,
+            r_m,
+            total_m,
+            reserve_corpus=reserve_corpus,
+            annual_inflation_rate=annual_inflation_rate,
+            dtype=dtype
+        )
     
 
     def _month_end_corpus_schedule(
@@ -537,30 +471,20 @@ class SWPCalculator:
         post_retirement_return_rate: float,
         avg_life_expectancy: int
     ) -> list[tuple[int, float]]:
-    
-        withdrawal_years = avg_life_expectancy - retirement_age
-
-        # 1) derive monthly rate & total months
-        r_eff   = post_retirement_return_rate
-        r_month = (1 + r_eff) ** (1/12) - 1
-        total_m = withdrawal_years * 12
-
-        # 2) compute monthly_swp via closed-form if not provided
+        """
+        Month-end corpus under a flat monthly SWP (annuity SWP if none is given).
+        """
+        total_m = (avg_life_expectancy - retirement_age) * 12
+        r_month = (1 + post_retirement_return_rate) ** (1/12) - 1
         if monthly_swp is None:
-            num = initial_corpus * r_month
-            den = 1 - (1 + r_month) ** (-total_m)
-            monthly_swp = num / den
-
-        # 3) simulate month by month
-        bal = initial_corpus
-        schedule: list[tuple[int, float]] = []
-        schedule.append((0, round(initial_corpus, 2)))
-        for m in range(1, total_m + 1):
-            # compound first, then withdraw at end of month
-            bal = bal * (1 + r_month) - monthly_swp
-            schedule.append((m, round(bal, 2)))
+            monthly_swp = self._flat_annuity_swp(initial_corpus, r_month, total_m)
 
-        return schedule
+        return [
+            (m, balance)
+            for m, balance, _ in iter_swp_schedule(
+                initial_corpus, monthly_swp, r_month, total_m, flat_withdrawals=True
+            )
+        ]
 
 
     def _year_end_corpus_schedule_with_annual_inflation(
@@ -577,34 +501,25 @@ class SWPCalculator:
         where monthly SWP increases annually by the inflation rate,
         but remains constant within each year.
         """
-        withdrawal_years = avg_life_expectancy - retirement_age
+        total_m = int(avg_life_expectancy - retirement_age) * 12
         r_m = (1 + post_retirement_return_rate) ** (1 / 12) - 1
-        n_m = withdrawal_years * 12
-
-        bal = initial_corpus
-        schedule: list[tuple[int, float]] = [(0, round(bal, 2))]
-
-        current_monthly_swp = initial_swp_amount
 
-        for m in range(1, n_m + 1):
-            # compound corpus, then withdraw fixed monthly amount for this year
-            bal = bal * (1 + r_m) - current_monthly_swp
-
-            # If end of year, record and increase SWP
-            if m % 12 == 0:
-                year = m // 12
-                schedule.append((year, round(bal, 2)))
-                current_monthly_swp *= (1 + annual_inflation_rate)
-
-        return schedule
+        return [
+            (m // 12, balance)
+            for m, balance, _ in iter_swp_schedule(
+                initial_corpus, initial_swp_amount, r_m, total_m,
+                annual_inflation_rate=annual_inflation_rate, every=12
+            )
+        ]
 
 
     def _compute_manual_uninvested_withdrawals(
         self, 
         user_data: UserData, 
-        retirement_corpus: float
+        retirement_corpus: float,
+        avg_life_expectancy: int = AVG_LIFE_EXPECTANCY
     ) -> float:
-        T = AVG_LIFE_EXPECTANCY - user_data.expected_retirement_age + 1
+        T = avg_life_expectancy - user_data.expected_retirement_age + 1
         if T <= 0:
             raise ValueError('Retirement years is zero.')
         return round(retirement_corpus / (12 * T))
@@ -660,18 +575,26 @@ class SWPCalculator:
         pre_retirement_return_rate: float,
         annual_inflation_rate: float,
         start_age: int,
-        end_age: int
+        end_age: int,
+        sip_step_up: float = 0.0,
+        sip_step_up_mode: Literal['percentage', 'amount'] = 'percentage'
     ) -> float:
 
         L = corpus
         r_g = pre_retirement_return_rate
         r_i = annual_inflation_rate
-        sip = sip_amount
         T = end_age - start_age
 
+        # Monthly SIP in force during each year, stepped up annually
+        year_sips = annual_sip_amounts(sip_amount, T, sip_step_up, sip_step_up_mode)
+
         try:
             lumpsum_future = (L * (1 + r_g) ** T) 
-            sip_future = (sip * (1 + r_g / 12) * ((1 + r_g / 12) ** (12 * T) - 1) * 12 / r_g)
+            # FV at year-end of one year of monthly SIPs (annuity due), then compounded to retirement
+            r_m = r_g / 12
+            year_sip_future = (1 + r_m) * ((1 + r_m) ** 12 - 1) / r_m
+            years_remaining = np.arange(T - 1, -1, -1)
+            sip_future = float(np.sum(year_sips * year_sip_future * (1 + r_m) ** (12 * years_remaining)))
             final_value = (lumpsum_future + sip_future) * (1 + r_i) ** T
             return round(final_value)
         except ZeroDivisionError:
@@ -1,11 +1,19 @@
 # XIRR_Calculator.py
 
 from __future__ import annotations
+import numpy as np
 import pandas as pd
-import pyxirr
-from typing import List, Literal
+from typing import Literal
+from core.rebalancer import RebalancePolicy
 from utils.combine_navs import build_composite_nav
-from config.config import ENABLE_XIRR_DUMP
+from utils.sip_schedule import annual_sip_amounts, monthly_sip_amounts, normalized_sip
+from config.config import DEFAULT_DATASET
+from utils.artifact_cache import artifact_cache
+from utils.logger import get_logger
+from utils.quantile_sketch import QuantileSketch
+from utils.xirr_diagnostics import xirr_diagnostics
+
+logger = get_logger()
 
 
 class XirrCalculator:
@@ -13,52 +21,147 @@ class XirrCalculator:
         pass
 
     def _compute_rolling_window_xirrs(
-        self, df: pd.DataFrame, time_horizon: int, sip_amount: float = 1000
-    ) -> List[float]:
+        self,
+        df: pd.DataFrame,
+        time_horizon: int,
+        sip_amount: float = 1000,
+        sip_step_up: float = 0.0,
+        sip_step_up_mode: Literal['percentage', 'amount'] = 'percentage'
+    ) -> np.ndarray:
         """
         Compute XIRRs for rolling SIP windows using historical data.
+
+        Units bought in every window come from one cumulative sum of 1/NAV: each
+        window-year's units are a difference of two prefix sums times that year's
+        SIP amount, so an annually stepped-up SIP costs the same as a flat one.
+        The XIRR of every window is then solved in a single vectorized pass.
         """
         months = time_horizon * 12
-        xirrs: List[float] = []
+        n_windows = len(df) - months
+        if months <= 0 or n_windows <= 0:
+            return np.empty(0)
 
-        for start in range(len(df) - months):
-            window = df.iloc[start : start + months + 1]
-            if len(window) < months + 1:
-                continue
+        navs = df['NAV_INR'].to_numpy(dtype=np.float64)
+        days = df['Date'].to_numpy(dtype='datetime64[D]').astype(np.int64)
 
-            dates = window['Date'].iloc[:months].tolist()
-            amounts = [-sip_amount] * months
+        years = -(-months // 12)
+        year_amounts = annual_sip_amounts(sip_amount, years, sip_step_up, sip_step_up_mode)
 
-            start_prices = window['NAV_INR'].iloc[:months].values
-            end_price = window['NAV_INR'].iloc[months]
+        # cum_units[i] = units bought by investing 1 at each of the first i NAVs
+        cum_units = np.concatenate(([0.0], np.cumsum(1.0 / navs)))
+        starts = np.arange(n_windows)[:, None]
+        block_begin = np.minimum(np.arange(years) * 12, months)
+        block_end = np.minimum(block_begin + 12, months)
+        units_per_year = cum_units[starts + block_end] - cum_units[starts + block_begin]
 
-            units = [sip_amount / p for p in start_prices]
-            total_units = sum(units)
-            maturity_value = total_units * end_price
+        total_units = units_per_year @ year_amounts
+        maturity_values = total_units * navs[months:months + n_windows]
 
-            dates.append(window['Date'].iloc[months])
-            amounts.append(maturity_value)
+        # Cash-flow times in years (act/365) from each window's first SIP date
+        offsets = np.arange(months + 1)
+        times = (days[starts + offsets] - days[starts]) / 365.0
+        outflows = monthly_sip_amounts(sip_amount, months, sip_step_up, sip_step_up_mode)
 
-            try:
-                xirr_val = pyxirr.xirr(dict(zip(dates, amounts))) * 100
-                xirrs.append(xirr_val)
-            except Exception as e:
-                raise ValueError(e)
-        
-        return xirrs
+        return self._solve_window_xirrs(times, outflows, maturity_values) * 100
+
+    def _solve_window_xirrs(
+        self,
+        times: np.ndarray,
+        outflows: np.ndarray,
+        maturity_values: np.ndarray,
+        max_iter: int = 200,
+        tol: float = 1e-12
+    ) -> np.ndarray:
+        """
+        Safeguarded Newton solve of NPV = 0 for every window at once.
+
+        With x = ln(1 + r), NPV = 0 is equivalent to
+            h(x) = ln(maturity value) - ln(sum of SIPs compounded to maturity at x) = 0,
+        and h is strictly decreasing, so each window has exactly one root. Newton runs on
+        h (which cannot overflow) inside a per-window bracket on x that is narrowed after
+        every step; a step that leaves the bracket is replaced by bisection, so windows
+        with heavy losses converge as well as ordinary ones.
+
+        Args:
+            times: (windows, months + 1) cash-flow times in years; last column is maturity.
+            outflows: (months,) SIP amounts, identical across windows.
+            maturity_values: (windows,) redemption value at the end of each window.
+
+        Returns:
+            np.ndarray: (windows,) annualised XIRR as a fraction.
+
+        Raises:
+            ValueError: If a window has no value at maturity or fails to converge.
+        """
+        if np.any(maturity_values <= 0):
+            raise ValueError('XIRR is undefined for a rolling window with no value at maturity.')
+
+        # Years from each SIP to maturity, and the log SIP amounts (-inf for skipped months)
+        to_maturity = times[:, -1:] - times[:, :-1]
+        with np.errstate(divide='ignore'):
+            log_outflows = np.log(outflows)
+        log_maturity = np.log(maturity_values)
+
+        def h(x: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+            z = log_outflows + x[:, None] * to_maturity
+            z_max = z.max(axis=1, keepdims=True)
+            weights = np.exp(z - z_max)
+            total = weights.sum(axis=1)
+            value = log_maturity - (z_max[:, 0] + np.log(total))
+            slope = -(weights * to_maturity).sum(axis=1) / total
+            return value, slope
+
+        # Widen [lo, hi] until h(lo) > 0 > h(hi); |x| = 2**10 is far beyond any real return
+        lo = np.full(len(maturity_values), -1.0)
+        hi = np.full(len(maturity_values), 1.0)
+        for _ in range(10):
+            below, above = h(lo)[0] <= 0, h(hi)[0] >= 0
+            if not (below.any() or above.any()):
+                break
+            lo[below] *= 2
+            hi[above] *= 2
+        else:
+            raise ValueError('XIRR did not converge for every rolling window.')
+
+        x = np.clip(np.log1p(0.1), lo, hi)
+        for _ in range(max_iter):
+            value, slope = h(x)
+            positive = value > 0
+            lo = np.where(positive, x, lo)
+            hi = np.where(positive, hi, x)
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                x_new = x - value / slope
+            outside = ~((x_new >= lo) & (x_new <= hi))
+            x_new[outside] = (lo[outside] + hi[outside]) / 2
+
+            converged = (np.abs(x_new - x) < tol) | (value == 0)
+            x = x_new
+            if np.all(converged):
+                break
+        else:
+            raise ValueError('XIRR did not converge for every rolling window.')
+
+        return np.expm1(x)
 
     def compute_asset_rolling_xirr(
         self,
         time_horizon: int,
         df: pd.DataFrame | None = None,
         feather_path: str | None = None,
-        mode: Literal["mean", "median", "optimistic", "pessimistic"] = "median"
+        mode: Literal["mean", "median", "optimistic", "pessimistic"] = "median",
+        sip_amount: float = 1000,
+        sip_step_up: float = 0.0,
+        sip_step_up_mode: Literal['percentage', 'amount'] = 'percentage'
     ) -> float:
         """
         :param time_horizon: Investment horizon in years.
         :param feather_path: If provided, reads this Feather file into df.
         :param df: If provided, uses this DataFrame directly (skips reading from file).
         :param mode: 'median', 'mean', 'pessimistic', or 'optimistic'.
+        :param sip_amount: Monthly SIP in the first year of each window.
+        :param sip_step_up: Annual SIP step-up (fraction or rupees, see sip_step_up_mode).
+        :param sip_step_up_mode: 'percentage' or 'amount'.
         :return: Estimated return rate (% CAGR).
         """
         if df is None:
@@ -69,38 +172,94 @@ class XirrCalculator:
         df['Date'] = pd.to_datetime(df['Date'])
         df = df.sort_values('Date').reset_index(drop=True)
 
-        xirrs = self._compute_rolling_window_xirrs(df, time_horizon)
-        if not xirrs:
-            print('[WARNING] Inadequate data to compute returns for given time horizon. Defaulting to maximum available data.\n')
-            xirrs = self._compute_rolling_window_xirrs(df, int(len(df) / 12 - 1))
-            if not xirrs:
+        xirrs = self._rolling_xirrs_with_fallback(
+            df, time_horizon, sip_amount=sip_amount, sip_step_up=sip_step_up, sip_step_up_mode=sip_step_up_mode
+        )
+
+        rate = self._summarize_xirrs(self._xirr_quantiles(xirrs), mode)
+        if xirr_diagnostics.enabled:
+            xirr_diagnostics.record(
+                'asset', {'time_horizon': time_horizon, 'sip_amount': sip_amount, 'sip_step_up': sip_step_up,
+                          'sip_step_up_mode': sip_step_up_mode},
+                mode, rate, df['Date'].to_numpy(), xirrs
+            )
+        return rate
+
+    def _rolling_xirrs_with_fallback(self, df: pd.DataFrame, time_horizon: int, **sip_kwargs) -> np.ndarray:
+        """
+        Rolling window XIRRs (%) for the horizon, or for the longest horizon the data allows.
+        """
+        xirrs = self._compute_rolling_window_xirrs(df, time_horizon, **sip_kwargs)
+        if len(xirrs) == 0:
+            logger.warning('Inadequate data to compute returns for given time horizon. Defaulting to maximum available data.')
+            xirrs = self._compute_rolling_window_xirrs(df, int(len(df) / 12 - 1), **sip_kwargs)
+            if len(xirrs) == 0:
                 raise ValueError('Not enough data to compute returns.')
-        
-        series = pd.Series(xirrs)
+        return xirrs
+
+    def _xirr_quantiles(self, xirrs: np.ndarray) -> np.ndarray:
+        """
+        [median, mean, 25th percentile, 75th percentile] of the window XIRRs, unrounded.
+        Streamed through a quantile sketch, which is exact for up to QUANTILE_SKETCH_K windows.
+        """
+        sketch = QuantileSketch.from_values(xirrs)
+        median, q25, q75 = sketch.quantile([0.5, 0.25, 0.75])
+        return np.array([median, sketch.mean(), q25, q75])
 
-        if ENABLE_XIRR_DUMP:
-            series.to_csv('temp/xirr_dump.csv')
-           
+    def _summarize_xirrs(
+        self,
+        quantiles: np.ndarray,
+        mode: Literal["mean", "median", "optimistic", "pessimistic"]
+    ) -> float:
         if mode == "median":
-            return round(series.median(), 2)
+            return round(float(quantiles[0]), 2)
         elif mode == "mean":
-            return round(series.mean(), 2)
+            return round(float(quantiles[1]), 2)
         elif mode == "pessimistic":
-            return round(series.quantile(0.25), 2)
+            return round(float(quantiles[2]), 2)
         elif mode == "optimistic":
-            return round(series.quantile(0.75), 2)
+            return round(float(quantiles[3]), 2)
         else:
             raise ValueError()
-        
+
     def compute_portfolio_rolling_xirr(
         self, 
         portfolio: dict[str, float],
         time_horizon: int,
-        mode: Literal["mean", "median", "optimistic", "pessimistic"] = "median"
+        mode: Literal["mean", "median", "optimistic", "pessimistic"] = "median",
+        sip_amount: float = 1000,
+        sip_step_up: float = 0.0,
+        sip_step_up_mode: Literal['percentage', 'amount'] = 'percentage',
+        dataset: str = DEFAULT_DATASET,
+        rebalance: RebalancePolicy | None = None
     ) -> float:
-        composite_df = build_composite_nav(portfolio=portfolio)
+        # Daily datasets are already on the SIP calendar in the panel, so cost does not grow with daily rows.
+        # Window XIRRs and their quantiles are derived from the dataset alone, so they are kept in the
+        # persistent artifact cache and shared by every worker and restart until the data or code changes.
+        # They do not depend on the SIP's scale, so every SIP of the same shape shares one entry.
+        sip_kwargs = normalized_sip(sip_amount, sip_step_up, sip_step_up_mode)
+        policy = rebalance or RebalancePolicy()
+        params = {
+            'portfolio': list(portfolio.items()),
+            'rebalance': policy.to_dict(),
+            'time_horizon': int(time_horizon),
+            **sip_kwargs
+        }
+
+        def window_xirrs() -> np.ndarray:
+            return artifact_cache.get_or_compute('window_xirrs', dataset, params, compute_window_xirrs)
 
-        if 'NAV_INR' not in composite_df.columns:
-            raise ValueError("Input DataFrame must contain 'NAV_INR' column.")
+        def compute_window_xirrs() -> np.ndarray:
+            composite_df = build_composite_nav(portfolio=portfolio, dataset=dataset, rebalance=policy)
+            if 'NAV_INR' not in composite_df.columns:
+                raise ValueError("Input DataFrame must contain 'NAV_INR' column.")
+            return self._rolling_xirrs_with_fallback(composite_df, time_horizon, **sip_kwargs)
 
-        return self.compute_asset_rolling_xirr(time_horizon=time_horizon, df=composite_df, mode=mode) / 100
\ No newline at end of file
+        quantiles = artifact_cache.get_or_compute(
+            'xirr_quantiles', dataset, params, lambda: self._xirr_quantiles(window_xirrs())
+        )
+        rate = self._summarize_xirrs(quantiles, mode)
+        if xirr_diagnostics.enabled:
+            dates = build_composite_nav(portfolio=portfolio, dataset=dataset, rebalance=policy)['Date'].to_numpy()
+            xirr_diagnostics.record('portfolio', {'dataset': dataset, **params}, mode, rate, dates, window_xirrs())
+        return rate / 100
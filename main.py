@@ -1,27 +1,283 @@
+import asyncio
 import json
-from typing import Literal
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+import os
+import uuid
+from contextlib import asynccontextmanager
+from typing import Literal, Optional
+from fastapi import FastAPI, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import FileResponse, JSONResponse
+from pydantic import BaseModel, ValidationError
 
+import numpy as np
+
+from config.config import (
+    ADMIN_TOKEN,
+    FAN_CHART_CHUNK_PATHS,
+    FAN_CHART_PATHS,
+    POST_RETIREMENT_RETURN_RATE,
+    WARMUP_ENABLED
+)
+from models.HouseholdData import HouseholdData
+from models.SWPResponse import BacktestResponse, FanChartResponse, HouseholdResponse, LongevityResponse, SWPResponse
 from models.UserData import UserData
-from core.run_analysis import runAnalysis
+from core.analysis_session import AnalysisSession, merge_update
+from core.run_analysis import runAnalysis, runBacktest, runFanChart, runHouseholdAnalysis
+from core.exceptions import MemoryBudgetExceeded
+from core.swp_calculator import SWPCalculator
+from utils.config_snapshot import config_store, current_snapshot, pin_snapshot
 from utils.logger import get_logger
+from utils.memory_tracker import (
+    enforce_memory_budget,
+    estimate_analysis_bytes,
+    estimate_batch_bytes,
+    memory_stats,
+    track_stage
+)
+from utils.request_profiler import profile_call, profile_store, should_profile
+from utils.warmup import run_warmup, warmup_state
+from utils.xirr_diagnostics import current_request_id, xirr_diagnostics
 
-app = FastAPI()
 logger = get_logger()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background so /live answers at once; /ready gates traffic until it finishes
+    if WARMUP_ENABLED:
+        warmup_task = asyncio.create_task(asyncio.to_thread(run_warmup))
+    else:
+        warmup_state.ready = True
+        warmup_task = None
+    config_store.watch()
+    yield
+    config_store.stop()
+    if warmup_task is not None and not warmup_task.done():
+        logger.warning('Shutting down before warm-up finished.')
+
+
+app = FastAPI(lifespan=lifespan)
+
 class SWPRequest(BaseModel):
     user_data: UserData
     swp_mode: Literal['conservative', 'aggressive']
     pre_retirement_risk: Literal['conservative', 'aggressive', 'balanced']
     post_retirement_risk: Literal['conservative', 'aggressive', 'balanced']
+    # Name of a configured glide path; replaces the risk portfolios for the return rates
+    glide_path: Optional[str] = None
+
+class FanChartRequest(SWPRequest):
+    num_paths: int = FAN_CHART_PATHS
+    # Year-end points only, instead of every month of retirement
+    yearly: bool = False
+
+class HouseholdRequest(BaseModel):
+    household: HouseholdData
+    swp_mode: Literal['conservative', 'aggressive']
+    pre_retirement_risk: Literal['conservative', 'aggressive', 'balanced']
+    post_retirement_risk: Literal['conservative', 'aggressive', 'balanced']
+    glide_path: Optional[str] = None
+
+class LongevityRequest(BaseModel):
+    corpus: float | list[float]
+    monthly_swp: float | list[float]
+    post_retirement_return_rate: float = POST_RETIREMENT_RETURN_RATE
+    # Defaults to the inflation rate of the live config
+    annual_inflation_rate: Optional[float] = None
+    flat_withdrawals: bool = False
+
+def _new_request_id(response: Response) -> str:
+    request_id = uuid.uuid4().hex
+    response.headers['X-Request-ID'] = request_id
+    current_request_id.set(request_id)
+    # The request runs on the config live when it arrived, even if a reload goes live meanwhile
+    response.headers['X-Config-Version'] = str(pin_snapshot().version)
+    return request_id
+
+
+def _check_memory_budget(estimated_bytes: int) -> None:
+    try:
+        enforce_memory_budget(estimated_bytes)
+    except MemoryBudgetExceeded as me:
+        logger.warning(f"Rejected: {me}")
+        raise HTTPException(status_code=413, detail=str(me))
+
+
+def _require_admin(request: Request) -> None:
+    if not ADMIN_TOKEN or request.headers.get('X-Admin-Token') != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+@app.get('/live')
+async def live():
+    return {'status': 'alive'}
+
+
+@app.get('/ready')
+async def ready():
+    state = warmup_state.to_dict()
+    return JSONResponse(status_code=200 if state['ready'] else 503, content=state)
+
+
+@app.post('/swp-calculator', response_model=SWPResponse)
+async def swp_calculator(req: SWPRequest, request: Request, response: Response):
+    request_id = _new_request_id(response)
+    logger.info(f'---------- New Request Received ({request_id}) ----------')
+    _check_memory_budget(estimate_analysis_bytes(req.user_data.current_age, req.user_data.expected_retirement_age))
+    try:
+        args = (req.user_data, req.swp_mode, req.pre_retirement_risk, req.post_retirement_risk)
+        if should_profile(request.headers):
+            result = profile_call(request_id, runAnalysis, *args, glide_path=req.glide_path)
+        else:
+            result = runAnalysis(*args, glide_path=req.glide_path)
+        return SWPResponse.from_result(result)
+    except ValueError as ve:
+        logger.error(f"ValueError: {ve}")
+        raise HTTPException(status_code=422, detail=str(ve))
+    except KeyError as ke:
+        logger.error(f"KeyError: {ke}")
+        raise HTTPException(status_code=400, detail=f"Missing key: {ke}")
+    except Exception as e:
+        logger.exception(f"Unexpected error: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@app.post('/swp-backtest', response_model=BacktestResponse)
+async def swp_backtest(req: SWPRequest, request: Request, response: Response):
+    request_id = _new_request_id(response)
+    logger.info(f'---------- New Backtest Request Received ({request_id}) ----------')
+    _check_memory_budget(
+        estimate_analysis_bytes(req.user_data.current_age, req.user_data.expected_retirement_age, backtest=True)
+    )
+    try:
+        args = (req.user_data, req.swp_mode, req.pre_retirement_risk, req.post_retirement_risk)
+        if should_profile(request.headers):
+            analysis, backtest = profile_call(request_id, runBacktest, *args, glide_path=req.glide_path)
+        else:
+            analysis, backtest = runBacktest(*args, glide_path=req.glide_path)
+        return BacktestResponse.from_result(analysis, backtest)
+    except ValueError as ve:
+        logger.error(f"ValueError: {ve}")
+        raise HTTPException(status_code=422, detail=str(ve))
+    except KeyError as ke:
+        logger.error(f"KeyError: {ke}")
+        raise HTTPException(status_code=400, detail=f"Missing key: {ke}")
+    except Exception as e:
+        logger.exception(f"Unexpected error: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+def _session_reply(session: AnalysisSession, update: dict, seq, merged_updates: int) -> dict:
+    # Runs in its own thread's context, so the pin lasts for this update only
+    reply = {'seq': seq, 'merged_updates': merged_updates, 'config_version': pin_snapshot().version}
+    try:
+        result, recomputed = session.apply(update)
+        reply.update(recomputed=recomputed, result=SWPResponse.from_result(result).model_dump())
+    except ValidationError as ve:
+        reply['error'] = ve.errors(include_url=False, include_context=False)
+    except (ValueError, MemoryBudgetExceeded) as e:
+        logger.error(f"Session update failed: {e}")
+        reply['error'] = str(e)
+    except Exception as e:
+        logger.exception(f"Unexpected error: {e}")
+        reply['error'] = "Internal server error"
+    return reply
+
+
+@app.websocket('/ws/session')
+async def analysis_session(websocket: WebSocket):
+    """
+    Interactive session: the client sends {"seq": n, "update": {...partial SWPRequest...}}
+    and receives the recomputed result for the merged request. Updates that arrive while
+    a recomputation runs are merged into one, and the reply carries the latest seq.
+    """
+    await websocket.accept()
+    session_id = uuid.uuid4().hex
+    logger.info(f'---------- New Session Opened ({session_id}) ----------')
+    session = AnalysisSession(SWPRequest.model_validate)
+    pending = {'update': {}, 'seq': None, 'count': 0}
+    updated = asyncio.Event()
+
+    async def receive():
+        while True:
+            try:
+                message = await websocket.receive_json()
+            except (ValueError, KeyError):
+                # Not JSON (KeyError: a binary frame); answered like any other malformed message
+                message = None
+            if not isinstance(message, dict) or not isinstance(message.get('update', {}), dict):
+                await websocket.send_json({'seq': None, 'error': 'Expected {"seq": ..., "update": {...}}'})
+                continue
+            pending['update'] = merge_update(pending['update'], message.get('update', {}))
+            pending['seq'] = message.get('seq')
+            pending['count'] += 1
+            updated.set()
+
+    receiver = asyncio.create_task(receive())
+    try:
+        while True:
+            waiter = asyncio.create_task(updated.wait())
+            await asyncio.wait({receiver, waiter}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver.done():
+                waiter.cancel()
+                receiver.result()
+                break
+
+            updated.clear()
+            update, seq, count = pending['update'], pending['seq'], pending['count']
+            pending.update(update={}, count=0)
+            reply = await asyncio.to_thread(_session_reply, session, update, seq, count)
+            await websocket.send_json(reply)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        logger.info(f'Session closed ({session_id}).')
 
-@app.post('/swp-calculator')
-async def swp_calculator(req: SWPRequest):
-    logger.info('---------- New Request Received ----------')
+
+@app.post('/household', response_model=HouseholdResponse)
+async def household(req: HouseholdRequest, request: Request, response: Response):
+    request_id = _new_request_id(response)
+    logger.info(f'---------- New Household Request Received ({request_id}) ----------')
+    # Members sharing horizons share return-rate work, so the sum is an upper bound
+    _check_memory_budget(sum(
+        estimate_analysis_bytes(member.current_age, member.expected_retirement_age)
+        for member in req.household.members
+    ))
+    try:
+        args = (req.household, req.swp_mode, req.pre_retirement_risk, req.post_retirement_risk)
+        if should_profile(request.headers):
+            result = profile_call(request_id, runHouseholdAnalysis, *args, glide_path=req.glide_path)
+        else:
+            result = runHouseholdAnalysis(*args, glide_path=req.glide_path)
+        return HouseholdResponse.from_result(result)
+    except ValueError as ve:
+        logger.error(f"ValueError: {ve}")
+        raise HTTPException(status_code=422, detail=str(ve))
+    except KeyError as ke:
+        logger.error(f"KeyError: {ke}")
+        raise HTTPException(status_code=400, detail=f"Missing key: {ke}")
+    except Exception as e:
+        logger.exception(f"Unexpected error: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@app.post('/fan-chart', response_model=FanChartResponse)
+async def fan_chart(req: FanChartRequest, request: Request, response: Response):
+    request_id = _new_request_id(response)
+    logger.info(f'---------- New Fan Chart Request Received ({request_id}) ----------')
+    post_retirement_months = (current_snapshot().avg_life_expectancy - req.user_data.expected_retirement_age) * 12
+    _check_memory_budget(
+        estimate_analysis_bytes(req.user_data.current_age, req.user_data.expected_retirement_age)
+        + estimate_batch_bytes(min(req.num_paths, FAN_CHART_CHUNK_PATHS) * max(post_retirement_months + 1, 0))
+    )
     try:
-        result = runAnalysis(req.user_data, req.swp_mode, req.pre_retirement_risk, req.post_retirement_risk)
-        return result
+        args = (req.user_data, req.swp_mode, req.pre_retirement_risk, req.post_retirement_risk)
+        kwargs = dict(num_paths=req.num_paths, yearly=req.yearly, glide_path=req.glide_path)
+        if should_profile(request.headers):
+            analysis, fan_chart = profile_call(request_id, runFanChart, *args, **kwargs)
+        else:
+            analysis, fan_chart = runFanChart(*args, **kwargs)
+        return FanChartResponse.from_result(analysis, fan_chart)
     except ValueError as ve:
         logger.error(f"ValueError: {ve}")
         raise HTTPException(status_code=422, detail=str(ve))
@@ -31,3 +287,144 @@ async def swp_calculator(req: SWPRequest):
     except Exception as e:
         logger.exception(f"Unexpected error: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@app.post('/corpus-longevity', response_model=LongevityResponse)
+async def corpus_longevity(req: LongevityRequest, response: Response):
+    request_id = _new_request_id(response)
+    logger.info(f'---------- New Longevity Request Received ({request_id}) ----------')
+    batch_size = max(np.size(req.corpus), np.size(req.monthly_swp))
+    _check_memory_budget(estimate_batch_bytes(batch_size))
+    try:
+        with track_stage('corpus_longevity'):
+            months = SWPCalculator().compute_corpus_longevity(
+                corpus=req.corpus,
+                monthly_swp=req.monthly_swp,
+                post_retirement_return_rate=req.post_retirement_return_rate,
+                annual_inflation_rate=(
+                    req.annual_inflation_rate if req.annual_inflation_rate is not None
+                    else current_snapshot().annual_inflation_rate
+                ),
+                flat_withdrawals=req.flat_withdrawals
+            )
+        return LongevityResponse.from_months(np.atleast_1d(months))
+    except ValueError as ve:
+        logger.error(f"ValueError: {ve}")
+        raise HTTPException(status_code=422, detail=str(ve))
+    except Exception as e:
+        logger.exception(f"Unexpected error: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@app.get('/admin/memory')
+async def memory_usage(request: Request):
+    _require_admin(request)
+    return memory_stats.snapshot()
+
+
+class XirrDiagnosticsToggle(BaseModel):
+    enabled: bool
+
+
+@app.get('/admin/xirr-diagnostics')
+async def xirr_diagnostics_status(request: Request):
+    _require_admin(request)
+    return xirr_diagnostics.status()
+
+
+@app.put('/admin/xirr-diagnostics')
+async def toggle_xirr_diagnostics(toggle: XirrDiagnosticsToggle, request: Request):
+    _require_admin(request)
+    xirr_diagnostics.set_enabled(toggle.enabled)
+    logger.info(f'XIRR diagnostics {"enabled" if toggle.enabled else "disabled"}.')
+    return xirr_diagnostics.status()
+
+
+@app.get('/admin/xirr-diagnostics/export')
+async def export_xirr_diagnostics(request: Request, request_id: Optional[str] = None):
+    _require_admin(request)
+    filename = f'xirr_diagnostics_{request_id or "all"}.parquet'
+    return Response(
+        content=xirr_diagnostics.to_parquet(request_id),
+        media_type='application/vnd.apache.parquet',
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+
+@app.get('/admin/xirr-diagnostics/{request_id}')
+async def get_xirr_diagnostics(request_id: str, request: Request):
+    _require_admin(request)
+    captures = xirr_diagnostics.get(request_id)
+    if not captures:
+        raise HTTPException(status_code=404, detail="No XIRR diagnostics for this request")
+    return {'request_id': request_id, 'captures': [capture.to_dict() for capture in captures]}
+
+
+class ConfigOverrides(BaseModel):
+    model_config = {'extra': 'forbid'}
+
+    portfolios: Optional[dict[str, dict[str, float]]] = None
+    # Anchor years relative to retirement, as in config.GLIDE_PATHS
+    glide_paths: Optional[dict[str, dict[int, dict[str, float]]]] = None
+    annual_inflation_rate: Optional[float] = None
+    avg_life_expectancy: Optional[int] = None
+    nav_datasets: Optional[dict[str, dict]] = None
+
+
+def _start_config_reload(overrides: dict | None):
+    try:
+        candidate = config_store.start_reload(overrides)
+    except ValueError as ve:
+        raise HTTPException(status_code=422, detail=str(ve))
+    except RuntimeError as re:
+        raise HTTPException(status_code=409, detail=str(re))
+
+    if candidate is None:
+        return {'status': 'unchanged', 'version': config_store.live().version}
+    logger.info(f'Config version {candidate.version} from {candidate.source} is building.')
+    # The swap happens once the new version is warm; poll GET /admin/config for it
+    return JSONResponse(status_code=202, content={
+        'status': 'building',
+        'version': candidate.version,
+        'fingerprint': candidate.fingerprint,
+        'source': candidate.source
+    })
+
+
+@app.get('/admin/config')
+async def config_status(request: Request):
+    _require_admin(request)
+    return config_store.status()
+
+
+@app.put('/admin/config')
+async def replace_config(overrides: ConfigOverrides, request: Request):
+    """
+    Builds a config version of the config.py defaults with these overrides, replacing any earlier overrides.
+    """
+    _require_admin(request)
+    return _start_config_reload(overrides.model_dump(exclude_none=True))
+
+
+@app.post('/admin/config/reload')
+async def reload_config_file(request: Request):
+    _require_admin(request)
+    return _start_config_reload(None)
+
+
+@app.get('/admin/profiles')
+async def list_profiles(request: Request):
+    _require_admin(request)
+    return profile_store.list()
+
+
+@app.get('/admin/profiles/{request_id}')
+async def download_profile(request_id: str, request: Request):
+    _require_admin(request)
+    try:
+        path = profile_store.path(request_id)
+    except ValueError as ve:
+        raise HTTPException(status_code=422, detail=str(ve))
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"No profile stored for request {request_id}")
+    return FileResponse(path, media_type='application/octet-stream', filename=os.path.basename(path))
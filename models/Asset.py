@@ -1,10 +1,11 @@
 # source/Asset.py
 
+import numpy as np
 import pandas as pd
-import pyxirr
 
-from core.xirr_calculator import XirrCalculator
+from config.config import FOREX_RATES_DIR
 from core.currency_converter import CurrencyConverter
+from utils.daily_nav import load_sip_calendar_nav
 
 
 class Asset:
@@ -14,70 +15,140 @@ class Asset:
       - weight (fraction of the total portfolio)
       - path to its historical NAV (feather) file
       - methods to compute expected return, per-asset SIP, and per-asset XIRR
+
+    History is held as two typed arrays (datetime64 dates, float64 NAVs) rather
+    than a DataFrame, and instances use __slots__ to avoid a per-instance __dict__.
+    Daily histories are resampled to one NAV per SIP date on load.
     """
 
+    __slots__ = (
+        'name',
+        'feather_path',
+        'weight',
+        'is_sip_start_of_month',
+        'expected_return_rate',
+        'asset_sip_amount',
+        'asset_xirr',
+        'forex_dir',
+        'frequency',
+        'sip_day',
+        '_dates',
+        '_navs',
+        '_nav_column'
+    )
+
     def __init__(
         self,
         name: str,
         feather_path: str,
         weight: float,
-        is_sip_start_of_month: bool = False
+        is_sip_start_of_month: bool = False,
+        forex_dir: str = FOREX_RATES_DIR,
+        frequency: str = 'monthly',
+        sip_day: int | None = None
     ):
         """
         :param name: Asset name (e.g., "smallcap").
         :param feather_path: Path to that asset's historical price (Feather format).
         :param weight: Fraction of total portfolio allocated to this asset (must sum to 1).
         :param is_sip_start_of_month: If True, SIP is at month-start; otherwise month-end.
+        :param forex_dir: Directory of the forex files used for INR conversion.
+        :param frequency: 'monthly' (one NAV per SIP date already) or 'daily' (resampled on load).
+        :param sip_day: Day of the month the SIP falls on, for daily histories; defaults to
+                        the 1st if is_sip_start_of_month, otherwise the month-end.
         """
         self.name = name
         self.feather_path = feather_path
         self.weight = weight
         self.is_sip_start_of_month = is_sip_start_of_month
+        self.forex_dir = forex_dir
+        self.frequency = frequency
+        self.sip_day = sip_day if sip_day is not None else (1 if is_sip_start_of_month else None)
 
         self.expected_return_rate: float = 0.0   # % annual, from rolling‐window XIRR
         self.asset_sip_amount: float = 0.0       # ₹ SIP per month for this asset
         self.asset_xirr: float = 0.0             # XIRR % computed for this asset
-        self._df: pd.DataFrame | None = None     # loaded historical DataFrame
+        self._dates: np.ndarray | None = None    # (T,) datetime64[ns] NAV dates
+        self._navs: np.ndarray | None = None     # (T,) float64 NAVs
+        self._nav_column: str = 'NAV_INR'        # currency column the NAVs are quoted in
+
+
+    @property
+    def dates(self) -> np.ndarray:
+        if self._dates is None:
+            self.load_history()
+        return self._dates
+
+
+    @property
+    def navs(self) -> np.ndarray:
+        if self._navs is None:
+            self.load_history()
+        return self._navs
+
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        ['Date', <NAV column>] view of the history, for DataFrame-based consumers.
+        """
+        return pd.DataFrame({'Date': self.dates, self._nav_column: self.navs}, copy=False)
 
 
     def convert_navs_to_inr(self) -> None:
         """
         Converts the NAV of the historical data to inr using date-matched conversion rates.
+        No-op once the NAVs are already in INR, so conversion runs at most once per instance.
         """
-        curr_conv = CurrencyConverter()
-        if self._df is None:
+        if self._navs is None:
             self.load_history()
+        if self._nav_column == 'NAV_INR':
+            return
+
+        curr_conv = CurrencyConverter(forex_dir=self.forex_dir)
+        converted = curr_conv.convert_to_inr(nav_data=self.to_frame())
+        self._navs = converted['NAV_INR'].to_numpy(dtype=np.float64)
+        self._nav_column = 'NAV_INR'
 
-        self._df = curr_conv.convert_to_inr(nav_data=self._df)
-            
 
     def load_history(self) -> None:
         """
-        Reads the Feather file into self._df, normalizes dates to midnight, and sorts.
+        Reads the Feather file, normalizes dates to midnight, sorts, and keeps only typed arrays.
+        Daily histories come back already on the SIP calendar and in INR.
         """
+        if self.frequency == 'daily':
+            df = load_sip_calendar_nav(self.feather_path, self.sip_day, self.forex_dir)
+            self._nav_column = 'NAV_INR'
+            self._dates = df['Date'].to_numpy(dtype='datetime64[ns]')
+            self._navs = df['NAV_INR'].to_numpy(dtype=np.float64)
+            return
+
         df = pd.read_feather(self.feather_path)
         df['Date'] = pd.to_datetime(df['Date']).dt.normalize()
         df = df.sort_values('Date').reset_index(drop=True)
-        self._df = df
 
-            
+        self._nav_column = next(col for col in df.columns if col.startswith('NAV_'))
+        self._dates = df['Date'].to_numpy(dtype='datetime64[ns]')
+        self._navs = df[self._nav_column].to_numpy(dtype=np.float64)
+
+
     def compute_rolling_xirr(
         self,
         time_horizon: int,
         mode: str = "median"
     ) -> float:
         """
-        Uses SIPReturnForecaster to compute rolling-window SIP XIRR (median/mean/etc.)
-        on this asset's history. Stores result in self.expected_return_rate.
+        Uses XirrCalculator to compute rolling-window SIP XIRR (median/mean/etc.)
+        on this asset's INR history. Stores result in self.expected_return_rate.
         """
-        if self._df is None:
-            self.load_history()
+        # Imported here: core.xirr_calculator depends on the asset registry, which depends on Asset
+        from core.xirr_calculator import XirrCalculator
 
+        self.convert_navs_to_inr()
         xirr_calc = XirrCalculator()
 
-        expected = xirr_calc.compute_rolling_xirr(
+        expected = xirr_calc.compute_asset_rolling_xirr(
             time_horizon=time_horizon,
-            df=self._df,
+            df=self.to_frame(),
             mode=mode
         )
         self.expected_return_rate = expected
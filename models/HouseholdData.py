@@ -0,0 +1,18 @@
+from pydantic import BaseModel, Field
+from typing import Literal, Optional
+
+class HouseholdMember(BaseModel):
+    name: Optional[str] = None
+    current_age: int
+    expected_retirement_age: int
+    current_retirement_corpus: float
+    retirement_sip: float
+    sip_step_up: float = 0.0
+    sip_step_up_mode: Literal['percentage', 'amount'] = 'percentage'
+    # Fraction of the household's retirement expenses this member's corpus funds; equal shares if omitted
+    expense_share: Optional[float] = None
+
+class HouseholdData(BaseModel):
+    members: list[HouseholdMember] = Field(min_length=1)
+    # Combined monthly expenses of the household in retirement, in today's rupees
+    expected_retirement_expenses: float
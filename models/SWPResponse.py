@@ -0,0 +1,102 @@
+from pydantic import BaseModel
+from typing import Optional
+
+from models.SWPResult import BacktestResult, FanChartResult, HouseholdResult, SWPResult
+
+class SWPResponse(BaseModel):
+    current_corpus_future_value: int
+    ideal_target_corpus: int
+    corpus_gap: int
+    adequacy: int
+    extra_sip_required: float
+    manual_swp_current: int
+    manual_swp_target: int
+    safe_swp_current: float
+    safe_swp_target: float
+
+    @classmethod
+    def from_result(cls, result: SWPResult) -> "SWPResponse":
+        return cls(**result.to_dict())
+
+
+class BacktestSummary(BaseModel):
+    dataset: str
+    num_start_months: int
+    horizon_months: int
+    failure_rate: float
+    worst_depletion_month: Optional[int]
+    worst_start_date: Optional[str]
+    median_final_balance: float
+    balance_percentile_paths: dict[str, list[float]]
+    reserve_percentile_paths: dict[str, list[float]]
+
+
+class BacktestResponse(BaseModel):
+    analysis: SWPResponse
+    backtest: BacktestSummary
+
+    @classmethod
+    def from_result(cls, analysis: SWPResult, backtest: BacktestResult) -> "BacktestResponse":
+        return cls(
+            analysis=SWPResponse.from_result(analysis),
+            backtest=BacktestSummary(**backtest.to_dict())
+        )
+
+
+class FanChartSummary(BaseModel):
+    num_paths: int
+    months: list[int]
+    depletion_probability: float
+    balance_bands: dict[str, list[float]]
+    reserve_bands: dict[str, list[float]]
+
+
+class FanChartResponse(BaseModel):
+    analysis: SWPResponse
+    fan_chart: FanChartSummary
+
+    @classmethod
+    def from_result(cls, analysis: SWPResult, fan_chart: FanChartResult) -> "FanChartResponse":
+        return cls(
+            analysis=SWPResponse.from_result(analysis),
+            fan_chart=FanChartSummary(**fan_chart.to_dict())
+        )
+
+
+class LongevityResponse(BaseModel):
+    # One entry per (corpus, monthly_swp) pair; None where the corpus is never exhausted
+    depletion_month: list[Optional[int]]
+    lasts_years: list[Optional[float]]
+
+    @classmethod
+    def from_months(cls, months) -> "LongevityResponse":
+        finite = [None if m == float('inf') else int(m) for m in months.tolist()]
+        return cls(
+            depletion_month=finite,
+            lasts_years=[None if m is None else round(m / 12, 2) for m in finite]
+        )
+
+
+class HouseholdMemberResponse(SWPResponse):
+    name: Optional[str]
+    pre_retirement_return_rate: float
+    post_retirement_return_rate: float
+
+
+class HouseholdCombinedResponse(BaseModel):
+    current_corpus_future_value: int
+    ideal_target_corpus: int
+    corpus_gap: int
+    adequacy: int
+    extra_sip_required: float
+    safe_swp_current: float
+    safe_swp_target: float
+
+
+class HouseholdResponse(BaseModel):
+    members: list[HouseholdMemberResponse]
+    combined: HouseholdCombinedResponse
+
+    @classmethod
+    def from_result(cls, result: HouseholdResult) -> "HouseholdResponse":
+        return cls(**result.to_dict())
@@ -0,0 +1,215 @@
+from dataclasses import dataclass
+import numpy as np
+
+"""
+    Internal result types. Plain frozen, slotted dataclasses over typed NumPy
+    arrays; conversion to Pydantic happens only at the API boundary (see
+    models/SWPResponse.py).
+"""
+
+@dataclass(frozen=True, slots=True)
+class SWPSchedule:
+    """
+    Month-end corpus schedule of one scenario.
+
+    Attributes:
+        months: (M+1,) int32 month index, 0 = retirement.
+        balances: (M+1,) core corpus after each month's withdrawal.
+        reserves: (M+1,) reserve corpus.
+    """
+    months: np.ndarray
+    balances: np.ndarray
+    reserves: np.ndarray
+
+    def rows(self):
+        """
+        Yields (month, balance, reserve) as Python scalars, for display and file output.
+        """
+        return zip(self.months.tolist(), self.balances.tolist(), self.reserves.tolist())
+
+
+@dataclass(frozen=True, slots=True)
+class ScheduleSummary:
+    """
+    Summary points of a schedule, for callers that do not need every monthly row.
+
+    Attributes:
+        depletion_month: First month the core corpus is zero or below; None if it lasts the horizon.
+        final_balance: Core corpus after the last withdrawal.
+        final_reserve: Reserve after the last month.
+        yearly_balances: (years+1,) core corpus at each year-end, year 0 first.
+    """
+    depletion_month: int | None
+    final_balance: float
+    final_reserve: float
+    yearly_balances: np.ndarray
+
+
+@dataclass(frozen=True, slots=True)
+class ScenarioResult:
+    """
+    One side of the analysis: the current plan or the target plan.
+
+    Attributes:
+        corpus: Corpus at retirement (future value of current savings, or the target corpus).
+        monthly_swp: First-year safe monthly withdrawal from that corpus.
+        schedule: Month-end corpus schedule under that withdrawal.
+        reserve_corpus: Amount kept aside from the corpus in the schedule (0 in aggressive mode).
+    """
+    corpus: int
+    monthly_swp: float
+    schedule: SWPSchedule
+    reserve_corpus: int = 0
+
+
+@dataclass(frozen=True, slots=True)
+class SWPResult:
+    current_corpus_future_value: int
+    ideal_target_corpus: int
+    corpus_gap: int
+    adequacy: int
+    extra_sip_required: float
+    manual_swp_current: int
+    manual_swp_target: int
+    safe_swp_current: float
+    safe_swp_target: float
+    current_schedule: SWPSchedule | None = None
+    target_schedule: SWPSchedule | None = None
+    current_reserve_corpus: int = 0
+
+    def to_dict(self) -> dict:
+        """
+        Summary fields, as returned by the API (schedules and reserve excluded).
+        """
+        return {
+            'current_corpus_future_value': self.current_corpus_future_value,
+            'ideal_target_corpus': self.ideal_target_corpus,
+            'corpus_gap': self.corpus_gap,
+            'adequacy': self.adequacy,
+            'extra_sip_required': self.extra_sip_required,
+            'manual_swp_current': self.manual_swp_current,
+            'manual_swp_target': self.manual_swp_target,
+            'safe_swp_current': self.safe_swp_current,
+            'safe_swp_target': self.safe_swp_target
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class BacktestResult:
+    """
+    Attributes:
+        percentiles: Percentile levels of the bands, e.g. (5, 25, 50, 75, 95).
+        balance_bands: (len(percentiles), M+1) core balance per percentile and month.
+        reserve_bands: (len(percentiles), M+1) reserve balance per percentile and month.
+    """
+    dataset: str
+    num_start_months: int
+    horizon_months: int
+    failure_rate: float
+    worst_depletion_month: int | None
+    worst_start_date: str | None
+    median_final_balance: float
+    percentiles: tuple[int, ...]
+    balance_bands: np.ndarray
+    reserve_bands: np.ndarray
+
+    def to_dict(self) -> dict:
+        return {
+            'dataset': self.dataset,
+            'num_start_months': self.num_start_months,
+            'horizon_months': self.horizon_months,
+            'failure_rate': self.failure_rate,
+            'worst_depletion_month': self.worst_depletion_month,
+            'worst_start_date': self.worst_start_date,
+            'median_final_balance': self.median_final_balance,
+            'balance_percentile_paths': {
+                f'p{p}': np.round(band, 2).tolist() for p, band in zip(self.percentiles, self.balance_bands)
+            },
+            'reserve_percentile_paths': {
+                f'p{p}': np.round(band, 2).tolist() for p, band in zip(self.percentiles, self.reserve_bands)
+            }
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class FanChartResult:
+    """
+    Attributes:
+        months: (K,) reported months of retirement, 0 included.
+        balance_bands: (len(percentiles), K) core balance per percentile and reported month.
+        reserve_bands: (len(percentiles), K) reserve balance per percentile and reported month.
+        depletion_probability: Fraction of paths on which the core corpus runs out.
+    """
+    num_paths: int
+    months: np.ndarray
+    percentiles: tuple[int, ...]
+    balance_bands: np.ndarray
+    reserve_bands: np.ndarray
+    depletion_probability: float
+
+    def to_dict(self) -> dict:
+        return {
+            'num_paths': self.num_paths,
+            'months': self.months.tolist(),
+            'depletion_probability': self.depletion_probability,
+            'balance_bands': {
+                f'p{p}': np.round(band, 2).tolist() for p, band in zip(self.percentiles, self.balance_bands)
+            },
+            'reserve_bands': {
+                f'p{p}': np.round(band, 2).tolist() for p, band in zip(self.percentiles, self.reserve_bands)
+            }
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class HouseholdResult:
+    """
+    Per-member fields are (N,) arrays in member order; combined fields cover the household.
+    extra_sip_required is the member's total SIP needed to reach their target (their current
+    SIP if they are already funded).
+    """
+    names: list[str | None]
+    current_corpus_future_value: np.ndarray
+    ideal_target_corpus: np.ndarray
+    corpus_gap: np.ndarray
+    adequacy: np.ndarray
+    extra_sip_required: np.ndarray
+    manual_swp_current: np.ndarray
+    manual_swp_target: np.ndarray
+    safe_swp_current: np.ndarray
+    safe_swp_target: np.ndarray
+    pre_retirement_return_rate: np.ndarray
+    post_retirement_return_rate: np.ndarray
+
+    def to_dict(self) -> dict:
+        members = []
+        for i, name in enumerate(self.names):
+            members.append({
+                'name': name,
+                'current_corpus_future_value': int(self.current_corpus_future_value[i]),
+                'ideal_target_corpus': int(self.ideal_target_corpus[i]),
+                'corpus_gap': int(self.corpus_gap[i]),
+                'adequacy': int(self.adequacy[i]),
+                'extra_sip_required': float(self.extra_sip_required[i]),
+                'manual_swp_current': int(self.manual_swp_current[i]),
+                'manual_swp_target': int(self.manual_swp_target[i]),
+                'safe_swp_current': float(self.safe_swp_current[i]),
+                'safe_swp_target': float(self.safe_swp_target[i]),
+                'pre_retirement_return_rate': float(self.pre_retirement_return_rate[i]),
+                'post_retirement_return_rate': float(self.post_retirement_return_rate[i])
+            })
+
+        current_total = int(self.current_corpus_future_value.sum())
+        target_total = int(self.ideal_target_corpus.sum())
+        return {
+            'members': members,
+            'combined': {
+                'current_corpus_future_value': current_total,
+                'ideal_target_corpus': target_total,
+                'corpus_gap': target_total - current_total,
+                'adequacy': round(current_total / target_total * 100),
+                'extra_sip_required': round(float(self.extra_sip_required.sum()), 2),
+                'safe_swp_current': round(float(self.safe_swp_current.sum()), 2),
+                'safe_swp_target': round(float(self.safe_swp_target.sum()), 2)
+            }
+        }
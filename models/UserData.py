@@ -1,9 +1,12 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Literal, Optional
 
 class UserData(BaseModel):
     current_age: int
     expected_retirement_age: int
     expected_retirement_expenses: float
     current_retirement_corpus: float
-    retirement_sip: float
\ No newline at end of file
+    retirement_sip: float
+    # Annual SIP increase: a fraction (0.10 = 10%) in 'percentage' mode, rupees in 'amount' mode
+    sip_step_up: float = 0.0
+    sip_step_up_mode: Literal['percentage', 'amount'] = 'percentage'
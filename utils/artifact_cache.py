@@ -0,0 +1,227 @@
+import glob
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from config.config import ARTIFACT_CACHE_ENABLED, ARTIFACT_CACHE_MAX_BYTES, ARTIFACT_CACHE_PATH
+from utils.logger import get_logger
+from utils.nav_panel import get_nav_panel
+
+logger = get_logger()
+
+"""
+    Artifact Cache: Persistent store of artifacts derived from the NAV data
+    (window XIRR arrays, their quantiles, composite NAV series), shared by every
+    process on the host and kept across restarts.
+
+    Entries live in one SQLite database in WAL mode, so any number of processes
+    can read while one writes. An entry's key covers the dataset's content hash
+    (the published NAV panel version) and a hash of the code and default
+    settings that derive it, so new data, a new release or a changed default
+    never reads a stale artifact; old entries are simply never hit again and
+    age out. Total size is capped by evicting the least recently used entries;
+    the total is kept up to date by triggers, so a write never scans the table.
+
+    Values are NumPy arrays, or dicts of arrays, stored in .npz format (no pickling).
+    Any database error is logged and the artifact is computed without caching.
+"""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    dataset TEXT NOT NULL,
+    dataset_version TEXT NOT NULL,
+    code_version TEXT NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS artifacts_last_access ON artifacts (last_access);
+CREATE TABLE IF NOT EXISTS artifact_totals (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    bytes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO artifact_totals SELECT 1, COALESCE(SUM(size), 0) FROM artifacts
+    WHERE NOT EXISTS (SELECT 1 FROM artifact_totals);
+CREATE TRIGGER IF NOT EXISTS artifacts_total_insert AFTER INSERT ON artifacts BEGIN
+    UPDATE artifact_totals SET bytes = bytes + NEW.size;
+END;
+CREATE TRIGGER IF NOT EXISTS artifacts_total_update AFTER UPDATE OF size ON artifacts BEGIN
+    UPDATE artifact_totals SET bytes = bytes + NEW.size - OLD.size;
+END;
+CREATE TRIGGER IF NOT EXISTS artifacts_total_delete AFTER DELETE ON artifacts BEGIN
+    UPDATE artifact_totals SET bytes = bytes - OLD.size;
+END;
+"""
+_ACCESS_TOUCH_INTERVAL = 60.0      # seconds; bounds write traffic from reads
+_EVICT_TO_FRACTION = 0.9           # evict down to this fraction of the cap, not just under it
+_CODE_DIRS = ('core', 'utils', 'models')
+_CODE_FILES = ('config/config.py',)    # defaults such as QUANTILE_SKETCH_K shape cached values
+
+_code_version: str | None = None
+
+
+def code_version() -> str:
+    """
+    Hash of every source file under core/, utils/ and models/ and of config/config.py,
+    computed once per process.
+    """
+    global _code_version
+    if _code_version is None:
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        paths = [path for directory in _CODE_DIRS for path in sorted(glob.glob(os.path.join(root, directory, '*.py')))]
+        paths += [os.path.join(root, path) for path in _CODE_FILES]
+        digest = hashlib.sha256()
+        for path in paths:
+            digest.update(os.path.relpath(path, root).encode())
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        _code_version = digest.hexdigest()[:16]
+    return _code_version
+
+
+def _serialize(value) -> bytes:
+    arrays = value if isinstance(value, dict) else {'value': value}
+    buffer = io.BytesIO()
+    np.savez(buffer, **arrays)
+    return buffer.getvalue()
+
+
+def _deserialize(blob: bytes):
+    with np.load(io.BytesIO(blob), allow_pickle=False) as archive:
+        arrays = {name: archive[name] for name in archive.files}
+    return arrays['value'] if list(arrays) == ['value'] else arrays
+
+
+class ArtifactCache:
+    def __init__(
+        self,
+        path: str = ARTIFACT_CACHE_PATH,
+        max_bytes: int = ARTIFACT_CACHE_MAX_BYTES,
+        enabled: bool = ARTIFACT_CACHE_ENABLED
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        One connection per thread and process; connections are never shared across a fork.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        # One transaction, so a concurrent writer cannot slip in between the total and its triggers
+        try:
+            conn.executescript(f'BEGIN IMMEDIATE; {_SCHEMA} COMMIT;')
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            conn.close()
+            raise
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _versions(self, dataset: str) -> tuple[str, str]:
+        return get_nav_panel(dataset).version, code_version()
+
+    def make_key(self, kind: str, dataset: str, params: dict) -> str:
+        dataset_version, code_ver = self._versions(dataset)
+        payload = json.dumps([kind, dataset, dataset_version, code_ver, params], sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, kind: str, dataset: str, params: dict):
+        """
+        Returns the cached artifact, or None on a miss.
+        """
+        key = self.make_key(kind, dataset, params)
+        conn = self._connection()
+        row = conn.execute('SELECT value, last_access FROM artifacts WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+
+        now = time.time()
+        if now - row[1] > _ACCESS_TOUCH_INTERVAL:
+            conn.execute('UPDATE artifacts SET last_access = ? WHERE key = ?', (now, key))
+        return _deserialize(row[0])
+
+    def put(self, kind: str, dataset: str, params: dict, value) -> None:
+        dataset_version, code_ver = self._versions(dataset)
+        key = self.make_key(kind, dataset, params)
+        blob = _serialize(value)
+        now = time.time()
+
+        conn = self._connection()
+        # An upsert rather than INSERT OR REPLACE: REPLACE deletes without firing the delete trigger
+        conn.execute(
+            'INSERT INTO artifacts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET '
+            'value = excluded.value, size = excluded.size, created = excluded.created, '
+            'last_access = excluded.last_access',
+            (key, kind, dataset, dataset_version, code_ver, blob, len(blob), now, now)
+        )
+        self._evict_if_needed(conn)
+
+    def get_or_compute(self, kind: str, dataset: str, params: dict, compute):
+        """
+        Cached artifact if present, otherwise compute() stored for every later process.
+        Concurrent misses may compute the same artifact twice; the last write wins.
+        """
+        if not self.enabled:
+            return compute()
+
+        try:
+            value = self.get(kind, dataset, params)
+        except sqlite3.Error as e:
+            logger.warning(f'Artifact cache read failed ({e}). Computing {kind} uncached.')
+            return compute()
+        if value is not None:
+            return value
+
+        value = compute()
+        try:
+            self.put(kind, dataset, params, value)
+        except sqlite3.Error as e:
+            logger.warning(f'Artifact cache write failed ({e}).')
+        return value
+
+    def _evict_if_needed(self, conn: sqlite3.Connection) -> None:
+        total = conn.execute('SELECT bytes FROM artifact_totals').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        target = self.max_bytes * _EVICT_TO_FRACTION
+        evicted = 0
+        for key, size in conn.execute('SELECT key, size FROM artifacts ORDER BY last_access').fetchall():
+            if total <= target:
+                break
+            conn.execute('DELETE FROM artifacts WHERE key = ?', (key,))
+            total -= size
+            evicted += 1
+        logger.info(f'Artifact cache evicted {evicted} entries.')
+
+    def stats(self) -> dict:
+        entries, size = self._connection().execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM artifacts'
+        ).fetchone()
+        return {'entries': entries, 'bytes': size, 'max_bytes': self.max_bytes}
+
+    def clear(self) -> None:
+        self._connection().execute('DELETE FROM artifacts')
+
+
+artifact_cache = ArtifactCache()
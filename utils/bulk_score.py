@@ -0,0 +1,421 @@
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.ipc as pa_ipc
+import pyarrow.parquet as pq
+
+import numpy as np
+
+from core.run_analysis import runAnalysis
+from models.UserData import UserData
+from utils.logger import get_logger
+from utils.quantile_sketch import QuantileSketch
+
+logger = get_logger()
+
+"""
+    Bulk Scorer: Runs runAnalysis over every UserData row of a Parquet, Arrow
+    (IPC/Feather) or CSV file without going through the web server.
+
+    The input is streamed in fixed-size record batches and fanned out to a
+    process pool, with only a bounded number of batches in flight, so memory
+    stays flat however many rows the file holds. Each worker writes its batch
+    as one Parquet part into the output directory (a Parquet dataset readable
+    with pd.read_parquet(<dir>)); parts are renamed into place only once
+    complete, so an interrupted run resumes by skipping the parts that exist.
+
+    Rows may carry their own swp_mode / pre_retirement_risk / post_retirement_risk
+    columns; otherwise the scenario given on the command line is used.
+
+    The run summary includes the distribution (mean and percentiles) of the
+    DISTRIBUTION_COLUMNS over all scored rows. Each worker returns a quantile
+    sketch of its batch and the sketches are merged, so the summary costs constant
+    memory however many rows there are; resumed runs sketch the existing parts.
+
+    Usage:
+        python -m utils.bulk_score customers.parquet temp/scores --workers 8
+        python -m utils.bulk_score customers.csv temp/scores --swp-mode aggressive --id-column customer_id
+        python -m utils.bulk_score customers.parquet temp/scores --merge-to temp/scores.parquet
+"""
+
+INPUT_FORMATS = {
+    '.parquet': 'parquet',
+    '.arrow': 'arrow',
+    '.feather': 'arrow',
+    '.ipc': 'arrow',
+    '.csv': 'csv'
+}
+SCENARIO_FIELDS = ['swp_mode', 'pre_retirement_risk', 'post_retirement_risk']
+MANIFEST_NAME = '_manifest.json'
+CSV_BLOCK_SIZE = 1 << 22     # bytes per CSV read block; fixed so batch boundaries are stable across resumes
+
+DISTRIBUTION_COLUMNS = ['current_corpus_future_value', 'corpus_gap', 'adequacy', 'safe_swp_current']
+DISTRIBUTION_PERCENTILES = [5, 25, 50, 75, 95]
+
+RESULT_SCHEMA = pa.schema([
+    ('current_corpus_future_value', pa.int64()),
+    ('ideal_target_corpus', pa.int64()),
+    ('corpus_gap', pa.int64()),
+    ('adequacy', pa.int64()),
+    ('extra_sip_required', pa.float64()),
+    ('manual_swp_current', pa.int64()),
+    ('manual_swp_target', pa.int64()),
+    ('safe_swp_current', pa.float64()),
+    ('safe_swp_target', pa.float64())
+])
+
+
+def detect_format(path: str) -> str:
+    """
+    Raises:
+        ValueError: If the file extension is not a supported input format.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in INPUT_FORMATS:
+        raise ValueError(f'Unsupported input format "{ext}". Expected one of {sorted(INPUT_FORMATS)}.')
+    return INPUT_FORMATS[ext]
+
+
+def _input_columns(path: str, fmt: str) -> list[str]:
+    if fmt == 'parquet':
+        return pq.ParquetFile(path).schema_arrow.names
+    if fmt == 'arrow':
+        with pa.memory_map(path) as source:
+            try:
+                return pa_ipc.open_file(source).schema.names
+            except pa.ArrowInvalid:
+                source.seek(0)
+                return pa_ipc.open_stream(source).schema.names
+    return pa_csv.open_csv(path).schema.names
+
+
+def select_columns(path: str, id_column: str | None = None) -> list[str]:
+    """
+    The subset of input columns the scorer reads: UserData fields, per-row scenario and the ID column.
+
+    Raises:
+        ValueError: If a required UserData field or the ID column is missing.
+    """
+    available = set(_input_columns(path, detect_format(path)))
+
+    required = [name for name, field in UserData.model_fields.items() if field.is_required()]
+    missing = [name for name in required if name not in available]
+    if id_column and id_column not in available:
+        missing.append(id_column)
+    if missing:
+        raise ValueError(f'Input is missing columns: {missing}')
+
+    wanted = list(UserData.model_fields) + SCENARIO_FIELDS + ([id_column] if id_column else [])
+    return [name for name in wanted if name in available]
+
+
+def iter_record_batches(path: str, batch_size: int, columns: list[str]):
+    """
+    Streams the projected columns of the input as record batches of at most batch_size rows.
+
+    Batch boundaries depend only on the file and batch_size, so batch indices are stable across runs.
+    """
+    fmt = detect_format(path)
+
+    if fmt == 'parquet':
+        yield from pq.ParquetFile(path).iter_batches(batch_size=batch_size, columns=columns)
+        return
+
+    if fmt == 'arrow':
+        with pa.memory_map(path) as source:
+            try:
+                reader = pa_ipc.open_file(source)
+                batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+            except pa.ArrowInvalid:
+                source.seek(0)
+                batches = iter(pa_ipc.open_stream(source))
+            for batch in batches:
+                yield from _split_batch(batch.select(columns), batch_size)
+        return
+
+    reader = pa_csv.open_csv(
+        path,
+        read_options=pa_csv.ReadOptions(block_size=CSV_BLOCK_SIZE),
+        convert_options=pa_csv.ConvertOptions(include_columns=columns)
+    )
+    for batch in reader:
+        yield from _split_batch(batch, batch_size)
+
+
+def _split_batch(batch: pa.RecordBatch, batch_size: int):
+    for offset in range(0, batch.num_rows, batch_size):
+        yield batch.slice(offset, batch_size)
+
+
+def _part_path(output_dir: str, batch_index: int) -> str:
+    return os.path.join(output_dir, f'part-{batch_index:06d}.parquet')
+
+
+def _init_worker() -> None:
+    # Row failures are recorded in the output's error column; per-row logs would swamp the log file
+    logging.getLogger('app').setLevel(logging.CRITICAL)
+
+
+def _describe_error(error: Exception) -> str:
+    """
+    "Type: message" of the error, or of its cause when runAnalysis wrapped it in a bare CriticalInternalError.
+    """
+    if error.__cause__ is not None and not str(error):
+        error = error.__cause__
+    return f'{type(error).__name__}: {error}' if str(error) else type(error).__name__
+
+
+def score_rows(rows: list[dict], scenario: dict[str, str]) -> tuple[dict[str, list], list[str | None]]:
+    """
+    Runs runAnalysis on each row. Customers who are already funded are scored with
+    their current SIP as the SIP required, as in the household calculator. A row that
+    fails validation or analysis gets nulls in every result column and its error
+    message; it never fails the batch.
+
+    Returns:
+        tuple: (result columns keyed by RESULT_SCHEMA name, per-row error or None).
+    """
+    results = {name: [] for name in RESULT_SCHEMA.names}
+    errors = []
+
+    for row in rows:
+        try:
+            user_data = UserData(**{
+                name: row[name] for name in UserData.model_fields if row.get(name) is not None
+            })
+            args = [row.get(name) or scenario[name] for name in SCENARIO_FIELDS]
+            summary = runAnalysis(user_data, *args, allow_funded=True).to_dict()
+            errors.append(None)
+        except Exception as e:
+            summary = {}
+            errors.append(_describe_error(e))
+
+        for name in RESULT_SCHEMA.names:
+            results[name].append(summary.get(name))
+
+    return results, errors
+
+
+def _sketch_columns(table: pa.Table) -> dict[str, QuantileSketch]:
+    """
+    Quantile sketch of each distribution column over the rows that scored successfully.
+    """
+    sketches = {}
+    for name in DISTRIBUTION_COLUMNS:
+        values = table.column(name).drop_null().to_numpy().astype(np.float64)
+        sketches[name] = QuantileSketch.from_values(values)
+    return sketches
+
+
+def summarize_distributions(sketches: dict[str, QuantileSketch]) -> dict:
+    summary = {}
+    for name, sketch in sketches.items():
+        if sketch.count == 0:
+            continue
+        bands = sketch.quantile(np.array(DISTRIBUTION_PERCENTILES) / 100)
+        summary[name] = {'count': sketch.count, 'mean': round(sketch.mean(), 2)}
+        summary[name].update({f'p{p}': round(float(value), 2) for p, value in zip(DISTRIBUTION_PERCENTILES, bands)})
+    return summary
+
+
+def _score_batch(
+    batch_index: int,
+    row_offset: int,
+    batch: pa.RecordBatch,
+    scenario: dict[str, str],
+    output_dir: str,
+    id_column: str | None
+) -> tuple[int, int, int, dict[str, QuantileSketch]]:
+    """
+    Worker task: scores one batch and atomically writes it as a Parquet part.
+
+    Returns:
+        tuple: (batch index, rows scored, rows that errored, sketches of the distribution columns).
+    """
+    results, errors = score_rows(batch.to_pylist(), scenario)
+
+    columns = {'row_index': pa.array(range(row_offset, row_offset + batch.num_rows), type=pa.int64())}
+    if id_column:
+        columns[id_column] = batch.column(id_column)
+    columns['error'] = pa.array(errors, type=pa.string())
+    for field in RESULT_SCHEMA:
+        columns[field.name] = pa.array(results[field.name], type=field.type)
+
+    final_path = _part_path(output_dir, batch_index)
+    tmp_path = f'{final_path}.tmp-{os.getpid()}'
+    table = pa.table(columns)
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, final_path)
+
+    return batch_index, batch.num_rows, sum(error is not None for error in errors), _sketch_columns(table)
+
+
+def _check_manifest(output_dir: str, manifest: dict) -> None:
+    """
+    Writes the run manifest, or checks that an existing one matches so parts from
+    different inputs or batch sizes are never mixed.
+
+    Raises:
+        ValueError: If the output directory holds a run with different parameters.
+    """
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    if os.path.exists(path):
+        with open(path) as f:
+            existing = json.load(f)
+        if existing != manifest:
+            raise ValueError(
+                f'{output_dir} holds results of a different run ({existing}). Use a new output directory.'
+            )
+        return
+
+    with open(path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+
+def run_bulk_score(
+    input_path: str,
+    output_dir: str,
+    scenario: dict[str, str],
+    batch_size: int = 10_000,
+    workers: int | None = None,
+    id_column: str | None = None,
+    max_in_flight: int | None = None
+) -> dict:
+    """
+    Scores every row of input_path into a Parquet dataset at output_dir, resuming if parts already exist.
+
+    At most max_in_flight batches (default 2 per worker) are read ahead of the pool.
+
+    Returns:
+        dict: Rows and errors scored in this run, how many batches were written or skipped, and
+              the distribution of the DISTRIBUTION_COLUMNS over all parts (skipped ones included).
+    """
+    columns = select_columns(input_path, id_column)
+    stat = os.stat(input_path)
+
+    os.makedirs(output_dir, exist_ok=True)
+    _check_manifest(output_dir, {
+        'input': os.path.abspath(input_path),
+        'input_size': stat.st_size,
+        'input_mtime_ns': stat.st_mtime_ns,
+        'batch_size': batch_size,
+        'scenario': scenario,
+        'id_column': id_column
+    })
+
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or 2 * workers
+    summary = {'rows': 0, 'errors': 0, 'batches_written': 0, 'batches_skipped': 0}
+    sketches = {name: QuantileSketch() for name in DISTRIBUTION_COLUMNS}
+
+    def merge_sketches(batch_sketches: dict[str, QuantileSketch]):
+        for name, sketch in batch_sketches.items():
+            sketches[name].merge(sketch)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        pending = set()
+
+        def drain(return_when):
+            nonlocal pending
+            done, pending = wait(pending, return_when=return_when)
+            for future in done:
+                batch_index, rows, errors, batch_sketches = future.result()
+                merge_sketches(batch_sketches)
+                summary['rows'] += rows
+                summary['errors'] += errors
+                summary['batches_written'] += 1
+                logger.info(f'Bulk score: batch {batch_index} written ({rows} rows, {errors} errors).')
+
+        row_offset = 0
+        for batch_index, batch in enumerate(iter_record_batches(input_path, batch_size, columns)):
+            part_path = _part_path(output_dir, batch_index)
+            if os.path.exists(part_path):
+                summary['batches_skipped'] += 1
+                merge_sketches(_sketch_columns(pq.read_table(part_path, columns=DISTRIBUTION_COLUMNS)))
+            else:
+                if len(pending) >= max_in_flight:
+                    drain(FIRST_COMPLETED)
+                pending.add(pool.submit(
+                    _score_batch, batch_index, row_offset, batch, scenario, output_dir, id_column
+                ))
+            row_offset += batch.num_rows
+
+        drain('ALL_COMPLETED')
+
+    summary['distributions'] = summarize_distributions(sketches)
+    return summary
+
+
+def merge_parts(output_dir: str, merged_path: str) -> int:
+    """
+    Concatenates the parts of a finished run into a single Parquet file, one part in memory at a time.
+
+    Returns:
+        int: Total rows written.
+    """
+    part_paths = sorted(glob.glob(os.path.join(output_dir, 'part-*.parquet')))
+    if not part_paths:
+        raise FileNotFoundError(f'No result parts found in {output_dir}')
+
+    total = 0
+    writer = None
+    try:
+        for path in part_paths:
+            table = pq.read_table(path)
+            if writer is None:
+                writer = pq.ParquetWriter(merged_path, table.schema)
+            writer.write_table(table)
+            total += table.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    return total
+
+
+def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Score a file of UserData rows with runAnalysis.')
+    parser.add_argument('input', help='Parquet, Arrow/Feather or CSV file of UserData rows.')
+    parser.add_argument('output', help='Output directory (Parquet dataset); rerun with the same arguments to resume.')
+    parser.add_argument('--swp-mode', choices=['conservative', 'aggressive'], default='conservative')
+    parser.add_argument('--pre-retirement-risk', choices=['conservative', 'balanced', 'aggressive'], default='aggressive')
+    parser.add_argument('--post-retirement-risk', choices=['conservative', 'balanced', 'aggressive'], default='balanced')
+    parser.add_argument('--batch-size', type=int, default=10_000)
+    parser.add_argument('--workers', type=int, help='Worker processes (default: CPU count).')
+    parser.add_argument('--id-column', help='Input column copied through to the output to join results back.')
+    parser.add_argument('--merge-to', help='After scoring, also concatenate all parts into this single Parquet file.')
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = _parse_args(argv)
+    scenario = {
+        'swp_mode': args.swp_mode,
+        'pre_retirement_risk': args.pre_retirement_risk,
+        'post_retirement_risk': args.post_retirement_risk
+    }
+
+    summary = run_bulk_score(
+        args.input,
+        args.output,
+        scenario,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        id_column=args.id_column
+    )
+    if args.merge_to:
+        summary['merged_rows'] = merge_parts(args.output, args.merge_to)
+        summary['merged_to'] = args.merge_to
+
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
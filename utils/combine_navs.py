@@ -1,35 +1,49 @@
+import numpy as np
 import pandas as pd
-from core.currency_converter import CurrencyConverter
-from config.config import ASSET_NAV_DATA_PATH
+from config.config import DEFAULT_DATASET
+from core.rebalancer import RebalancePolicy, rebalanced_composite_navs
+from utils.artifact_cache import artifact_cache
+from utils.memory_tracker import track_stage
+from utils.nav_panel import get_nav_panel
 
-def build_composite_nav(portfolio: dict[str, float]) -> pd.DataFrame:
+@track_stage('composite_nav')
+def build_composite_nav(
+    portfolio: dict[str, float],
+    dataset: str = DEFAULT_DATASET,
+    rebalance: RebalancePolicy | None = None
+) -> pd.DataFrame:
     """
-    Builds a composite NAV time series by weighting each asset's NAV over time.
+    Builds a composite NAV time series for a portfolio held at its target weights.
+
+    Reads from the process-shared, memory-mapped NAV panel, so no Feather file is
+    parsed and no currency conversion is repeated on the request path. The result
+    is kept in the persistent artifact cache, keyed by the dataset content hash.
 
     Args:
         portfolio (dict): Dictionary mapping asset name to weight (float).
+        dataset (str): Key into NAV_DATASETS selecting which NAV/forex history to use.
+        rebalance (RebalancePolicy | None): Rebalancing policy; defaults to the configured one.
+            Frequency 'none' gives the weighted sum of asset NAV levels instead.
 
     Returns:
-        pd.DataFrame: DataFrame with ['Date', 'NAV_INR'] for the composite portfolio.
+        pd.DataFrame: DataFrame with ['Date', 'NAV_INR'] for the composite portfolio;
+                      a rebalanced series starts at 1.
     """
-    composite_df = None
-    curr_conv = CurrencyConverter()
+    policy = rebalance or RebalancePolicy()
+    arrays = artifact_cache.get_or_compute(
+        'composite_nav', dataset, {'portfolio': list(portfolio.items()), 'rebalance': policy.to_dict()},
+        lambda: _compute_composite(portfolio, dataset, policy)
+    )
+    return pd.DataFrame({'Date': arrays['Date'], 'NAV_INR': arrays['NAV_INR']})
 
-    for name, weight in portfolio.items():
-        path = ASSET_NAV_DATA_PATH.get(name)
-        if not path:
-            raise ValueError(f"Missing path for asset: {name}")
-        
-        df = pd.read_feather(path)
-        df = curr_conv.convert_to_inr(nav_data=df)
-        
-        df = df[['Date', 'NAV_INR']].copy()
-        df['NAV_INR'] *= weight
 
-        if composite_df is None:
-            composite_df = df
-        else:
-            composite_df = composite_df.merge(df, on='Date', how='inner', suffixes=('', f'_{name}'))
-            composite_df['NAV_INR'] += composite_df.pop(f'NAV_INR_{name}')
+def _compute_composite(portfolio: dict[str, float], dataset: str, policy: RebalancePolicy) -> dict[str, np.ndarray]:
+    if policy.frequency == 'none':
+        df = get_nav_panel(dataset).composite_nav(portfolio)
+        return {
+            'Date': df['Date'].to_numpy(dtype='datetime64[ns]'),
+            'NAV_INR': df['NAV_INR'].to_numpy(dtype=np.float64)
+        }
 
-    return composite_df.reset_index(drop=True)
+    dates, navs = rebalanced_composite_navs([portfolio], [policy], dataset)
+    return {'Date': np.asarray(dates, dtype='datetime64[ns]'), 'NAV_INR': navs[:, 0]}
@@ -0,0 +1,477 @@
+import contextvars
+import copy
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from config.config import (
+    AGGRESSIVE_PORTFOLIO,
+    ANNUAL_INFLATION_RATE,
+    AVG_LIFE_EXPECTANCY,
+    BALANCED_PORTFOLIO,
+    CONFIG_FILE,
+    CONFIG_FILE_POLL_SECONDS,
+    CONSERVATIVE_PORTFOLIO,
+    DEFAULT_DATASET,
+    GLIDE_PATHS,
+    NAV_DATASETS
+)
+from utils.logger import get_logger
+
+logger = get_logger()
+
+"""
+    Config Snapshot: Versioned, hot-reloadable view of the settings an analysis
+    is sized with: the risk portfolios, glide paths, inflation rate, life
+    expectancy and the source files of every NAV dataset.
+
+    A snapshot is the constants of config.py with an overrides document layered
+    on top, read from SWPC_CONFIG_FILE (re-read whenever the file changes) or
+    sent to the /admin/config endpoint. A reload validates the overrides, then
+    builds the new version's data in the background with the new snapshot pinned:
+    panels of repointed datasets are published and attached, and the warm-up fills
+    the artifact cache and runs the first analyses. Only then is the live
+    reference swapped, so no request meets a cold cache.
+
+    A request pins the live snapshot when it starts, in a context variable that
+    follows it into the task graph's threads, and reads every setting from it; a
+    request in flight during a swap finishes on the version it started with.
+    Caches derived from a dataset are keyed by a hash of its spec, so entries of
+    the old and new version are valid side by side and the swap invalidates nothing.
+    Once the new version is live, the in-process assets and attached panels of
+    datasets it repointed are dropped (requests still holding them keep working,
+    and such requests do not cache them again).
+"""
+
+RISK_LEVELS = ('conservative', 'balanced', 'aggressive')
+SETTINGS = ('portfolios', 'glide_paths', 'annual_inflation_rate', 'avg_life_expectancy', 'nav_datasets')
+
+active_snapshot: ContextVar['ConfigSnapshot | None'] = ContextVar('active_snapshot', default=None)
+
+
+def _digest(value) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True).encode()).hexdigest()[:16]
+
+
+@dataclass(frozen=True, slots=True)
+class ConfigSnapshot:
+    # Shared by every request pinned to it: treat the dicts as read-only
+    version: int
+    source: str
+    loaded_at: float
+    fingerprint: str                                    # hash of the settings below
+    portfolios: dict[str, dict[str, float]]
+    glide_paths: dict[str, dict[int, dict[str, float]]]
+    annual_inflation_rate: float
+    avg_life_expectancy: int
+    nav_datasets: dict[str, dict]
+    dataset_keys: dict[str, str]                        # dataset -> hash of its spec
+
+    def portfolio(self, risk_level: str) -> dict[str, float]:
+        """
+        Raises:
+            ValueError: If the risk level is unknown.
+        """
+        if risk_level not in self.portfolios:
+            raise ValueError(f'Unknown risk level: {risk_level}')
+        return self.portfolios[risk_level]
+
+    def dataset(self, name: str) -> dict:
+        """
+        Raises:
+            ValueError: If the dataset is unknown.
+        """
+        if name not in self.nav_datasets:
+            raise ValueError(f"Unknown NAV dataset: {name}")
+        return self.nav_datasets[name]
+
+    def dataset_key(self, name: str) -> str:
+        """
+        Hash of a dataset's spec; part of the key of every cache derived from the dataset.
+        """
+        self.dataset(name)
+        return self.dataset_keys[name]
+
+    def to_dict(self) -> dict:
+        return {
+            'version': self.version,
+            'source': self.source,
+            'loaded_at': self.loaded_at,
+            'fingerprint': self.fingerprint,
+            'portfolios': self.portfolios,
+            'glide_paths': self.glide_paths,
+            'annual_inflation_rate': self.annual_inflation_rate,
+            'avg_life_expectancy': self.avg_life_expectancy,
+            'nav_datasets': self.nav_datasets,
+            'dataset_keys': self.dataset_keys
+        }
+
+
+def _default_settings() -> dict:
+    return copy.deepcopy({
+        'portfolios': {
+            'conservative': CONSERVATIVE_PORTFOLIO,
+            'balanced': BALANCED_PORTFOLIO,
+            'aggressive': AGGRESSIVE_PORTFOLIO
+        },
+        'glide_paths': GLIDE_PATHS,
+        'annual_inflation_rate': ANNUAL_INFLATION_RATE,
+        'avg_life_expectancy': AVG_LIFE_EXPECTANCY,
+        'nav_datasets': NAV_DATASETS
+    })
+
+
+def _check_allocation(label: str, weights, assets: set[str], fully_invested: bool = True) -> None:
+    if not isinstance(weights, dict) or not weights:
+        raise ValueError(f'{label} must map asset names to weights.')
+    if not set(weights) <= assets:
+        raise ValueError(f'{label} has assets missing from dataset "{DEFAULT_DATASET}": {sorted(set(weights) - assets)}')
+    if any(not isinstance(w, (int, float)) or isinstance(w, bool) or w < 0 for w in weights.values()):
+        raise ValueError(f'{label} weights must be non-negative numbers.')
+    total = sum(weights.values())
+    if total <= 0 or (fully_invested and not math.isclose(total, 1.0, abs_tol=1e-6)):
+        raise ValueError(f'{label} weights must sum to 1.' if fully_invested else f'{label} weights must sum to a positive total.')
+
+
+def _check_dataset(name: str, spec) -> None:
+    if not isinstance(spec, dict) or not isinstance(spec.get('nav_paths'), dict) or not spec['nav_paths']:
+        raise ValueError(f'NAV dataset "{name}" needs a non-empty nav_paths mapping.')
+    missing = [path for path in spec['nav_paths'].values() if not os.path.isfile(path)]
+    if missing:
+        raise ValueError(f'NAV dataset "{name}" has missing NAV files: {missing}')
+    if not os.path.isdir(spec.get('forex_dir') or ''):
+        raise ValueError(f'NAV dataset "{name}" has no forex directory at {spec.get("forex_dir")}.')
+    if spec.get('frequency', 'monthly') not in ('monthly', 'daily'):
+        raise ValueError(f'NAV dataset "{name}" has unknown frequency: {spec["frequency"]}')
+    sip_day = spec.get('sip_day')
+    if sip_day is not None and (not isinstance(sip_day, int) or not 1 <= sip_day <= 28):
+        raise ValueError(f'NAV dataset "{name}" needs a sip_day between 1 and 28, or none.')
+
+
+def build_settings(overrides: dict) -> dict:
+    """
+    The config.py defaults with `overrides` layered on top: portfolios and glide paths are
+    replaced by name, datasets field by field (their nav_paths asset by asset), scalars outright.
+    Relative file paths are resolved against the working directory, like config.py's.
+
+    Raises:
+        ValueError: If a setting is unknown or invalid, or a repointed dataset's files are missing.
+    """
+    if not isinstance(overrides, dict):
+        raise ValueError('Config overrides must be a JSON object.')
+    unknown = set(overrides) - set(SETTINGS)
+    if unknown:
+        raise ValueError(f'Unknown config settings: {sorted(unknown)}')
+
+    settings = _default_settings()
+    for field in ('portfolios', 'glide_paths', 'nav_datasets'):
+        if not isinstance(overrides.get(field, {}), dict):
+            raise ValueError(f'{field} must be a JSON object.')
+
+    unknown_risks = set(overrides.get('portfolios', {})) - set(RISK_LEVELS)
+    if unknown_risks:
+        raise ValueError(f'Unknown risk levels: {sorted(unknown_risks)}')
+    settings['portfolios'].update(copy.deepcopy(overrides.get('portfolios', {})))
+
+    for name, anchors in overrides.get('glide_paths', {}).items():
+        if not isinstance(anchors, dict) or not anchors:
+            raise ValueError(f'Glide path "{name}" needs at least one anchor.')
+        try:
+            # JSON object keys are strings; anchors are years relative to retirement
+            settings['glide_paths'][name] = {int(year): weights for year, weights in anchors.items()}
+        except ValueError:
+            raise ValueError(f'Glide path "{name}" anchors must be whole years relative to retirement.') from None
+
+    for name, spec in overrides.get('nav_datasets', {}).items():
+        if not isinstance(spec, dict):
+            raise ValueError(f'NAV dataset "{name}" must be a JSON object.')
+        spec = copy.deepcopy(spec)
+        if isinstance(spec.get('nav_paths'), dict):
+            if not all(isinstance(path, str) for path in spec['nav_paths'].values()):
+                raise ValueError(f'NAV dataset "{name}" needs a file path per asset.')
+            spec['nav_paths'] = {asset: os.path.abspath(path) for asset, path in spec['nav_paths'].items()}
+        if isinstance(spec.get('forex_dir'), str):
+            spec['forex_dir'] = os.path.join(os.path.abspath(spec['forex_dir']), '')
+        base = settings['nav_datasets'].get(name, {})
+        if isinstance(spec.get('nav_paths'), dict):
+            spec['nav_paths'] = {**base.get('nav_paths', {}), **spec['nav_paths']}
+        settings['nav_datasets'][name] = {**base, **spec}
+        # Only repointed datasets touch the disk, so an unrelated missing file never blocks startup
+        _check_dataset(name, settings['nav_datasets'][name])
+
+    if 'annual_inflation_rate' in overrides:
+        rate = overrides['annual_inflation_rate']
+        if not isinstance(rate, (int, float)) or isinstance(rate, bool) or not -1 < rate < 1:
+            raise ValueError('annual_inflation_rate must be a fraction between -1 and 1.')
+        settings['annual_inflation_rate'] = float(rate)
+
+    if 'avg_life_expectancy' in overrides:
+        age = overrides['avg_life_expectancy']
+        if not isinstance(age, int) or isinstance(age, bool) or not 0 < age <= 150:
+            raise ValueError('avg_life_expectancy must be a whole number of years between 1 and 150.')
+        settings['avg_life_expectancy'] = age
+
+    assets = set(settings['nav_datasets'][DEFAULT_DATASET]['nav_paths'])
+    for risk in RISK_LEVELS:
+        _check_allocation(f'The {risk} portfolio', settings['portfolios'][risk], assets)
+    for name, anchors in settings['glide_paths'].items():
+        for year, weights in anchors.items():
+            _check_allocation(f'Glide path "{name}" at year {year}', weights, assets, fully_invested=False)
+
+    return settings
+
+
+class ConfigStore:
+    def __init__(self, config_file: str | None = CONFIG_FILE):
+        """
+        Args:
+            config_file: JSON overrides file read at startup and on every reload; None serves config.py as is.
+
+        Raises:
+            ValueError: If the config file is invalid.
+        """
+        self.config_file = config_file
+        self._lock = threading.Lock()               # guards the state below
+        self._reload_lock = threading.Lock()        # one reload at a time
+        self._stop = threading.Event()
+        self._next_version = 1
+        self._file_stamp: tuple | None = None
+        self._building: dict | None = None
+        self._last_error: dict | None = None
+        self._last_warmup: dict | None = None
+
+        overrides = self._read_file() if config_file else {}
+        self._live = self._snapshot(build_settings(overrides), config_file or 'defaults')
+        logger.info(f'Config version {self._live.version} ({self._live.fingerprint}) loaded from {self._live.source}.')
+
+    def live(self) -> ConfigSnapshot:
+        return self._live
+
+    def _stat_file(self) -> tuple:
+        stat = os.stat(self.config_file)
+        return stat.st_size, stat.st_mtime_ns
+
+    def _read_file(self) -> dict:
+        stamp = self._stat_file()
+        with open(self.config_file) as f:
+            overrides = json.load(f)
+        self._file_stamp = stamp
+        return overrides
+
+    def _snapshot(self, settings: dict, source: str) -> ConfigSnapshot:
+        with self._lock:
+            version = self._next_version
+            self._next_version += 1
+        return ConfigSnapshot(
+            version=version,
+            source=source,
+            loaded_at=time.time(),
+            fingerprint=_digest(settings),
+            dataset_keys={name: _digest(spec) for name, spec in settings['nav_datasets'].items()},
+            **settings
+        )
+
+    def _candidate(self, overrides: dict | None) -> ConfigSnapshot | None:
+        """
+        Validated snapshot of the overrides (the config file's if None), or None if nothing changed.
+        """
+        if overrides is None:
+            if not self.config_file:
+                raise ValueError('No config file is configured (SWPC_CONFIG_FILE).')
+            overrides, source = self._read_file(), self.config_file
+        else:
+            source = 'admin'
+
+        settings = build_settings(overrides)
+        if _digest(settings) == self._live.fingerprint:
+            logger.info(f'Config from {source} is unchanged; keeping version {self._live.version}.')
+            return None
+        return self._snapshot(settings, source)
+
+    def _prepare(self, candidate: ConfigSnapshot) -> dict:
+        """
+        Publishes and attaches the candidate's repointed datasets, then warms its caches; runs with it pinned.
+        """
+        from utils.nav_panel import get_nav_panel
+        from utils.warmup import WarmupState, run_warmup
+
+        active_snapshot.set(candidate)
+        for name, key in candidate.dataset_keys.items():
+            if self._live.dataset_keys.get(name) != key:
+                # A dataset that cannot be built fails the reload; warm-up failures below only cost latency
+                get_nav_panel(name)
+        return run_warmup(WarmupState(), workers=1).to_dict()
+
+    def _activate(self, candidate: ConfigSnapshot) -> None:
+        with self._lock:
+            self._building = {'version': candidate.version, 'source': candidate.source, 'started_at': time.time()}
+        try:
+            # Warm in a copy of this context, so pinning the candidate never leaks to the caller
+            warmup = contextvars.copy_context().run(self._prepare, candidate)
+        except Exception as e:
+            logger.exception(f'Config version {candidate.version} from {candidate.source} failed to build: {e}')
+            with self._lock:
+                self._building = None
+                self._last_error = {'version': candidate.version, 'source': candidate.source, 'error': str(e)}
+            raise
+
+        with self._lock:
+            self._live = candidate
+            self._building = None
+            self._last_error = None
+            self._last_warmup = warmup
+        logger.info(f'Config version {candidate.version} ({candidate.fingerprint}) from {candidate.source} is live.')
+        self._release_superseded(candidate)
+
+    def _release_superseded(self, live: ConfigSnapshot) -> None:
+        """
+        Drops the in-process assets and panels of dataset specs the live snapshot no longer uses.
+        """
+        from core.asset_registry import asset_registry
+        from utils.nav_panel import retain_panels
+
+        assets, panels = asset_registry.retain(live.dataset_keys), retain_panels(live.dataset_keys)
+        if assets or panels:
+            logger.info(f'Released {assets} assets and {panels} NAV panels of superseded datasets.')
+
+    def superseded(self, snapshot: ConfigSnapshot, dataset: str) -> bool:
+        """
+        True if a newer live snapshot has repointed or removed the dataset, so caching
+        its entries for the given (older) snapshot would only leak them.
+        """
+        live = self._live
+        return snapshot.version < live.version and live.dataset_keys.get(dataset) != snapshot.dataset_key(dataset)
+
+    def _acquire(self) -> None:
+        if not self._reload_lock.acquire(blocking=False):
+            raise RuntimeError('A config reload is already in progress.')
+
+    def reload(self, overrides: dict | None = None) -> ConfigSnapshot | None:
+        """
+        Builds, warms and swaps in a new snapshot, returning once it is live.
+
+        Args:
+            overrides: Overrides document; None re-reads the config file.
+
+        Returns:
+            ConfigSnapshot | None: The new live snapshot, or None if the settings are unchanged.
+
+        Raises:
+            ValueError: If the overrides are invalid.
+            RuntimeError: If another reload is in progress.
+        """
+        self._acquire()
+        try:
+            candidate = self._candidate(overrides)
+            if candidate is not None:
+                self._activate(candidate)
+            return candidate
+        finally:
+            self._reload_lock.release()
+
+    def start_reload(self, overrides: dict | None = None) -> ConfigSnapshot | None:
+        """
+        As reload, but only validates before returning; the build and swap run on a background thread.
+
+        Returns:
+            ConfigSnapshot | None: The snapshot being built, or None if the settings are unchanged.
+        """
+        self._acquire()
+        try:
+            candidate = self._candidate(overrides)
+        except BaseException:
+            self._reload_lock.release()
+            raise
+        if candidate is None:
+            self._reload_lock.release()
+            return None
+
+        def build():
+            try:
+                self._activate(candidate)
+            except Exception:
+                pass    # logged and recorded in the status
+            finally:
+                self._reload_lock.release()
+
+        threading.Thread(target=build, name='config-reload', daemon=True).start()
+        return candidate
+
+    def watch(self, poll_seconds: float = CONFIG_FILE_POLL_SECONDS) -> threading.Thread | None:
+        """
+        Starts a thread that reloads whenever the config file's size or mtime changes.
+        """
+        if not self.config_file or poll_seconds <= 0:
+            return None
+        self._stop.clear()
+        thread = threading.Thread(target=self._watch, args=(poll_seconds,), name='config-watcher', daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _watch(self, poll_seconds: float) -> None:
+        while not self._stop.wait(poll_seconds):
+            try:
+                if self._stat_file() == self._file_stamp:
+                    continue
+            except OSError:
+                continue        # mid-replace; look again on the next poll
+            try:
+                self.reload()
+            except RuntimeError:
+                continue        # an admin reload is running; the file is picked up on the next poll
+            except Exception as e:
+                # The failed file's stamp is recorded, so it is not retried until it changes again
+                logger.error(f'Keeping config version {self._live.version}; reload of {self.config_file} failed: {e}')
+                with self._lock:
+                    self._last_error = {'version': None, 'source': self.config_file, 'error': str(e)}
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                'live': self._live.to_dict(),
+                'building': self._building,
+                'last_error': self._last_error,
+                'last_warmup': self._last_warmup,
+                'config_file': self.config_file
+            }
+
+
+config_store = ConfigStore()
+
+
+def current_snapshot() -> ConfigSnapshot:
+    """
+    The snapshot pinned to the current context, else the live one.
+    """
+    return active_snapshot.get() or config_store.live()
+
+
+def pin_snapshot() -> ConfigSnapshot:
+    """
+    Pins the live snapshot for the rest of the current context, e.g. a request's task.
+    """
+    snapshot = config_store.live()
+    active_snapshot.set(snapshot)
+    return snapshot
+
+
+@contextmanager
+def pinned_snapshot(snapshot: ConfigSnapshot | None = None):
+    """
+    Pins a snapshot (by default the current one) for the duration; usable as a decorator,
+    so every step of an analysis started outside a request reads the same version.
+    """
+    token = active_snapshot.set(snapshot or current_snapshot())
+    try:
+        yield active_snapshot.get()
+    finally:
+        active_snapshot.reset(token)
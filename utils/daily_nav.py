@@ -0,0 +1,158 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+"""
+    Daily NAV Loader: Reads daily NAV histories and resamples them once onto the
+    monthly SIP calendar, so everything downstream (NAV panel, rolling XIRR)
+    keeps working on one row per SIP instalment however dense the source is.
+
+    The SIP calendar has one scheduled date per month: the given day of the month
+    (clipped to the month's length), or the calendar month-end. Each scheduled
+    date takes the NAV of the first trading day on or after it; month-end takes
+    the last trading day of the month. Rows keep the scheduled date, so assets
+    traded on different exchange calendars still line up on the same dates.
+
+    Only the Date and NAV_<CCY> columns are read from the file, and each
+    (file, SIP day, forex dir) result is cached per process until the file changes.
+"""
+
+_resampled_cache: dict[tuple, pd.DataFrame] = {}
+_cache_lock = threading.Lock()
+
+
+def _read_columns(path: str, columns: list[str] | None = None) -> pa.Table:
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.parquet':
+        return pq.read_table(path, columns=columns)
+    if ext == '.feather':
+        return feather.read_table(path, columns=columns, memory_map=True)
+    raise ValueError(f'Unsupported NAV file format "{ext}". Expected .feather or .parquet.')
+
+
+def _schema_names(path: str) -> list[str]:
+    if os.path.splitext(path)[1].lower() == '.parquet':
+        return pq.read_schema(path).names
+    with pa.memory_map(path) as source:
+        return pa.ipc.open_file(source).schema.names
+
+
+def read_daily_series(path: str, prefix: str = 'NAV_') -> tuple[np.ndarray, np.ndarray, str]:
+    """
+    Reads only the Date column and the first column starting with `prefix`.
+
+    Returns:
+        tuple: (dates as sorted datetime64[ns], values as float64, value column name).
+
+    Raises:
+        ValueError: If the file has no Date column or no column with the prefix.
+    """
+    names = _schema_names(path)
+    value_column = next((name for name in names if name.startswith(prefix)), None)
+    if 'Date' not in names or value_column is None:
+        raise ValueError(f'{path} must have a Date column and a {prefix}* column.')
+
+    df = _read_columns(path, ['Date', value_column]).to_pandas()
+    df['Date'] = pd.to_datetime(df['Date']).dt.normalize()
+    df = df.dropna().sort_values('Date').drop_duplicates('Date', keep='last')
+    return df['Date'].to_numpy(dtype='datetime64[ns]'), df[value_column].to_numpy(dtype=np.float64), value_column
+
+
+def sip_calendar(dates: np.ndarray, sip_day: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Maps every month covered by a daily series to its SIP date and the trading day that executes it.
+
+    Args:
+        dates: (N,) sorted trading dates.
+        sip_day: Day of the month the SIP is scheduled on; None for the calendar month-end.
+
+    Returns:
+        tuple: (scheduled dates (M,), indices (M,) into `dates` of the executing trading day).
+               Months whose SIP would fall outside the series are dropped.
+    """
+    first_month = dates[0].astype('datetime64[M]')
+    last_month = dates[-1].astype('datetime64[M]')
+    month_starts = np.arange(first_month, last_month + 1).astype('datetime64[D]')
+    month_ends = (np.arange(first_month, last_month + 1) + 1).astype('datetime64[D]') - 1
+    days = dates.astype('datetime64[D]')
+
+    if sip_day is None:
+        scheduled = month_ends
+        # Last trading day on or before the month-end, provided it is in the same month;
+        # a month the series ends partway through is not complete yet
+        idx = np.searchsorted(days, scheduled, side='right') - 1
+        valid = (idx >= 0) & (days[np.maximum(idx, 0)] >= month_starts) & (scheduled <= days[-1])
+    else:
+        scheduled = np.minimum(month_starts + (sip_day - 1), month_ends)
+        # First trading day on or after the scheduled date
+        idx = np.searchsorted(days, scheduled, side='left')
+        valid = (idx < len(days)) & (scheduled >= days[0])
+
+    return scheduled[valid].astype('datetime64[ns]'), idx[valid]
+
+
+def _asof(dates: np.ndarray, values: np.ndarray, at: np.ndarray) -> np.ndarray:
+    """
+    Value in force at each of `at`: the last observation on or before it.
+
+    Raises:
+        ValueError: If a date precedes the first observation.
+    """
+    idx = np.searchsorted(dates, at, side='right') - 1
+    if np.any(idx < 0):
+        raise ValueError('Forex history starts after the NAV history.')
+    return values[idx]
+
+
+def _forex_path(forex_dir: str, currency: str) -> str:
+    for ext in ('.parquet', '.feather'):
+        path = os.path.join(forex_dir, f'{currency.upper()}_to_INR{ext}')
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(
+        f"Forex data for '{currency}' not found in directory '{forex_dir}'. Expected '<CURR>_to_INR.feather' or '.parquet'."
+    )
+
+
+def load_sip_calendar_nav(path: str, sip_day: int | None, forex_dir: str) -> pd.DataFrame:
+    """
+    Daily NAV file resampled to the SIP calendar and converted to INR.
+
+    Foreign-currency NAVs are converted at the rate in force on each executing
+    trading day, so daily forex files need not share the NAV's trading calendar.
+
+    Returns:
+        pd.DataFrame: ['Date', 'NAV_INR'], one row per scheduled SIP date.
+    """
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime_ns, sip_day, forex_dir)
+    cached = _resampled_cache.get(key)
+    if cached is not None:
+        return cached
+
+    with _cache_lock:
+        cached = _resampled_cache.get(key)
+        if cached is not None:
+            return cached
+
+        dates, navs, nav_column = read_daily_series(path)
+        scheduled, idx = sip_calendar(dates, sip_day)
+        sip_navs = navs[idx]
+
+        currency = nav_column.split('_')[-1]
+        if currency != 'INR':
+            forex_dates, rates, _ = read_daily_series(_forex_path(forex_dir, currency), prefix=f'{currency.upper()}_to_')
+            sip_navs = sip_navs * _asof(forex_dates, rates, dates[idx])
+
+        # Drop superseded entries of the same file
+        for stale in [k for k in _resampled_cache if k[0] == path and k[3:] == (sip_day, forex_dir)]:
+            del _resampled_cache[stale]
+
+        frame = pd.DataFrame({'Date': scheduled, 'NAV_INR': sip_navs})
+        _resampled_cache[key] = frame
+        return frame
@@ -0,0 +1,323 @@
+import argparse
+import asyncio
+import glob
+import http.client
+import itertools
+import json
+import logging
+import os
+import random
+import sys
+import time
+from urllib.parse import urlparse
+
+import numpy as np
+
+"""
+    Load Tester: Replays a mix of `temp/profiles`-style payloads across every
+    swp_mode / risk combination against the FastAPI app, either in-process
+    (direct ASGI calls, no server needed) or against a running uvicorn.
+
+    Reports throughput, p50/p95/p99 latency, error rate and per-worker CPU, and
+    can record a baseline and fail when latency regresses beyond a threshold.
+
+    Usage:
+        python -m utils.load_test --requests 500 --concurrency 8
+        python -m utils.load_test --url http://127.0.0.1:8000 --rate 50 --record-baseline
+        python -m utils.load_test --url http://127.0.0.1:8000 --max-regression 0.2
+"""
+
+SWP_MODES = ['conservative', 'aggressive']
+RISK_LEVELS = ['conservative', 'balanced', 'aggressive']
+DEFAULT_PROFILES_GLOB = 'temp/profiles/*.json'
+DEFAULT_BASELINE_PATH = 'temp/load_test_baseline.json'
+LATENCY_PERCENTILES = [50, 95, 99]
+
+
+def build_payloads(profiles_glob: str = DEFAULT_PROFILES_GLOB, endpoint: str = '/swp-calculator') -> list[tuple[str, bytes]]:
+    """
+    Cross product of every profile with every swp_mode and pre/post-retirement risk.
+
+    Returns:
+        list: (path, JSON body) pairs.
+
+    Raises:
+        FileNotFoundError: If no profile matches the glob.
+    """
+    profile_paths = sorted(glob.glob(profiles_glob))
+    if not profile_paths:
+        raise FileNotFoundError(f'No profiles found matching {profiles_glob}')
+
+    payloads = []
+    for path in profile_paths:
+        with open(path) as f:
+            user_data = json.load(f)
+        for swp_mode, pre_risk, post_risk in itertools.product(SWP_MODES, RISK_LEVELS, RISK_LEVELS):
+            body = {
+                'user_data': user_data,
+                'swp_mode': swp_mode,
+                'pre_retirement_risk': pre_risk,
+                'post_retirement_risk': post_risk
+            }
+            payloads.append((endpoint, json.dumps(body).encode()))
+    return payloads
+
+
+class InProcessTransport:
+    """
+    Calls the ASGI app directly, skipping sockets and HTTP parsing.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def post(self, path: str, body: bytes, client_id: int = 0) -> int:
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'POST',
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': b'',
+            'root_path': '',
+            'headers': [
+                (b'host', b'load-test'),
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode())
+            ],
+            'client': ('127.0.0.1', 0),
+            'server': ('127.0.0.1', 80)
+        }
+        body_sent = False
+        status = 0
+
+        async def receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {'type': 'http.request', 'body': body, 'more_body': False}
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+
+        await self.app(scope, receive, send)
+        return status
+
+    def cpu_seconds(self) -> dict[str, float]:
+        return {f'in-process:{os.getpid()}': time.process_time()}
+
+
+class HttpTransport:
+    """
+    Posts to a running server over keep-alive HTTP/1.1, one connection per concurrent client.
+    """
+
+    def __init__(self, url: str, worker_pids: list[int] | None = None):
+        parsed = urlparse(url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.worker_pids = worker_pids or []
+        self._connections: dict[int, http.client.HTTPConnection] = {}
+
+    def _post_blocking(self, client_id: int, path: str, body: bytes) -> int:
+        conn = self._connections.get(client_id)
+        if conn is None:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            self._connections[client_id] = conn
+        try:
+            conn.request('POST', path, body=body, headers={'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            response.read()
+            return response.status
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            self._connections.pop(client_id, None)
+            return 0
+
+    async def post(self, path: str, body: bytes, client_id: int = 0) -> int:
+        return await asyncio.to_thread(self._post_blocking, client_id, path, body)
+
+    def cpu_seconds(self) -> dict[str, float]:
+        return {f'pid:{pid}': seconds for pid in self.worker_pids if (seconds := read_process_cpu_seconds(pid)) is not None}
+
+
+def read_process_cpu_seconds(pid: int) -> float | None:
+    """
+    User + system CPU seconds of a process from /proc (Linux only; None elsewhere).
+    """
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+    except OSError:
+        return None
+    # fields[0] is the state (3rd stat field); utime/stime are the 14th/15th stat fields
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+def find_child_pids(pid: int) -> list[int]:
+    """
+    Direct children of a process, e.g. the workers of a `uvicorn --workers N` master.
+    """
+    children = []
+    for task in glob.glob(f'/proc/{pid}/task/*/children'):
+        with open(task) as f:
+            children.extend(int(child) for child in f.read().split())
+    return children
+
+
+async def run_load(
+    transport,
+    payloads: list[tuple[str, bytes]],
+    total_requests: int,
+    concurrency: int,
+    rate: float = 0.0,
+    seed: int = 0
+) -> dict:
+    """
+    Fires `total_requests` requests from `concurrency` clients, optionally paced to `rate` req/s.
+
+    Returns:
+        dict: Throughput, latency percentiles (ms), error rate and CPU seconds per worker.
+    """
+    order = list(range(len(payloads)))
+    random.Random(seed).shuffle(order)
+    schedule = [payloads[order[i % len(order)]] for i in range(total_requests)]
+
+    latencies = np.zeros(total_requests)
+    statuses = np.zeros(total_requests, dtype=np.int32)
+    next_idx = 0
+    interval = 1.0 / rate if rate > 0 else 0.0
+
+    cpu_before = transport.cpu_seconds()
+    started = time.perf_counter()
+
+    async def client(client_id: int):
+        nonlocal next_idx
+        while next_idx < total_requests:
+            idx = next_idx
+            next_idx += 1
+
+            if interval:
+                delay = started + idx * interval - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            path, body = schedule[idx]
+            t0 = time.perf_counter()
+            statuses[idx] = await transport.post(path, body, client_id=client_id)
+            latencies[idx] = time.perf_counter() - t0
+
+    await asyncio.gather(*(client(i) for i in range(concurrency)))
+
+    elapsed = time.perf_counter() - started
+    cpu_after = transport.cpu_seconds()
+
+    errors = int(np.count_nonzero((statuses < 200) | (statuses >= 300)))
+    latency_ms = latencies * 1000
+    return {
+        'requests': total_requests,
+        'concurrency': concurrency,
+        'target_rate': rate,
+        'duration_s': round(elapsed, 3),
+        'throughput_rps': round(total_requests / elapsed, 2),
+        'error_rate': round(errors / total_requests, 4),
+        'status_counts': {str(code): int(count) for code, count in zip(*np.unique(statuses, return_counts=True))},
+        'latency_ms': {
+            **{f'p{p}': round(float(v), 2) for p, v in zip(LATENCY_PERCENTILES, np.percentile(latency_ms, LATENCY_PERCENTILES))},
+            'mean': round(float(latency_ms.mean()), 2),
+            'max': round(float(latency_ms.max()), 2)
+        },
+        'cpu': {
+            worker: {
+                'cpu_seconds': round(cpu_after[worker] - cpu_before[worker], 3),
+                'utilization': round((cpu_after[worker] - cpu_before[worker]) / elapsed, 3)
+            }
+            for worker in cpu_after if worker in cpu_before
+        }
+    }
+
+
+def check_regression(report: dict, baseline: dict, max_regression: float, max_error_rate_increase: float) -> list[str]:
+    """
+    Compares a report against a recorded baseline.
+
+    Returns:
+        list: Human-readable failures; empty if within thresholds.
+    """
+    failures = []
+    for key in [f'p{p}' for p in LATENCY_PERCENTILES]:
+        current = report['latency_ms'][key]
+        allowed = baseline['latency_ms'][key] * (1 + max_regression)
+        if current > allowed:
+            failures.append(f'{key} latency {current}ms exceeds baseline {baseline["latency_ms"][key]}ms by more than {max_regression:.0%}')
+
+    if report['error_rate'] > baseline['error_rate'] + max_error_rate_increase:
+        failures.append(f'error rate {report["error_rate"]} exceeds baseline {baseline["error_rate"]}')
+    return failures
+
+
+def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Load test the SWP calculator API.')
+    parser.add_argument('--url', help='Base URL of a running server; runs in-process if omitted.')
+    parser.add_argument('--endpoint', default='/swp-calculator')
+    parser.add_argument('--profiles', default=DEFAULT_PROFILES_GLOB, help='Glob of UserData JSON profiles.')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--rate', type=float, default=0.0, help='Target requests per second (0 = unpaced).')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--server-pid', type=int, help='uvicorn master PID; CPU is reported for its workers.')
+    parser.add_argument('--worker-pids', type=int, nargs='*', default=[], help='Explicit worker PIDs to sample CPU for.')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE_PATH)
+    parser.add_argument('--record-baseline', action='store_true', help='Save this run as the new baseline.')
+    parser.add_argument('--max-regression', type=float, default=0.2, help='Allowed fractional latency increase over baseline.')
+    parser.add_argument('--max-error-rate-increase', type=float, default=0.01)
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = _parse_args(argv)
+    payloads = build_payloads(args.profiles, args.endpoint)
+
+    if args.url:
+        worker_pids = list(args.worker_pids)
+        if args.server_pid:
+            worker_pids += find_child_pids(args.server_pid) or [args.server_pid]
+        transport = HttpTransport(args.url, worker_pids)
+    else:
+        from main import app
+        from utils.warmup import run_warmup
+        # Per-request INFO logs would dominate the measurement
+        logging.getLogger('app').setLevel(logging.WARNING)
+        # Lifespan events do not run in-process; warm up as a deployed worker would before taking traffic
+        run_warmup()
+        transport = InProcessTransport(app)
+
+    report = asyncio.run(run_load(
+        transport, payloads, args.requests, args.concurrency, rate=args.rate, seed=args.seed
+    ))
+    print(json.dumps(report, indent=2))
+
+    if args.record_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'Baseline recorded to {args.baseline}')
+        return 0
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        failures = check_regression(report, baseline, args.max_regression, args.max_error_rate_increase)
+        for failure in failures:
+            print(f'[REGRESSION] {failure}')
+        return 1 if failures else 0
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
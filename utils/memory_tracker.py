@@ -0,0 +1,161 @@
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+from config.config import (
+    BACKTEST_DATASET,
+    DEFAULT_DATASET,
+    MEMORY_BUDGET_BYTES,
+    MEMORY_TRACKING_ENABLED
+)
+from core.exceptions import MemoryBudgetExceeded
+from utils.config_snapshot import current_snapshot
+from utils.logger import get_logger
+
+logger = get_logger()
+
+"""
+    Memory Tracker: Per-stage allocation accounting and the per-request memory budget.
+
+    With MEMORY_TRACKING_ENABLED, every pipeline stage wrapped in track_stage records
+    its net bytes (still allocated when the stage ends) and peak bytes (high-water
+    mark above the stage's starting point) from tracemalloc. Stages may nest; an
+    inner stage's peak also counts towards the outer one. Totals per stage are
+    served by /admin/memory and each measurement is logged at DEBUG level.
+    tracemalloc is process-wide, so task graphs run in the calling thread while
+    tracking is enabled; allocations of other concurrent requests are still
+    attributed to whichever stage is open.
+
+    The budget check is independent of tracking: requests are sized from their
+    horizons, batch sizes and the history length before any work is done, and
+    rejected when the estimate exceeds MEMORY_BUDGET_BYTES.
+"""
+
+FLOAT_BYTES = 8
+
+
+class StageMemoryStats:
+    """
+    Running per-stage totals, shared by every request of this process.
+    """
+    def __init__(self):
+        self._stages: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, net_bytes: int, peak_bytes: int) -> None:
+        with self._lock:
+            stats = self._stages.setdefault(stage, {
+                'calls': 0, 'total_net_bytes': 0, 'max_peak_bytes': 0, 'last_net_bytes': 0, 'last_peak_bytes': 0
+            })
+            stats['calls'] += 1
+            stats['total_net_bytes'] += net_bytes
+            stats['max_peak_bytes'] = max(stats['max_peak_bytes'], peak_bytes)
+            stats['last_net_bytes'] = net_bytes
+            stats['last_peak_bytes'] = peak_bytes
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                'tracking_enabled': MEMORY_TRACKING_ENABLED,
+                'budget_bytes': MEMORY_BUDGET_BYTES,
+                'stages': {name: dict(stats) for name, stats in self._stages.items()}
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages.clear()
+
+
+memory_stats = StageMemoryStats()
+_open_stages = threading.local()
+
+
+@contextmanager
+def track_stage(name: str):
+    """
+    Records the net and peak allocations of the enclosed block as stage `name`.
+    A no-op unless MEMORY_TRACKING_ENABLED. Usable as a decorator.
+    """
+    if not MEMORY_TRACKING_ENABLED:
+        yield
+        return
+
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+    stack = getattr(_open_stages, 'stack', None)
+    if stack is None:
+        stack = _open_stages.stack = []
+
+    # Resetting the peak below would lose the enclosing stage's high-water mark; save it first
+    if stack:
+        stack[-1]['peak'] = max(stack[-1]['peak'], tracemalloc.get_traced_memory()[1])
+    start = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    frame = {'peak': start}
+    stack.append(frame)
+
+    try:
+        yield
+    finally:
+        stack.pop()
+        current, peak = tracemalloc.get_traced_memory()
+        peak = max(frame['peak'], peak)
+        if stack:
+            stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+
+        net_bytes, peak_bytes = current - start, peak - start
+        memory_stats.record(name, net_bytes, peak_bytes)
+        logger.debug(f'Stage "{name}": net {net_bytes / 2**20:.2f} MiB, peak {peak_bytes / 2**20:.2f} MiB.')
+
+
+def _history_rows(dataset: str) -> int:
+    from utils.nav_panel import get_nav_panel
+    return len(get_nav_panel(dataset).dates)
+
+
+def _window_matrix_bytes(rows: int, horizon_months: int, arrays: int) -> int:
+    """
+    Bytes of `arrays` float64 (rolling windows x horizon) matrices; short histories
+    fall back to the longest horizon they support, so the matrix is bounded by rows^2 / 4.
+    """
+    horizon_months = max(horizon_months, 0)
+    windows = rows - horizon_months
+    if windows <= 0:
+        windows = horizon_months = rows // 2
+    return windows * (horizon_months + 1) * FLOAT_BYTES * arrays
+
+
+def estimate_analysis_bytes(current_age: int, retirement_age: int, backtest: bool = False) -> int:
+    """
+    Estimated peak working set of runAnalysis (and runBacktest) for one user.
+
+    Dominated by the (window x month) matrices of the rolling SIP XIRR (cash-flow
+    times and discounted flows) and of the withdrawal-phase returns (growth and
+    discounted withdrawals), plus the backtest's balance and reserve paths.
+    """
+    pre_months = (retirement_age - current_age) * 12
+    post_months = (current_snapshot().avg_life_expectancy - retirement_age) * 12
+
+    rows = _history_rows(DEFAULT_DATASET)
+    estimate = _window_matrix_bytes(rows, pre_months, 4) + _window_matrix_bytes(rows, post_months, 4)
+    estimate += 2 * 3 * (max(post_months, 0) + 1) * FLOAT_BYTES     # current and target schedules
+    if backtest:
+        estimate += _window_matrix_bytes(_history_rows(BACKTEST_DATASET), post_months, 6)
+    return estimate
+
+
+def estimate_batch_bytes(batch_size: int, per_item_arrays: int = 16) -> int:
+    """
+    Estimated working set of an element-wise computation over `batch_size` scenarios.
+    """
+    return batch_size * per_item_arrays * FLOAT_BYTES
+
+
+def enforce_memory_budget(estimated_bytes: int, budget_bytes: int = MEMORY_BUDGET_BYTES) -> None:
+    """
+    Raises:
+        MemoryBudgetExceeded: If the estimate is over the budget.
+    """
+    if estimated_bytes > budget_bytes:
+        raise MemoryBudgetExceeded(estimated_bytes, budget_bytes)
@@ -0,0 +1,296 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+from core.asset_registry import asset_registry
+from config.config import DEFAULT_DATASET, NAV_PANEL_DIR
+from utils.config_snapshot import config_store, current_snapshot, pinned_snapshot
+from utils.logger import get_logger
+
+logger = get_logger()
+
+"""
+    NAV Panel: Date-aligned INR NAVs of every asset in a dataset, plus the
+    per-asset monthly return table, published once as immutable .npy files.
+
+    Every worker process memory-maps the same published version read-only, so
+    the data lives once in the page cache instead of once per worker, and a
+    freshly started worker attaches without reparsing any Feather file.
+
+    Datasets are defined by the request's config snapshot. Attached panels are
+    cached per dataset spec, so after a reload repoints a dataset its new panel
+    is attached alongside the old one, which requests pinned to the previous
+    snapshot keep reading. Once the new snapshot is live the old panel is dropped
+    from the cache and unmapped when its last reader lets go of it.
+
+    Layout:  <NAV_PANEL_DIR>/<dataset>/CURRENT        -> JSON pointer to the live version
+             <NAV_PANEL_DIR>/<dataset>/<version>/     -> dates.npy, navs.npy, returns.npy, assets.json
+"""
+
+_attached_panels: dict[tuple[str, str], "NavPanel"] = {}
+_attach_lock = threading.Lock()
+
+
+class NavPanel:
+    """
+    Read-only view over a published NAV panel.
+
+    Attributes:
+        dataset: Key into the snapshot's NAV datasets.
+        version: Content hash of the source files this panel was built from.
+        assets: Asset names, in column order.
+        dates: (T,) datetime64[ns] month-end dates.
+        navs: (T, A) INR NAV per asset; NaN where an asset has no history.
+        returns: (T-1, A) month-over-month return per asset.
+    """
+
+    def __init__(
+        self,
+        dataset: str,
+        version: str,
+        assets: list[str],
+        dates: np.ndarray,
+        navs: np.ndarray,
+        returns: np.ndarray
+    ):
+        self.dataset = dataset
+        self.version = version
+        self.assets = assets
+        self.dates = dates
+        self.navs = navs
+        self.returns = returns
+        self._column = {name: i for i, name in enumerate(assets)}
+
+    def asset_columns(self, names: list[str]) -> list[int]:
+        """
+        Maps asset names to panel columns.
+
+        Raises:
+            ValueError: If an asset is not part of this dataset.
+        """
+        columns = []
+        for name in names:
+            if name not in self._column:
+                raise ValueError(f"Missing path for asset: {name}")
+            columns.append(self._column[name])
+        return columns
+
+    def composite_nav(self, portfolio: dict[str, float]) -> pd.DataFrame:
+        """
+        Weighted sum of asset NAV levels over the dates on which every asset in the portfolio has a NAV.
+
+        Returns:
+            pd.DataFrame: DataFrame with ['Date', 'NAV_INR'] for the composite portfolio.
+        """
+        columns = self.asset_columns(list(portfolio.keys()))
+        weights = np.fromiter(portfolio.values(), dtype=np.float64, count=len(columns))
+
+        navs = self.navs[:, columns]
+        rows = ~np.isnan(navs).any(axis=1)
+        return pd.DataFrame({
+            'Date': self.dates[rows],
+            'NAV_INR': navs[rows] @ weights
+        })
+
+
+def _panel_root(dataset: str) -> str:
+    current_snapshot().dataset(dataset)
+    return os.path.join(NAV_PANEL_DIR, dataset)
+
+
+def _forex_files(dataset: str) -> list[str]:
+    forex_dir = current_snapshot().dataset(dataset)['forex_dir']
+    return sorted(
+        os.path.join(forex_dir, f) for f in os.listdir(forex_dir) if f.endswith(('.feather', '.parquet'))
+    )
+
+
+def _source_files(dataset: str) -> list[str]:
+    """
+    All files a dataset's panel is derived from: the NAV files and every forex file.
+    """
+    return list(current_snapshot().dataset(dataset)['nav_paths'].values()) + _forex_files(dataset)
+
+
+def _calendar_key(dataset: str) -> str:
+    """
+    Resampling settings of a dataset; a daily dataset's panel changes with its SIP day.
+    """
+    config = current_snapshot().dataset(dataset)
+    return json.dumps([config.get('frequency', 'monthly'), config.get('sip_day')])
+
+
+def _source_fingerprint(dataset: str) -> list[list]:
+    """
+    Cheap (path, size, mtime) fingerprint used to detect stale panels without reading the sources.
+    """
+    fingerprint = [[_calendar_key(dataset)]]
+    for path in _source_files(dataset):
+        stat = os.stat(path)
+        fingerprint.append([path, stat.st_size, stat.st_mtime_ns])
+    return fingerprint
+
+
+def dataset_content_hash(dataset: str) -> str:
+    """
+    SHA-256 over the names and bytes of every source file of a dataset.
+    """
+    _panel_root(dataset)
+    named_paths = sorted(current_snapshot().dataset(dataset)['nav_paths'].items())
+    named_paths += [(os.path.basename(path), path) for path in _forex_files(dataset)]
+
+    digest = hashlib.sha256()
+    digest.update(_calendar_key(dataset).encode())
+    for name, path in named_paths:
+        digest.update(name.encode())
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _build_panel_frame(dataset: str) -> pd.DataFrame:
+    """
+    Outer-joins the INR NAVs of every asset of the dataset on Date.
+    """
+    panel_df = None
+
+    for name in current_snapshot().dataset(dataset)['nav_paths']:
+        asset = asset_registry.get(name, dataset)
+        df = pd.DataFrame({'Date': asset.dates, name: asset.navs})
+
+        if panel_df is None:
+            panel_df = df
+        else:
+            panel_df = panel_df.merge(df, on='Date', how='outer')
+
+    return panel_df.sort_values('Date').reset_index(drop=True)
+
+
+@pinned_snapshot()
+def publish_nav_panel(dataset: str = DEFAULT_DATASET) -> str:
+    """
+    Builds the panel for a dataset and publishes it as an immutable version directory.
+
+    Safe to call from several processes at once: each builds into a private temp
+    directory and only the first rename wins; the CURRENT pointer is swapped atomically.
+
+    Returns:
+        str: Path of the published version directory.
+    """
+    root = _panel_root(dataset)
+    os.makedirs(root, exist_ok=True)
+
+    fingerprint = _source_fingerprint(dataset)
+    version = dataset_content_hash(dataset)[:16]
+    version_dir = os.path.join(root, version)
+
+    if not os.path.isdir(version_dir):
+        panel_df = _build_panel_frame(dataset)
+        assets = list(current_snapshot().dataset(dataset)['nav_paths'].keys())
+        navs = panel_df[assets].to_numpy(dtype=np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            returns = navs[1:] / navs[:-1] - 1
+
+        tmp_dir = tempfile.mkdtemp(dir=root, prefix='.build-')
+        np.save(os.path.join(tmp_dir, 'dates.npy'), panel_df['Date'].to_numpy(dtype='datetime64[ns]'))
+        np.save(os.path.join(tmp_dir, 'navs.npy'), navs)
+        np.save(os.path.join(tmp_dir, 'returns.npy'), returns)
+        with open(os.path.join(tmp_dir, 'assets.json'), 'w') as f:
+            json.dump(assets, f)
+
+        try:
+            os.rename(tmp_dir, version_dir)
+            logger.info(f'NAV panel for dataset "{dataset}" published as version {version}.')
+        except OSError:
+            # Another process published the same version first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    fd, tmp_pointer = tempfile.mkstemp(dir=root, prefix='.current-')
+    with os.fdopen(fd, 'w') as f:
+        json.dump({'version': version, 'sources': fingerprint}, f)
+    os.replace(tmp_pointer, os.path.join(root, 'CURRENT'))
+
+    return version_dir
+
+
+def _read_current_version(dataset: str) -> str | None:
+    """
+    Returns the live version of a dataset's panel, or None if it is missing or stale.
+    """
+    pointer_path = os.path.join(_panel_root(dataset), 'CURRENT')
+    try:
+        with open(pointer_path) as f:
+            pointer = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if pointer.get('sources') != _source_fingerprint(dataset):
+        return None
+    if not os.path.isdir(os.path.join(_panel_root(dataset), pointer['version'])):
+        return None
+    return pointer['version']
+
+
+def get_nav_panel(dataset: str = DEFAULT_DATASET) -> NavPanel:
+    """
+    Attaches this process to the published panel of a dataset (publishing it first if needed).
+
+    Arrays are memory-mapped read-only, so every worker shares the same physical pages.
+    The attached panel is cached per dataset spec while that spec is live.
+    """
+    snapshot = current_snapshot()
+    key = (dataset, snapshot.dataset_key(dataset))
+    panel = _attached_panels.get(key)
+    if panel is not None:
+        return panel
+
+    with _attach_lock, pinned_snapshot(snapshot):
+        panel = _attached_panels.get(key)
+        if panel is not None:
+            return panel
+
+        version = _read_current_version(dataset)
+        if version is None:
+            version = os.path.basename(publish_nav_panel(dataset))
+
+        version_dir = os.path.join(_panel_root(dataset), version)
+        with open(os.path.join(version_dir, 'assets.json')) as f:
+            assets = json.load(f)
+
+        panel = NavPanel(
+            dataset=dataset,
+            version=version,
+            assets=assets,
+            dates=np.load(os.path.join(version_dir, 'dates.npy'), mmap_mode='r'),
+            navs=np.load(os.path.join(version_dir, 'navs.npy'), mmap_mode='r'),
+            returns=np.load(os.path.join(version_dir, 'returns.npy'), mmap_mode='r')
+        )
+        if not config_store.superseded(snapshot, dataset):
+            _attached_panels[key] = panel
+        return panel
+
+
+def retain_panels(dataset_keys: dict[str, str]) -> int:
+    """
+    Drops the attached panels of every dataset spec not in `dataset_keys` (dataset -> spec hash).
+
+    Returns:
+        int: Number of panels dropped.
+    """
+    with _attach_lock:
+        stale = [key for key in _attached_panels if dataset_keys.get(key[0]) != key[1]]
+        for key in stale:
+            del _attached_panels[key]
+    return len(stale)
+
+
+if __name__ == '__main__':
+    # Publish every dataset ahead of a deploy so workers only ever attach
+    for name in current_snapshot().nav_datasets:
+        print(f'{name}: {publish_nav_panel(name)}')
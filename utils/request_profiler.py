@@ -0,0 +1,186 @@
+import cProfile
+import marshal
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from config.config import (
+    ADMIN_TOKEN,
+    PROFILE_STORE_DIR,
+    PROFILE_STORE_MAX_ENTRIES,
+    PROFILING_HEADER,
+    PROFILING_MODE,
+    PROFILING_SAMPLE_INTERVAL,
+    PROFILING_SAMPLE_RATE
+)
+from utils.logger import get_logger
+from utils.task_graph import run_sequentially
+
+logger = get_logger()
+
+"""
+    Request Profiler: Opt-in profiling of a single request's analysis.
+
+    A request is profiled when it carries PROFILING_HEADER set to the admin token,
+    or when it is picked by PROFILING_SAMPLE_RATE. Profiles are written to a
+    bounded on-disk store keyed by request ID; the oldest are evicted first.
+    When neither trigger fires the wrapped call runs untouched.
+"""
+
+PROFILE_EXTENSIONS = {
+    'deterministic': '.prof',       # cProfile / pstats dump
+    'sampling': '.collapsed'        # folded stacks, one "frame;frame;frame count" per line
+}
+_REQUEST_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+def should_profile(headers) -> bool:
+    """
+    Decides whether the current request is profiled.
+
+    Args:
+        headers: Request headers (case-insensitive mapping).
+    """
+    if ADMIN_TOKEN and headers.get(PROFILING_HEADER) == ADMIN_TOKEN:
+        return True
+    return PROFILING_SAMPLE_RATE > 0 and random.random() < PROFILING_SAMPLE_RATE
+
+
+class _StackSampler:
+    """
+    Samples one thread's Python stack at a fixed interval from a background thread.
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def dump(self) -> bytes:
+        return ''.join(f'{stack} {count}\n' for stack, count in self.samples.most_common()).encode()
+
+
+class ProfileStore:
+    """
+    Bounded directory of profiles, one file per request ID.
+
+    Shared by every worker process through the filesystem; eviction keeps the
+    newest `max_entries` files.
+    """
+
+    def __init__(self, directory: str = PROFILE_STORE_DIR, max_entries: int = PROFILE_STORE_MAX_ENTRIES):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+    def save(self, request_id: str, mode: str, data: bytes) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, request_id + PROFILE_EXTENSIONS[mode])
+        with open(path, 'wb') as f:
+            f.write(data)
+
+        with self._lock:
+            entries = sorted(self._entries(), key=lambda e: e.stat().st_mtime)
+            for entry in entries[:max(0, len(entries) - self.max_entries)]:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+        return path
+
+    def _entries(self) -> list[os.DirEntry]:
+        if not os.path.isdir(self.directory):
+            return []
+        return [
+            e for e in os.scandir(self.directory)
+            if e.is_file() and os.path.splitext(e.name)[1] in PROFILE_EXTENSIONS.values()
+        ]
+
+    def list(self) -> list[dict]:
+        profiles = []
+        for entry in self._entries():
+            stat = entry.stat()
+            request_id, ext = os.path.splitext(entry.name)
+            profiles.append({
+                'request_id': request_id,
+                'mode': next(m for m, e in PROFILE_EXTENSIONS.items() if e == ext),
+                'size_bytes': stat.st_size,
+                'created': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(stat.st_mtime))
+            })
+        return sorted(profiles, key=lambda p: p['created'], reverse=True)
+
+    def path(self, request_id: str) -> str | None:
+        """
+        Returns the stored profile file for a request, or None.
+
+        Raises:
+            ValueError: If the request ID is malformed.
+        """
+        if not _REQUEST_ID_PATTERN.match(request_id):
+            raise ValueError(f'Invalid request ID: {request_id}')
+        for ext in PROFILE_EXTENSIONS.values():
+            path = os.path.join(self.directory, request_id + ext)
+            if os.path.exists(path):
+                return path
+        return None
+
+
+profile_store = ProfileStore()
+
+
+def profile_call(request_id: str, fn, *args, mode: str = PROFILING_MODE, **kwargs):
+    """
+    Runs fn(*args, **kwargs) under the configured profiler and stores the profile.
+
+    The profile is saved even if fn raises, since slow failing requests matter too.
+    Task graphs started by fn run in the calling thread, the only one profiled.
+    """
+    if mode not in PROFILE_EXTENSIONS:
+        raise ValueError(f'Unknown profiling mode: {mode}')
+
+    if mode == 'deterministic':
+        profiler = cProfile.Profile()
+        profiler.enable()
+    else:
+        profiler = _StackSampler(threading.get_ident(), PROFILING_SAMPLE_INTERVAL)
+        profiler.start()
+
+    try:
+        with run_sequentially():
+            return fn(*args, **kwargs)
+    finally:
+        if mode == 'deterministic':
+            profiler.disable()
+            # Same format as Profile.dump_stats, loadable with pstats.Stats(path)
+            profiler.create_stats()
+            data = marshal.dumps(profiler.stats)
+        else:
+            profiler.stop()
+            data = profiler.dump()
+
+        path = profile_store.save(request_id, mode, data)
+        logger.info(f'Request {request_id} profiled ({mode}): {path}')
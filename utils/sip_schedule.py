@@ -0,0 +1,76 @@
+from typing import Literal
+import numpy as np
+
+
+def annual_sip_amounts(
+    sip_amount: float,
+    years: int,
+    sip_step_up: float = 0.0,
+    sip_step_up_mode: Literal['percentage', 'amount'] = 'percentage'
+) -> np.ndarray:
+    """
+    Monthly SIP amount for each year of an annually stepped-up SIP.
+
+    Args:
+        sip_amount (float): Monthly SIP in the first year.
+        years (int): Number of years the SIP runs for.
+        sip_step_up (float): Annual step-up; a fraction (e.g. 0.10) in 'percentage'
+                             mode or a rupee amount in 'amount' mode.
+        sip_step_up_mode (Literal): 'percentage' or 'amount'.
+
+    Returns:
+        np.ndarray: (years,) monthly SIP amount in force during each year.
+
+    Raises:
+        ValueError: If the step-up mode is not recognised.
+    """
+    year_idx = np.arange(years)
+    if sip_step_up_mode == 'percentage':
+        return sip_amount * (1 + sip_step_up) ** year_idx
+    if sip_step_up_mode == 'amount':
+        return sip_amount + sip_step_up * year_idx
+    raise ValueError(f"Unknown SIP step-up mode: {sip_step_up_mode}")
+
+
+def monthly_sip_amounts(
+    sip_amount: float,
+    months: int,
+    sip_step_up: float = 0.0,
+    sip_step_up_mode: Literal['percentage', 'amount'] = 'percentage'
+) -> np.ndarray:
+    """
+    Per-month SIP amounts for an annually stepped-up SIP running `months` months.
+    """
+    years = -(-months // 12)
+    return np.repeat(annual_sip_amounts(sip_amount, years, sip_step_up, sip_step_up_mode), 12)[:months]
+
+
+def normalized_sip(
+    sip_amount: float,
+    sip_step_up: float = 0.0,
+    sip_step_up_mode: Literal['percentage', 'amount'] = 'percentage'
+) -> dict:
+    """
+    The SIP pattern rescaled to a first-year SIP of 1.
+
+    XIRR does not change when every cash flow is scaled, so SIPs of the same shape
+    share their rolling XIRRs: a flat or percentage step-up SIP keeps only its
+    step-up fraction, and an 'amount' step-up becomes a step-up of
+    sip_step_up / sip_amount. A zero step-up is flat in either mode.
+
+    Returns:
+        dict: sip_amount, sip_step_up and sip_step_up_mode of the rescaled SIP.
+
+    Raises:
+        ValueError: If the SIP amount is not positive or the step-up mode is not recognised.
+    """
+    if sip_amount <= 0:
+        raise ValueError(f"SIP amount must be positive: {sip_amount}")
+    if sip_step_up_mode not in ('percentage', 'amount'):
+        raise ValueError(f"Unknown SIP step-up mode: {sip_step_up_mode}")
+
+    if sip_step_up == 0:
+        return dict(sip_amount=1.0, sip_step_up=0.0, sip_step_up_mode='percentage')
+    if sip_step_up_mode == 'amount':
+        return dict(sip_amount=1.0, sip_step_up=float(sip_step_up) / sip_amount, sip_step_up_mode='amount')
+    return dict(sip_amount=1.0, sip_step_up=float(sip_step_up), sip_step_up_mode='percentage')
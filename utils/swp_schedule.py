@@ -0,0 +1,237 @@
+import numpy as np
+
+from config.config import SCHEDULE_DTYPE
+from models.SWPResult import ScheduleSummary, SWPSchedule
+
+"""
+    SWP Schedule Kernel: Month-by-month corpus evolution during withdrawals,
+    shared by every schedule SWPCalculator produces.
+
+    Each month the core corpus and the reserve grow by the monthly return and
+    the SWP is withdrawn from the core only. At every year-end the reserve is
+    inflated, and so is the SWP unless withdrawals are flat.
+
+    Three views of the same recurrence:
+      - iter_swp_schedule: lazy (month, balance, reserve) rows, optionally every n-th month
+      - swp_schedule_arrays: closed-form arrays, broadcasting over batches of scenarios
+      - summarize_swp_schedule: depletion month, final and year-end balances only
+
+    depletion_months solves the same recurrence for the depletion month in closed form.
+"""
+
+
+def _iter_months(
+    initial_corpus: float,
+    monthly_swp: float,
+    monthly_return: float,
+    total_months: int,
+    reserve_corpus: float,
+    annual_inflation_rate: float,
+    flat_withdrawals: bool
+):
+    """
+    Yields unrounded (month, core balance, reserve) for months 0..total_months.
+    """
+    core_bal = initial_corpus
+    reserve_bal = reserve_corpus
+    current_swp = monthly_swp
+    yield 0, core_bal, reserve_bal
+
+    for m in range(1, total_months + 1):
+        core_bal = core_bal * (1 + monthly_return) - current_swp
+        reserve_bal *= (1 + monthly_return)
+        yield m, core_bal, reserve_bal
+
+        if m % 12 == 0:
+            reserve_bal *= (1 + annual_inflation_rate)
+            if not flat_withdrawals:
+                current_swp *= (1 + annual_inflation_rate)
+
+
+def iter_swp_schedule(
+    initial_corpus: float,
+    monthly_swp: float,
+    monthly_return: float,
+    total_months: int,
+    reserve_corpus: float = 0.0,
+    annual_inflation_rate: float = 0.0,
+    flat_withdrawals: bool = False,
+    every: int = 1
+):
+    """
+    Lazily yields (month, balance, reserve) rows rounded to paise, for streaming consumers.
+
+    Args:
+        initial_corpus: Core corpus at retirement.
+        monthly_swp: First-year monthly withdrawal.
+        monthly_return: True monthly return rate.
+        total_months: Withdrawal horizon in months.
+        reserve_corpus: Reserve that compounds and is inflated, but is never withdrawn.
+        annual_inflation_rate: Year-end step-up of the reserve and, unless flat, the SWP.
+        flat_withdrawals: Keep the SWP constant instead of inflating it.
+        every: Yield only every n-th month (12 = year-ends); month 0 and the last month are always yielded.
+    """
+    for m, core_bal, reserve_bal in _iter_months(
+        initial_corpus, monthly_swp, monthly_return, total_months,
+        reserve_corpus, annual_inflation_rate, flat_withdrawals
+    ):
+        if m % every == 0 or m == total_months:
+            yield m, round(core_bal, 2), round(reserve_bal, 2)
+
+
+def swp_schedule_arrays(
+    initial_corpus,
+    monthly_swp,
+    monthly_return,
+    total_months: int,
+    reserve_corpus=0.0,
+    annual_inflation_rate: float = 0.0,
+    flat_withdrawals: bool = False,
+    every: int = 1,
+    dtype: str = SCHEDULE_DTYPE
+) -> SWPSchedule:
+    """
+    Whole schedule as arrays, for batch consumers.
+
+    With G_m = (1 + r)^m and w_k the k-th withdrawal, b_m = G_m * (C0 - sum_{k<=m} w_k / G_k),
+    so all months are two vectorised passes. Corpus, SWP, return and reserve may be
+    (N,) arrays of scenarios, giving (N, K) balances; scalars give (K,).
+
+    Returns:
+        SWPSchedule: Rows for month 0, every n-th month and the last month, rounded to paise.
+    """
+    months = np.arange(1, total_months + 1)
+    inflation_steps = (1 + annual_inflation_rate) ** ((months - 1) // 12)
+    withdrawal_steps = np.ones(total_months) if flat_withdrawals else inflation_steps
+
+    corpus = np.asarray(initial_corpus, dtype=np.float64)[..., None]
+    swp = np.asarray(monthly_swp, dtype=np.float64)[..., None]
+    reserve = np.asarray(reserve_corpus, dtype=np.float64)[..., None]
+    growth = (1 + np.asarray(monthly_return, dtype=np.float64)[..., None]) ** months
+
+    shape = np.broadcast_shapes(corpus.shape[:-1], swp.shape[:-1], reserve.shape[:-1], growth.shape[:-1])
+    balances = np.empty(shape + (total_months + 1,))
+    reserves = np.empty(shape + (total_months + 1,))
+    balances[..., 0] = corpus[..., 0]
+    reserves[..., 0] = reserve[..., 0]
+    balances[..., 1:] = growth * (corpus - np.cumsum(swp * withdrawal_steps / growth, axis=-1))
+    reserves[..., 1:] = reserve * growth * inflation_steps
+
+    kept = np.arange(0, total_months + 1, every)
+    if kept[-1] != total_months:
+        kept = np.append(kept, total_months)
+
+    return SWPSchedule(
+        months=kept.astype(np.int32),
+        balances=np.round(balances[..., kept], 2).astype(dtype),
+        reserves=np.round(reserves[..., kept], 2).astype(dtype)
+    )
+
+
+def summarize_swp_schedule(
+    initial_corpus: float,
+    monthly_swp: float,
+    monthly_return: float,
+    total_months: int,
+    reserve_corpus: float = 0.0,
+    annual_inflation_rate: float = 0.0,
+    flat_withdrawals: bool = False
+) -> ScheduleSummary:
+    """
+    Walks the schedule once keeping only the summary points, without building any monthly row.
+    """
+    depletion_month = None
+    yearly_balances = []
+
+    for m, core_bal, reserve_bal in _iter_months(
+        initial_corpus, monthly_swp, monthly_return, total_months,
+        reserve_corpus, annual_inflation_rate, flat_withdrawals
+    ):
+        if depletion_month is None and m > 0 and core_bal <= 0:
+            depletion_month = m
+        if m % 12 == 0:
+            yearly_balances.append(round(core_bal, 2))
+
+    return ScheduleSummary(
+        depletion_month=depletion_month,
+        final_balance=round(core_bal, 2),
+        final_reserve=round(reserve_bal, 2),
+        yearly_balances=np.array(yearly_balances)
+    )
+
+
+def depletion_months(
+    initial_corpus,
+    monthly_swp,
+    monthly_return,
+    annual_inflation_rate: float = 0.0,
+    flat_withdrawals: bool = False
+) -> np.ndarray:
+    """
+    First month in which the core corpus is zero or below, solved analytically and
+    element-wise over broadcast arrays of corpora, withdrawals and returns.
+
+    Depletion at month m means the present value of the first m withdrawals reaches
+    the corpus. With v = 1 / (1 + r) and a_j = (1 - v^j) / r:
+      - flat SWP w: w * a_m >= C  =>  m = ceil(-ln(1 - C r / w) / ln(1 + r))
+      - SWP stepped by g each year: year y costs w (1+g)^y v^(12y) a_12, a geometric
+        series in q = (1+g) v^12, so the depletion year has the same log form in q and
+        the month within that year follows from the flat case on what is left.
+
+    Returns:
+        np.ndarray: Depletion month (1-based, float); inf where the corpus is never exhausted.
+
+    Raises:
+        ValueError: If a monthly return is -100% or below, or the arrays do not broadcast.
+    """
+    corpus, swp, r = np.broadcast_arrays(
+        np.asarray(initial_corpus, dtype=np.float64),
+        np.asarray(monthly_swp, dtype=np.float64),
+        np.asarray(monthly_return, dtype=np.float64)
+    )
+    if np.any(r <= -1):
+        raise ValueError('Monthly return must be greater than -100%.')
+
+    g = 0.0 if flat_withdrawals else annual_inflation_rate
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        if g == 0.0:
+            months = _months_to_cover(corpus, swp, r)
+        else:
+            a_12 = np.where(r == 0, 12.0, (1 - (1 + r) ** -12) / r)
+            q = (1 + g) * (1 + r) ** -12
+            k = corpus / (swp * a_12)          # corpus in units of the first year's cost
+
+            # Smallest whole number of years whose cumulative cost reaches the corpus; NaN if never
+            years = np.where(
+                q == 1,
+                k,
+                np.log1p(k * (q - 1)) / np.log(q)
+            )
+            years = np.ceil(years - 1e-9)
+            finite = np.isfinite(years) & (years >= 1)
+
+            # Corpus left (in present value) once the full years before the depletion year are paid
+            full_years = np.where(finite, years - 1, 0)
+            paid = swp * a_12 * np.where(q == 1, full_years, (1 - q ** full_years) / (1 - q))
+            # Withdrawals within the depletion year y are flat, with present value swp * q^y * a_j
+            within = _months_to_cover(corpus - paid, swp * q ** full_years, r)
+
+            months = np.where(finite, 12 * full_years + np.clip(within, 1, 12), np.inf)
+
+    months = np.where(swp <= 0, np.inf, months)
+    return np.where(corpus <= 0, 0.0, months)
+
+
+def _months_to_cover(corpus: np.ndarray, swp: np.ndarray, r: np.ndarray) -> np.ndarray:
+    """
+    Smallest m with swp * a_m >= corpus (flat withdrawals); inf if the withdrawal never exceeds the return.
+    """
+    ratio = corpus * r / swp
+    months = np.where(
+        r == 0,
+        corpus / swp,
+        -np.log1p(-ratio) / np.log1p(r)
+    )
+    months = np.where((r != 0) & (ratio >= 1), np.inf, months)
+    return np.ceil(months - 1e-9)
@@ -0,0 +1,167 @@
+import contextvars
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, Executor, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from contextlib import contextmanager
+from typing import Any, Callable
+
+from config.config import ANALYSIS_EXECUTOR_WORKERS, MEMORY_TRACKING_ENABLED
+
+"""
+    Task Graph: Runs a small dependency graph of pipeline steps, starting every
+    step as soon as the steps it depends on have finished.
+
+    Steps run on one executor shared by all requests of the process. Threads are
+    enough: the heavy steps spend their time in NumPy, which releases the GIL.
+    Each step receives the results of its dependencies as keyword arguments and
+    may declare a fallback that turns its failure into a substitute result;
+    without one, the failure aborts the graph and is re-raised to the caller.
+    With a single worker the graph runs sequentially in the calling thread, as it
+    does inside `run_sequentially()` (used while a request is profiled, since the
+    profilers only observe the calling thread) and with MEMORY_TRACKING_ENABLED
+    (tracemalloc peaks are process-wide, so concurrent stages would corrupt them).
+"""
+
+
+@dataclass(frozen=True, slots=True)
+class Node:
+    """
+    Attributes:
+        name: Key of the step's result.
+        func: Called with the results of `deps` as keyword arguments.
+        deps: Names of the steps whose results `func` needs.
+        fallback: Called with the exception if `func` fails; returns a substitute
+                  result or re-raises. None propagates every failure.
+    """
+    name: str
+    func: Callable[..., Any]
+    deps: tuple[str, ...] = ()
+    fallback: Callable[[Exception], Any] | None = None
+
+
+_sequential = contextvars.ContextVar('run_graph_sequentially', default=False)
+
+
+@contextmanager
+def run_sequentially():
+    """
+    Runs every graph started by the enclosed block in the calling thread.
+    """
+    token = _sequential.set(True)
+    try:
+        yield
+    finally:
+        _sequential.reset(token)
+
+
+_executor: ThreadPoolExecutor | None = None
+_executor_pid: int | None = None
+_executor_lock = threading.Lock()
+
+
+def get_shared_executor() -> ThreadPoolExecutor | None:
+    """
+    Process-wide executor for graph steps; None when configured for a single worker.
+    Recreated in a forked child, whose copy of the parent's threads does not exist.
+    """
+    global _executor, _executor_pid
+    if ANALYSIS_EXECUTOR_WORKERS <= 1:
+        return None
+
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=ANALYSIS_EXECUTOR_WORKERS, thread_name_prefix='analysis')
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _topological_order(nodes: list[Node]) -> list[Node]:
+    """
+    Raises:
+        ValueError: On duplicate names, unknown dependencies or cycles.
+    """
+    by_name = {node.name: node for node in nodes}
+    if len(by_name) != len(nodes):
+        raise ValueError('Task graph has duplicate step names.')
+
+    order, state = [], {}
+
+    def visit(node: Node):
+        if state.get(node.name) == 'done':
+            return
+        if state.get(node.name) == 'visiting':
+            raise ValueError(f'Task graph has a cycle through "{node.name}".')
+        state[node.name] = 'visiting'
+        for dep in node.deps:
+            if dep not in by_name:
+                raise ValueError(f'Step "{node.name}" depends on unknown step "{dep}".')
+            visit(by_name[dep])
+        state[node.name] = 'done'
+        order.append(node)
+
+    for node in nodes:
+        visit(node)
+    return order
+
+
+def _finish(node: Node, error: Exception | None, value: Any) -> Any:
+    if error is None:
+        return value
+    if node.fallback is None:
+        raise error
+    return node.fallback(error)
+
+
+def run_graph(nodes: list[Node], executor: Executor | None = None) -> dict[str, Any]:
+    """
+    Runs every step once its dependencies are done, independent steps concurrently.
+
+    Args:
+        nodes: Steps of the graph, in any order.
+        executor: Executor to run steps on; defaults to the shared executor. Ignored
+                  inside `run_sequentially()` and with MEMORY_TRACKING_ENABLED.
+
+    Returns:
+        dict: Result (or fallback result) of every step, by name.
+
+    Raises:
+        ValueError: If the graph is malformed.
+        Exception: The first failure of a step without a fallback.
+    """
+    order = _topological_order(nodes)
+    if _sequential.get() or MEMORY_TRACKING_ENABLED:
+        executor = None
+    else:
+        executor = executor or get_shared_executor()
+    results: dict[str, Any] = {}
+
+    if executor is None:
+        for node in order:
+            try:
+                value, error = node.func(**{dep: results[dep] for dep in node.deps}), None
+            except Exception as e:
+                value, error = None, e
+            results[node.name] = _finish(node, error, value)
+        return results
+
+    pending = list(order)
+    running = {}
+    try:
+        while pending or running:
+            for node in [n for n in pending if all(dep in results for dep in n.deps)]:
+                pending.remove(node)
+                # Steps see the caller's context variables (e.g. the request ID), as in the sequential path
+                context = contextvars.copy_context()
+                running[executor.submit(context.run, node.func, **{dep: results[dep] for dep in node.deps})] = node
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                node = running.pop(future)
+                results[node.name] = _finish(node, future.exception(), None if future.exception() else future.result())
+    finally:
+        # A failed step leaves nothing to wait for; steps already running finish on their own
+        for future in running:
+            future.cancel()
+
+    return results
@@ -0,0 +1,188 @@
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from config.config import (
+    ARTIFACT_CACHE_ENABLED,
+    DEFAULT_DATASET,
+    WARMUP_HORIZONS,
+    WARMUP_SIP_STEP_UPS,
+    WARMUP_WORKERS
+)
+from utils.config_snapshot import current_snapshot
+from utils.logger import get_logger
+
+logger = get_logger()
+
+"""
+    Startup Warm-up: Brings a fresh worker to steady-state latency before it
+    takes traffic, and reports readiness to the load balancer.
+
+    Stages, each timed:
+      1. publish_panels: publish any missing or stale NAV panel (one dataset per process)
+      2. artifact_cache: fill the shared artifact cache with the rolling XIRRs of every
+         configured portfolio, horizon and SIP step-up (spread across processes; the
+         cache is on disk, so results computed in the pool are read by this worker).
+         Entries are keyed by the SIP's shape, not its amount, so they serve every
+         request with a flat SIP or one of the warmed step-ups
+      3. attach_panels: memory-map every dataset's panel into this worker
+      4. first_requests: run one analysis per risk and SWP mode combination, paying
+         every first-call cost (imports, allocator growth) off the request path
+
+    A failed stage is logged and recorded; later stages still run and requests
+    compute whatever is missing on demand.
+
+    Datasets and portfolios are those of the current config snapshot; a config
+    reload reruns the warm-up in-process with the new snapshot pinned before it
+    goes live.
+"""
+
+RISK_LEVELS = ('conservative', 'balanced', 'aggressive')
+SWP_MODES = ('conservative', 'aggressive')
+
+
+class WarmupState:
+    """
+    Progress of the warm-up, served by the /ready endpoint.
+    """
+    def __init__(self):
+        self.ready = False
+        self.current_stage: str | None = None
+        self.stage_seconds: dict[str, float] = {}
+        self.errors: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                'ready': self.ready,
+                'current_stage': self.current_stage,
+                'stage_seconds': dict(self.stage_seconds),
+                'errors': dict(self.errors)
+            }
+
+
+warmup_state = WarmupState()
+
+
+def _init_worker() -> None:
+    # Warm-up tasks repeat the request-path logs many times over
+    logging.getLogger('app').setLevel(logging.ERROR)
+
+
+def _publish_panel(dataset: str) -> str:
+    from utils.nav_panel import get_nav_panel
+    return get_nav_panel(dataset).version
+
+
+def _warm_portfolio_xirrs(portfolio: dict[str, float], dataset: str) -> int:
+    from core.xirr_calculator import XirrCalculator
+    from utils.sip_schedule import normalized_sip
+    xirr_calc = XirrCalculator()
+    for step_up in WARMUP_SIP_STEP_UPS:
+        # The key a request with any SIP amount of this shape looks up
+        sip_kwargs = normalized_sip(1.0, step_up, 'percentage')
+        for horizon in WARMUP_HORIZONS:
+            xirr_calc.compute_portfolio_rolling_xirr(
+                portfolio=portfolio, time_horizon=horizon, dataset=dataset, **sip_kwargs
+            )
+    return len(WARMUP_SIP_STEP_UPS) * len(WARMUP_HORIZONS)
+
+
+def _attach_panels() -> None:
+    from utils.nav_panel import get_nav_panel
+    for dataset in current_snapshot().nav_datasets:
+        get_nav_panel(dataset)
+
+
+def _run_first_requests() -> None:
+    from core.run_analysis import runAnalysis
+    from models.UserData import UserData
+
+    user_data = UserData(
+        current_age=35,
+        expected_retirement_age=60,
+        expected_retirement_expenses=600000,
+        current_retirement_corpus=500000,
+        retirement_sip=0
+    )
+    app_logger = logging.getLogger('app')
+    level = app_logger.level
+    app_logger.setLevel(logging.ERROR)
+    try:
+        for swp_mode in SWP_MODES:
+            for pre_risk in RISK_LEVELS:
+                for post_risk in RISK_LEVELS:
+                    runAnalysis(user_data, swp_mode, pre_risk, post_risk)
+    finally:
+        app_logger.setLevel(level)
+
+
+def _run_stage(state: WarmupState, name: str, func, *args) -> None:
+    with state._lock:
+        state.current_stage = name
+    start = time.perf_counter()
+    try:
+        func(*args)
+    except Exception as e:
+        logger.exception(f'Warm-up stage "{name}" failed: {e}')
+        with state._lock:
+            state.errors[name] = str(e)
+    elapsed = round(time.perf_counter() - start, 3)
+    with state._lock:
+        state.stage_seconds[name] = elapsed
+    logger.info(f'Warm-up stage "{name}" took {elapsed}s.')
+
+
+def run_warmup(state: WarmupState = warmup_state, workers: int = WARMUP_WORKERS) -> WarmupState:
+    """
+    Runs every warm-up stage and marks the state ready, even if a stage failed.
+
+    Args:
+        state: Progress record to update.
+        workers: Processes used for the panel and artifact cache stages; 1 runs them in-process.
+
+    Returns:
+        WarmupState: The updated state.
+    """
+    from core.run_analysis import get_relevant_portfolio
+
+    start = time.perf_counter()
+    datasets = list(current_snapshot().nav_datasets)
+    portfolios = [get_relevant_portfolio(risk) for risk in RISK_LEVELS]
+
+    if workers > 1:
+        # Spawned, not forked: the server process is multi-threaded by now
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker
+        )
+    else:
+        pool = None
+
+    def map_tasks(func, *iterables) -> list:
+        return list(pool.map(func, *iterables) if pool is not None else map(func, *iterables))
+
+    try:
+        _run_stage(state, 'publish_panels', map_tasks, _publish_panel, datasets)
+        if ARTIFACT_CACHE_ENABLED:
+            _run_stage(
+                state, 'artifact_cache', map_tasks,
+                _warm_portfolio_xirrs, portfolios, [DEFAULT_DATASET] * len(portfolios)
+            )
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    _run_stage(state, 'attach_panels', _attach_panels)
+    _run_stage(state, 'first_requests', _run_first_requests)
+
+    with state._lock:
+        state.ready = True
+        state.current_stage = None
+        state.stage_seconds['total'] = round(time.perf_counter() - start, 3)
+    logger.info(f'Warm-up complete in {state.stage_seconds["total"]}s. Worker is ready.')
+    return state
@@ -0,0 +1,168 @@
+import io
+import json
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from config.config import (
+    XIRR_DIAGNOSTICS_ENABLED,
+    XIRR_DIAGNOSTICS_MAX_BYTES,
+    XIRR_DIAGNOSTICS_MAX_ENTRIES
+)
+
+"""
+    XIRR Diagnostics: Opt-in capture of the raw rolling-window XIRRs behind each
+    request's return rate, kept in memory for inspection.
+
+    While enabled, every XIRR summary computed on behalf of a request records its
+    window XIRRs (float32), window start dates (int32 days) and the statistic it
+    chose. Captures live in a ring buffer bounded by entry count and bytes, oldest
+    evicted first, and are served per request ID by the admin endpoints or exported
+    to Parquet. The request ID travels in a context variable set by the endpoint,
+    so concurrent requests never mix; work outside a request is not captured.
+    Capturing is toggled at runtime; when disabled, callers skip it after one
+    attribute check, before any dates are looked up.
+"""
+
+current_request_id: ContextVar[str | None] = ContextVar('current_request_id', default=None)
+
+
+@dataclass(frozen=True, slots=True)
+class XirrCapture:
+    request_id: str
+    captured_at: float
+    source: str
+    params: dict
+    mode: str
+    statistic: float
+    window_starts: np.ndarray     # (W,) int32 days since epoch
+    xirrs: np.ndarray             # (W,) float32, in %
+
+    @property
+    def nbytes(self) -> int:
+        return self.window_starts.nbytes + self.xirrs.nbytes
+
+    def to_dict(self) -> dict:
+        return {
+            'source': self.source,
+            'captured_at': self.captured_at,
+            'params': self.params,
+            'mode': self.mode,
+            'statistic': self.statistic,
+            'window_starts': np.datetime_as_string(self.window_starts.astype('datetime64[D]')).tolist(),
+            'xirrs': np.round(self.xirrs.astype(np.float64), 4).tolist()
+        }
+
+
+class XirrDiagnostics:
+    def __init__(
+        self,
+        enabled: bool = XIRR_DIAGNOSTICS_ENABLED,
+        max_entries: int = XIRR_DIAGNOSTICS_MAX_ENTRIES,
+        max_bytes: int = XIRR_DIAGNOSTICS_MAX_BYTES
+    ):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._captures: OrderedDict[int, XirrCapture] = OrderedDict()
+        self._next_id = 0
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def set_enabled(self, enabled: bool) -> None:
+        self.enabled = enabled
+
+    def record(
+        self,
+        source: str,
+        params: dict,
+        mode: str,
+        statistic: float,
+        window_starts: np.ndarray,
+        xirrs: np.ndarray
+    ) -> None:
+        """
+        Captures one XIRR summary for the current request; a no-op outside a request.
+
+        Args:
+            source: What was summarised, e.g. 'portfolio' or 'glide_path'.
+            params: Inputs identifying the computation (portfolio, horizon, SIP pattern).
+            mode: Statistic chosen ('median', 'mean', ...).
+            statistic: Resulting return, in %.
+            window_starts: Start date of every window; only the first len(xirrs) are kept.
+            xirrs: Window XIRRs, in %.
+        """
+        request_id = current_request_id.get()
+        if not self.enabled or request_id is None:
+            return
+
+        capture = XirrCapture(
+            request_id=request_id,
+            captured_at=time.time(),
+            source=source,
+            params=params,
+            mode=mode,
+            statistic=float(statistic),
+            window_starts=np.asarray(window_starts[:len(xirrs)]).astype('datetime64[D]').astype(np.int32),
+            xirrs=np.asarray(xirrs, dtype=np.float32)
+        )
+
+        with self._lock:
+            self._captures[self._next_id] = capture
+            self._next_id += 1
+            self._bytes += capture.nbytes
+            while self._captures and (len(self._captures) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._captures.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def get(self, request_id: str) -> list[XirrCapture]:
+        with self._lock:
+            return [capture for capture in self._captures.values() if capture.request_id == request_id]
+
+    def status(self) -> dict:
+        with self._lock:
+            request_ids = list(dict.fromkeys(capture.request_id for capture in self._captures.values()))
+            return {
+                'enabled': self.enabled,
+                'captures': len(self._captures),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'request_ids': request_ids
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._captures.clear()
+            self._bytes = 0
+
+    def to_parquet(self, request_id: str | None = None) -> bytes:
+        """
+        Parquet file of the captures (of one request, or all), one row per capture with
+        the window start dates and XIRRs as list columns.
+        """
+        with self._lock:
+            captures = [c for c in self._captures.values() if request_id is None or c.request_id == request_id]
+
+        table = pa.table({
+            'request_id': pa.array([c.request_id for c in captures], type=pa.string()),
+            'captured_at': pa.array([c.captured_at for c in captures], type=pa.float64()),
+            'source': pa.array([c.source for c in captures], type=pa.string()),
+            'params': pa.array([json.dumps(c.params) for c in captures], type=pa.string()),
+            'mode': pa.array([c.mode for c in captures], type=pa.string()),
+            'statistic': pa.array([c.statistic for c in captures], type=pa.float64()),
+            'window_starts': pa.array([c.window_starts for c in captures], type=pa.list_(pa.date32())),
+            'xirrs': pa.array([c.xirrs for c in captures], type=pa.list_(pa.float32()))
+        })
+        buffer = io.BytesIO()
+        pq.write_table(table, buffer)
+        return buffer.getvalue()
+
+
+xirr_diagnostics = XirrDiagnostics()